@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class ApiKeysConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'api_keys'
+
+    def ready(self):
+        from django.core.checks import register
+        from .checks import check_rate_limit_cache
+        import api_keys.signals  # noqa
+        register(check_rate_limit_cache)
@@ -1,7 +1,9 @@
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from django.utils import timezone
+from .keycache import api_key_cache
 from .models import APIKey, APIKeyUsageLog
+from .network import get_client_ip
 import time
 
 
@@ -34,11 +36,16 @@ class APIKeyAuthentication(BaseAuthentication):
         
         key_prefix = api_key[:8]
         
-        # Find API key by prefix
-        try:
-            api_key_obj = APIKey.objects.select_related('user').get(key_prefix=key_prefix)
-        except APIKey.DoesNotExist:
-            raise AuthenticationFailed('Invalid API key')
+        # Find API key by prefix (in-process cache first, then the database)
+        entry = api_key_cache.get(key_prefix)
+        if entry is None:
+            try:
+                entry = api_key_cache.set(
+                    APIKey.objects.select_related('user').get(key_prefix=key_prefix)
+                )
+            except APIKey.DoesNotExist:
+                raise AuthenticationFailed('Invalid API key')
+        api_key_obj = api_key_cache.checkout(entry)
         
         # Verify the full key
         if not api_key_obj.verify_key(api_key):
@@ -53,13 +60,14 @@ class APIKeyAuthentication(BaseAuthentication):
             raise AuthenticationFailed('API key has expired')
         
         # Check IP address if restricted
-        ip_address = self.get_client_ip(request)
-        if not api_key_obj.check_ip_allowed(ip_address):
+        ip_address = get_client_ip(request)
+        if not api_key_obj.check_ip_allowed(ip_address, entry.allowlist):
             raise AuthenticationFailed(f'Access denied from IP address: {ip_address}')
         
-        # Store API key object in request for rate limiting middleware
-        request.api_key = api_key_obj
-        request.start_time = time.time()
+        # Store API key object on the underlying HttpRequest for the usage
+        # logging middleware (attributes set on the DRF Request don't reach it)
+        request._request.api_key = api_key_obj
+        request._request.start_time = time.time()
         
         # Return user and api_key_obj as auth tuple
         return (api_key_obj.user, api_key_obj)
@@ -69,14 +77,3 @@ class APIKeyAuthentication(BaseAuthentication):
         Return authentication header for 401 responses
         """
         return self.keyword
-    
-    def get_client_ip(self, request):
-        """
-        Get client IP address from request
-        """
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
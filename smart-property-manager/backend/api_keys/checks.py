@@ -0,0 +1,28 @@
+"""
+System checks for the api_keys app
+
+Run at startup (runserver, migrate, ``manage.py check``).
+"""
+from django.conf import settings
+from django.core.checks import Warning
+
+from config.caching import cache_is_shared
+
+
+def check_rate_limit_cache(app_configs, **kwargs):
+    """
+    Warn when the rate limiter's counters live in per-process memory
+
+    With the LocMem cache every worker keeps its own counters, so a key can
+    make rate_limit requests per worker process. Development servers
+    (DEBUG) run a single process and are not warned.
+    """
+    if settings.DEBUG or cache_is_shared():
+        return []
+    return [
+        Warning(
+            'API key rate limits are counted per worker process.',
+            hint='Set REDIS_URL so every worker shares the sliding-window counters.',
+            id='api_keys.W001',
+        )
+    ]
@@ -0,0 +1,77 @@
+"""
+Fixed log-bucket latency histograms
+
+Response times are counted in buckets whose bounds grow geometrically
+(HDR-style), so every percentile is reported within BUCKET_GROWTH of the
+true value while the bucket layout never changes. That makes histograms
+from different processes, hours and keys mergeable by adding counts.
+Histograms are stored sparsely as {bucket index: count} JSON objects.
+"""
+import math
+
+# Bucket 0 holds everything up to MIN_LATENCY; each further bucket is
+# BUCKET_GROWTH times wider than the previous one, up to MAX_LATENCY.
+MIN_LATENCY = 0.0001  # seconds
+MAX_LATENCY = 600.0
+BUCKET_GROWTH = 1.1
+MAX_BUCKET = math.ceil(math.log(MAX_LATENCY / MIN_LATENCY) / math.log(BUCKET_GROWTH))
+
+
+def bucket_index(seconds):
+    if seconds <= MIN_LATENCY:
+        return 0
+    index = math.ceil(math.log(seconds / MIN_LATENCY) / math.log(BUCKET_GROWTH))
+    return min(index, MAX_BUCKET)
+
+
+def bucket_upper_bound(index):
+    """Largest latency (seconds) counted in bucket ``index``"""
+    return MIN_LATENCY * BUCKET_GROWTH ** index
+
+
+class LatencyHistogram:
+    """Sparse mergeable histogram of response times"""
+
+    def __init__(self, counts=None):
+        self.counts = {}
+        if counts:
+            self.merge(counts)
+
+    @classmethod
+    def from_json(cls, data):
+        return cls({int(index): count for index, count in (data or {}).items()})
+
+    def to_json(self):
+        return {str(index): count for index, count in sorted(self.counts.items())}
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def add(self, seconds, count=1):
+        index = bucket_index(seconds)
+        self.counts[index] = self.counts.get(index, 0) + count
+
+    def merge(self, other):
+        """Add the counts of another histogram (or {index: count} mapping)"""
+        counts = other.counts if isinstance(other, LatencyHistogram) else other
+        for index, count in counts.items():
+            index = int(index)
+            self.counts[index] = self.counts.get(index, 0) + count
+        return self
+
+    def percentile(self, percent):
+        """Upper bound (seconds) of the bucket holding the given percentile, or None if empty"""
+        total = self.total
+        if not total:
+            return None
+        rank = max(1, math.ceil(total * percent / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return bucket_upper_bound(index)
+        return bucket_upper_bound(max(self.counts))
+
+    def percentiles(self, percents):
+        return {f'p{percent:g}': self.percentile(percent) for percent in percents}
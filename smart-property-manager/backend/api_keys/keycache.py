@@ -0,0 +1,109 @@
+"""
+In-process cache of API keys for APIKeyAuthentication
+
+Keys are looked up by prefix in a TTL-bound LRU held by each process, so a
+busy integration authenticates without touching the database. Entries keep
+the key (with its user) and its compiled IP allowlist.
+
+Any change to an APIKey or User bumps a version counter stored in the
+Django cache (see signals.py); every process compares it on lookup and
+drops its LRU when it has moved. That only reaches other workers when the
+cache is shared (Redis): with the per-process LocMem cache a key revoked in
+one worker would keep authenticating in the others until the TTL, so the
+LRU stays off unless API_KEY_CACHE_ENABLED is set and the cache is shared.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from config.caching import cache_is_shared
+
+VERSION_KEY = 'api_keys:auth_cache_version'
+
+CachedKey = namedtuple('CachedKey', ['api_key', 'allowlist', 'loaded_at'])
+
+
+class APIKeyCache:
+    """Thread-safe TTL + LRU map of key prefix -> CachedKey"""
+
+    def __init__(self, maxsize=None, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+
+    def _settings(self):
+        maxsize = self.maxsize or getattr(settings, 'API_KEY_CACHE_SIZE', 1024)
+        ttl = self.ttl if self.ttl is not None else getattr(settings, 'API_KEY_CACHE_TTL', 60)
+        return maxsize, ttl
+
+    def enabled(self):
+        return getattr(settings, 'API_KEY_CACHE_ENABLED', False) and cache_is_shared()
+
+    def _current_version(self):
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, 1, None)
+            version = cache.get(VERSION_KEY, 1)
+        return version
+
+    def get(self, prefix):
+        """Return the cached entry for ``prefix`` or None if missing, expired or invalidated"""
+        if not self.enabled():
+            return None
+        version = self._current_version()
+        _, ttl = self._settings()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+
+            entry = self._entries.get(prefix)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.loaded_at > ttl:
+                del self._entries[prefix]
+                return None
+            self._entries.move_to_end(prefix)
+            return entry
+
+    def set(self, api_key):
+        """Cache an APIKey loaded with select_related('user'); returns the entry either way"""
+        maxsize, _ = self._settings()
+        entry = CachedKey(
+            api_key=api_key,
+            allowlist=api_key.get_allowlist(),
+            loaded_at=time.monotonic()
+        )
+        if not self.enabled():
+            return entry
+        with self._lock:
+            self._entries[api_key.key_prefix] = entry
+            self._entries.move_to_end(api_key.key_prefix)
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self):
+        """Drop this process's entries and tell every other process to do the same"""
+        with self._lock:
+            self._entries.clear()
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 2, None)
+
+    @staticmethod
+    def checkout(entry):
+        """Per-request copy of the cached key and user, so requests never share instances"""
+        api_key = copy.copy(entry.api_key)
+        api_key.user = copy.copy(entry.api_key.user)
+        return api_key
+
+
+api_key_cache = APIKeyCache()
@@ -0,0 +1,83 @@
+"""
+Per-endpoint latency histograms for API keys
+
+Each usage recorder flush adds its response times to
+APIKeyLatencyHistogram rows (per key, endpoint template and hour or day).
+Histograms use fixed log buckets, so rows written by different processes
+and periods merge by adding counts, and percentiles for any window are
+computed from a few hundred small rows instead of the raw usage log.
+"""
+from collections import defaultdict
+
+from .histogram import LatencyHistogram
+from .models import APIKeyLatencyHistogram, APIKeyUsageStat
+from .stats import endpoint_template, lock_period_rows, period_start, window_bounds
+
+PERCENTILES = [50, 90, 99]
+KEY_FIELDS = ['api_key_id', 'granularity', 'period_start', 'endpoint']
+
+
+def record_latency(entries):
+    """
+    Add the response times of APIKeyUsageLog entries to the hourly and daily histograms
+
+    Must run inside a transaction. Returns the number of histogram rows updated.
+    """
+    deltas = defaultdict(LatencyHistogram)
+    for entry in entries:
+        endpoint = endpoint_template(entry.endpoint)
+        for granularity in ('hour', 'day'):
+            key = (entry.api_key_id, granularity, period_start(entry.timestamp, granularity), endpoint)
+            deltas[key].add(entry.response_time)
+    if not deltas:
+        return 0
+
+    rows = lock_period_rows(APIKeyLatencyHistogram, KEY_FIELDS, deltas)
+    for key, row in rows.items():
+        delta = deltas[key]
+        row.request_count += delta.total
+        row.buckets = LatencyHistogram.from_json(row.buckets).merge(delta).to_json()
+    APIKeyLatencyHistogram.objects.bulk_update(rows.values(), ['request_count', 'buckets'])
+    return len(rows)
+
+
+def summary(histogram):
+    return {'requests': histogram.total, **histogram.percentiles(PERCENTILES)}
+
+
+def latency_report(api_key_filter, window, endpoint=None, now=None):
+    """
+    p50/p90/p99 per endpoint and per key over the last ``window``
+
+    ``api_key_filter`` is a dict of lookups relative to the api_key relation.
+    Per-key figures come from the per-key histograms on APIKeyUsageStat,
+    unless ``endpoint`` narrows the report to one endpoint template.
+    Returns (granularity, start, {endpoint: summary}, {api_key_id: summary}).
+    """
+    granularity, start = window_bounds(window, now)
+    key_lookups = {f'api_key__{field}': value for field, value in api_key_filter.items()}
+    period = {'granularity': granularity, 'period_start__gte': start}
+    rows = APIKeyLatencyHistogram.objects.filter(**period, **key_lookups)
+    if endpoint:
+        rows = rows.filter(endpoint=endpoint_template(endpoint))
+
+    by_endpoint = defaultdict(LatencyHistogram)
+    by_key = defaultdict(LatencyHistogram)
+    for api_key_id, endpoint_name, buckets in rows.values_list('api_key_id', 'endpoint', 'buckets').order_by():
+        by_endpoint[endpoint_name].merge(buckets)
+        if endpoint:
+            by_key[api_key_id].merge(buckets)
+
+    if not endpoint:
+        key_rows = APIKeyUsageStat.objects.filter(**period, **key_lookups).values_list(
+            'api_key_id', 'latency_histogram'
+        ).order_by()
+        for api_key_id, buckets in key_rows:
+            by_key[api_key_id].merge(buckets)
+
+    return (
+        granularity,
+        start,
+        {name: summary(histogram) for name, histogram in by_endpoint.items()},
+        {api_key_id: summary(histogram) for api_key_id, histogram in by_key.items() if histogram.total},
+    )
@@ -0,0 +1,81 @@
+import ipaddress
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from api_keys.network import IPAllowlist, parse_networks
+
+
+class Command(BaseCommand):
+    help = 'Compare compiled CIDR allowlist lookups against exact-match and linear network scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=10000, help='Allowlist size')
+        parser.add_argument('--lookups', type=int, default=100000, help='Lookups per strategy')
+        parser.add_argument('--linear-lookups', type=int, default=1000, help='Lookups for the linear scan')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        text = self.build_allowlist(rng, options['entries'])
+        probes = self.build_probes(rng, text, options['lookups'])
+
+        start = time.perf_counter()
+        exact = frozenset(ip.strip() for ip in text.split(',') if ip.strip())
+        exact_compile = time.perf_counter() - start
+
+        start = time.perf_counter()
+        networks = parse_networks(text)
+        linear_compile = time.perf_counter() - start
+
+        start = time.perf_counter()
+        allowlist = IPAllowlist.compile(text)
+        compiled_compile = time.perf_counter() - start
+
+        linear_probes = [ipaddress.ip_address(ip) for ip in probes[:options['linear_lookups']]]
+        results = [
+            ('exact match (old)', exact_compile, self.measure(lambda ip: ip in exact, probes)),
+            ('linear scan', linear_compile,
+             self.measure(lambda ip: any(ip in network for network in networks if network.version == ip.version), linear_probes)),
+            ('compiled bisect', compiled_compile, self.measure(lambda ip: ip in allowlist, probes)),
+        ]
+
+        self.stdout.write(f"{options['entries']} entries collapsed to {allowlist.size} ranges")
+        for name, compile_time, (rate, hits) in results:
+            self.stdout.write(f'  {name:18} compile {compile_time * 1000:8.2f} ms  {rate:12.0f} lookups/s  ({hits} hits)')
+        self.stdout.write(self.style.SUCCESS('Benchmark complete (exact match ignores CIDR ranges)'))
+
+    def measure(self, check, probes):
+        start = time.perf_counter()
+        hits = sum(1 for ip in probes if check(ip))
+        return len(probes) / (time.perf_counter() - start), hits
+
+    def build_allowlist(self, rng, size):
+        """Mixed IPv4/IPv6 hosts and CIDR ranges"""
+        entries = []
+        for _ in range(size):
+            kind = rng.random()
+            if kind < 0.4:
+                entries.append(str(ipaddress.IPv4Address(rng.getrandbits(32))))
+            elif kind < 0.7:
+                prefix = rng.randint(16, 30)
+                entries.append(str(ipaddress.IPv4Network((rng.getrandbits(32), prefix), strict=False)))
+            elif kind < 0.85:
+                entries.append(str(ipaddress.IPv6Address(rng.getrandbits(128))))
+            else:
+                prefix = rng.randint(32, 64)
+                entries.append(str(ipaddress.IPv6Network((rng.getrandbits(128), prefix), strict=False)))
+        return ','.join(entries)
+
+    def build_probes(self, rng, text, count):
+        """Half addresses taken from the list, half random IPv4/IPv6 addresses"""
+        listed = [entry.split('/')[0] for entry in text.split(',')]
+        probes = []
+        for index in range(count):
+            if index % 2:
+                probes.append(rng.choice(listed))
+            elif rng.random() < 0.7:
+                probes.append(str(ipaddress.IPv4Address(rng.getrandbits(32))))
+            else:
+                probes.append(str(ipaddress.IPv6Address(rng.getrandbits(128))))
+        return probes
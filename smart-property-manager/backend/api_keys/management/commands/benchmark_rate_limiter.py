@@ -0,0 +1,58 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from api_keys.ratelimit import SlidingWindowRateLimiter
+
+
+class Command(BaseCommand):
+    help = 'Measure rate limiter throughput and accuracy against local-memory and Redis caches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20000, help='Total hits per backend')
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent worker threads')
+        parser.add_argument('--limit', type=int, default=5000, help='Rate limit applied to the benchmark key')
+        parser.add_argument('--redis-url', type=str, help='Also benchmark django-redis at this URL')
+
+    def handle(self, *args, **options):
+        backends = [('locmem', self.locmem_cache())]
+        if options.get('redis_url'):
+            backends.append(('redis', self.redis_cache(options['redis_url'])))
+
+        for name, cache in backends:
+            limiter = SlidingWindowRateLimiter(cache=cache, prefix=f'benchmark_{int(time.time())}')
+            elapsed, allowed = self.run(limiter, options['requests'], options['threads'], options['limit'])
+
+            self.stdout.write(self.style.SUCCESS(f'{name}:'))
+            self.stdout.write(f"  {options['requests'] / elapsed:10.0f} requests/s ({options['threads']} threads)")
+            self.stdout.write(f"  {allowed} allowed of {options['requests']} with limit {options['limit']}")
+            if allowed > options['limit']:
+                self.stdout.write(self.style.ERROR('  limit exceeded under concurrency'))
+
+    def run(self, limiter, requests, threads, limit):
+        allowed = [0] * threads
+        per_thread = requests // threads
+
+        def worker(slot):
+            for _ in range(per_thread):
+                if limiter.hit('benchmark', limit).allowed:
+                    allowed[slot] += 1
+
+        workers = [threading.Thread(target=worker, args=(slot,)) for slot in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return time.perf_counter() - start, sum(allowed)
+
+    def locmem_cache(self):
+        from django.core.cache.backends.locmem import LocMemCache
+        return LocMemCache('rate-limit-benchmark', {})
+
+    def redis_cache(self, url):
+        try:
+            from django_redis.cache import RedisCache
+        except ImportError:
+            raise CommandError('django-redis is not installed')
+        return RedisCache(url, {'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient'}})
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from api_keys.usage import apply_retention
+
+
+class Command(BaseCommand):
+    help = 'Prune hourly API key statistics, create upcoming partitions and drop expired logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-months', type=int, help='Override API_USAGE_LOG_RETENTION_MONTHS')
+        parser.add_argument('--months-ahead', type=int, default=2, help='Monthly partitions to prepare in advance')
+
+    def handle(self, *args, **options):
+        result = apply_retention(months=options.get('retention_months'), months_ahead=options['months_ahead'])
+
+        if result['stats_pruned']:
+            self.stdout.write(f"Pruned {result['stats_pruned']} hourly statistics rows")
+        for name in result['created']:
+            self.stdout.write(f'Created partition {name}')
+        for name in result['dropped']:
+            self.stdout.write(f'Dropped partition {name}')
+        if result['deleted']:
+            self.stdout.write(f"Deleted {result['deleted']} log rows")
+        self.stdout.write(self.style.SUCCESS(f"Usage logs retained from {result['cutoff']}"))
@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from api_keys.stats import rebuild_usage_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild pre-aggregated API key statistics and latency histograms from the raw usage logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Days of raw logs to rebuild from')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options['days'])
+        total = rebuild_usage_stats(since, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt statistics from {total} usage log rows'))
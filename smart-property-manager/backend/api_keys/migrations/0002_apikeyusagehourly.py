@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_keys', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='APIKeyUsageHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(help_text='Start of the hour (UTC)')),
+                ('endpoint', models.CharField(max_length=500)),
+                ('method', models.CharField(max_length=10)),
+                ('status_code', models.IntegerField()),
+                ('request_count', models.IntegerField(default=0)),
+                ('total_response_time', models.FloatField(default=0, help_text='Sum of response times in seconds')),
+                ('max_response_time', models.FloatField(default=0)),
+                ('api_key', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_usage', to='api_keys.apikey')),
+            ],
+            options={
+                'db_table': 'api_key_usage_hourly',
+                'ordering': ['-hour'],
+                'indexes': [models.Index(fields=['hour'], name='api_key_usa_hour_f4b7d5_idx')],
+                'unique_together': {('api_key', 'hour', 'endpoint', 'method', 'status_code')},
+            },
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 4.2.7
+
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.db import migrations
+
+# Frozen copy of the partition layout at the time of this migration; later
+# changes to api_keys.partitions must not alter what it does.
+TABLE = 'api_keys_apikeyusagelog'
+STAGING = f'{TABLE}_partitioned'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def bound(month):
+    return datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc).isoformat()
+
+
+def partition_usage_log(apps, schema_editor):
+    """
+    Convert the plain usage log table into a monthly partitioned table
+
+    A no-op on non-PostgreSQL backends. Existing rows are copied into their
+    monthly partitions; rows outside the prepared range land in the
+    default partition.
+    """
+    conn = schema_editor.connection
+    if conn.vendor != 'postgresql':
+        return
+
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = %s",
+            [TABLE]
+        )
+        if cursor.fetchone() is not None:
+            return
+
+        cursor.execute(f'SELECT MIN("timestamp") FROM "{TABLE}"')
+        oldest = cursor.fetchone()[0]
+
+        cursor.execute(
+            f'CREATE TABLE "{STAGING}" (LIKE "{TABLE}" INCLUDING DEFAULTS INCLUDING IDENTITY) '
+            f'PARTITION BY RANGE ("timestamp")'
+        )
+        cursor.execute(f'ALTER TABLE "{STAGING}" ADD PRIMARY KEY ("id", "timestamp")')
+        cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{STAGING}" DEFAULT')
+
+        today = date.today()
+        month = date(oldest.year, oldest.month, 1) if oldest else date(today.year, today.month, 1)
+        last = add_months(date(today.year, today.month, 1), 2)
+        while month <= last:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS "{TABLE}_p{month.year:04d}_{month.month:02d}" PARTITION OF "{STAGING}" '
+                f"FOR VALUES FROM ('{bound(month)}') TO ('{bound(add_months(month, 1))}')"
+            )
+            month = add_months(month, 1)
+
+        cursor.execute(f'INSERT INTO "{STAGING}" SELECT * FROM "{TABLE}"')
+        cursor.execute(f'DROP TABLE "{TABLE}"')
+        cursor.execute(f'ALTER TABLE "{STAGING}" RENAME TO "{TABLE}"')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('\"{TABLE}\"', 'id'), COALESCE(MAX(\"id\"), 0) + 1, false) FROM \"{TABLE}\""
+        )
+
+        # Indexes declared on APIKeyUsageLog.Meta, recreated on the parent so
+        # every partition inherits them
+        cursor.execute(f'CREATE INDEX "api_keys_ap_api_key_61c98b_idx" ON "{TABLE}" ("api_key_id", "timestamp")')
+        cursor.execute(f'CREATE INDEX "api_keys_ap_timesta_337266_idx" ON "{TABLE}" ("timestamp")')
+        cursor.execute(f'CREATE INDEX "api_keys_ap_status__f26dbd_idx" ON "{TABLE}" ("status_code")')
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_api_key_id_fk" FOREIGN KEY ("api_key_id") '
+            f'REFERENCES "api_keys_apikey" ("id") DEFERRABLE INITIALLY DEFERRED'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_keys', '0002_apikeyusagehourly'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_usage_log, migrations.RunPython.noop),
+    ]
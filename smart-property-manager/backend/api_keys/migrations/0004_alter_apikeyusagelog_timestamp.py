@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_keys', '0003_partition_usage_log'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='apikeyusagelog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_keys', '0004_alter_apikeyusagelog_timestamp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='APIKeyUsageStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('period_start', models.DateTimeField(help_text='Start of the hour or day (UTC)')),
+                ('request_count', models.IntegerField(default=0)),
+                ('status_2xx', models.IntegerField(default=0)),
+                ('status_3xx', models.IntegerField(default=0)),
+                ('status_4xx', models.IntegerField(default=0)),
+                ('status_5xx', models.IntegerField(default=0)),
+                ('total_response_time', models.FloatField(default=0, help_text='Sum of response times in seconds')),
+                ('endpoint_counts', models.JSONField(blank=True, default=dict)),
+                ('latency_histogram', models.JSONField(blank=True, default=dict)),
+                ('api_key', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_stats', to='api_keys.apikey')),
+            ],
+            options={
+                'db_table': 'api_key_usage_stats',
+                'ordering': ['-period_start'],
+                'indexes': [models.Index(fields=['granularity', 'period_start'], name='api_key_usa_granula_c50ee2_idx')],
+                'unique_together': {('api_key', 'granularity', 'period_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_keys', '0005_apikeyusagestat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='APIKeyLatencyHistogram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('period_start', models.DateTimeField(help_text='Start of the hour or day (UTC)')),
+                ('endpoint', models.CharField(help_text='Request path with ids replaced by {id}', max_length=500)),
+                ('request_count', models.IntegerField(default=0)),
+                ('buckets', models.JSONField(blank=True, default=dict)),
+                ('api_key', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='latency_histograms', to='api_keys.apikey')),
+            ],
+            options={
+                'db_table': 'api_key_latency_histograms',
+                'ordering': ['-period_start'],
+                'indexes': [models.Index(fields=['granularity', 'period_start'], name='api_key_lat_granula_75440f_idx')],
+                'unique_together': {('api_key', 'granularity', 'period_start', 'endpoint')},
+            },
+        ),
+    ]
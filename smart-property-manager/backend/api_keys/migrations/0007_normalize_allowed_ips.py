@@ -0,0 +1,68 @@
+# Generated by Django 4.2.7
+
+import ipaddress
+import logging
+import re
+
+from django.db import migrations, models
+
+logger = logging.getLogger('api_keys.migrations')
+
+
+def normalize_allowed_ips(apps, schema_editor):
+    """
+    Rewrite allowed_ips in canonical form (collapsed networks, comma-separated)
+
+    Rows written before validation existed may use other separators
+    ("10.0.0.1;10.0.0.2") or hold entries that are not addresses at all
+    ("office-gateway"). Separators are normalized; entries that still do not
+    parse are kept verbatim at the end, where they match no address, and
+    the affected keys are logged so an admin can fix them.
+    """
+    APIKey = apps.get_model('api_keys', 'APIKey')
+    for api_key in APIKey.objects.exclude(allowed_ips='').only('pk', 'allowed_ips').iterator():
+        networks = {4: [], 6: []}
+        invalid = []
+        for entry in re.split(r'[,;\s]+', api_key.allowed_ips):
+            if not entry:
+                continue
+            try:
+                network = ipaddress.ip_network(entry, strict=False)
+            except ValueError:
+                invalid.append(entry)
+                continue
+            networks[network.version].append(network)
+
+        entries = []
+        for version in (4, 6):
+            for network in ipaddress.collapse_addresses(networks[version]):
+                if network.prefixlen == network.max_prefixlen:
+                    entries.append(str(network.network_address))
+                else:
+                    entries.append(str(network))
+        entries.extend(invalid)
+
+        normalized = ','.join(entries)
+        if normalized != api_key.allowed_ips:
+            APIKey.objects.filter(pk=api_key.pk).update(allowed_ips=normalized)
+        if invalid:
+            logger.warning(
+                'API key %s has invalid allowed_ips entries %r; they match no address until fixed',
+                api_key.pk, invalid
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_keys', '0006_apikeylatencyhistogram'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='apikey',
+            name='allowed_ips',
+            field=models.TextField(blank=True, help_text='Comma-separated list of allowed IP addresses or CIDR ranges'),
+        ),
+        migrations.RunPython(normalize_allowed_ips, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_keys', '0007_normalize_allowed_ips'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='APIKeyUsageHourly',
+        ),
+    ]
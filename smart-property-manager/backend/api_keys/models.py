@@ -1,8 +1,14 @@
 import secrets
 import hashlib
+import hmac
+import logging
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
 from users.models import User
+from .network import IPAllowlist, normalize_allowlist
+
+logger = logging.getLogger(__name__)
 
 
 class APIKey(models.Model):
@@ -18,7 +24,7 @@ class APIKey(models.Model):
     
     # Permissions
     is_active = models.BooleanField(default=True)
-    allowed_ips = models.TextField(blank=True, help_text='Comma-separated list of allowed IP addresses')
+    allowed_ips = models.TextField(blank=True, help_text='Comma-separated list of allowed IP addresses or CIDR ranges')
     rate_limit = models.IntegerField(default=1000, help_text='Requests per hour')
     
     # Scopes/Permissions
@@ -57,7 +63,7 @@ class APIKey(models.Model):
     
     def verify_key(self, key):
         """Verify if the provided key matches the stored hash"""
-        return self.key_hash == self.hash_key(key)
+        return hmac.compare_digest(self.key_hash, self.hash_key(key))
     
     def get_masked_key(self):
         """Return masked key for display (only shows prefix)"""
@@ -74,17 +80,45 @@ class APIKey(models.Model):
         return self.is_active and not self.is_expired()
     
     def increment_usage(self):
-        """Increment usage count and update last_used_at"""
+        """Atomically increment usage count and update last_used_at"""
         self.usage_count += 1
         self.last_used_at = timezone.now()
-        self.save(update_fields=['usage_count', 'last_used_at'])
-    
-    def check_ip_allowed(self, ip_address):
-        """Check if the IP address is allowed"""
-        if not self.allowed_ips:
-            return True  # No IP restriction
-        allowed_list = [ip.strip() for ip in self.allowed_ips.split(',')]
-        return ip_address in allowed_list
+        APIKey.objects.filter(pk=self.pk).update(
+            usage_count=models.F('usage_count') + 1,
+            last_used_at=self.last_used_at
+        )
+    
+    def clean(self):
+        # Store the allowlist in canonical form (collapsed networks, CIDR notation)
+        try:
+            self.allowed_ips = normalize_allowlist(self.allowed_ips)
+        except ValueError as e:
+            raise ValidationError({'allowed_ips': f'Invalid IP address or CIDR range: {e}'})
+    
+    def get_allowlist(self):
+        """
+        Compiled IP allowlist, rebuilt only when allowed_ips changes
+        
+        Entries that are not addresses or CIDR ranges (rows saved before
+        validation existed) never match, so they deny rather than raise.
+        """
+        cached = getattr(self, '_allowlist_cache', None)
+        if cached is None or cached[0] != self.allowed_ips:
+            allowlist = IPAllowlist.compile(self.allowed_ips, strict=False)
+            if allowlist.invalid:
+                logger.warning(
+                    'API key %s has invalid allowed_ips entries %r; they match no address',
+                    self.pk, allowlist.invalid
+                )
+            cached = (self.allowed_ips, allowlist)
+            self._allowlist_cache = cached
+        return cached[1]
+    
+    def check_ip_allowed(self, ip_address, allowlist=None):
+        """Check if the IP address is allowed (an empty allowlist means no restriction)"""
+        if allowlist is None:
+            allowlist = self.get_allowlist()
+        return ip_address in allowlist
     
     def deactivate(self):
         """Deactivate the API key"""
@@ -118,8 +152,8 @@ class APIKeyUsageLog(models.Model):
     status_code = models.IntegerField()
     response_time = models.FloatField(help_text='Response time in seconds')
     
-    # Timestamp
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Timestamp (set when the request is handled, not when the buffered row is written)
+    timestamp = models.DateTimeField(default=timezone.now)
     
     class Meta:
         ordering = ['-timestamp']
@@ -131,3 +165,62 @@ class APIKeyUsageLog(models.Model):
     
     def __str__(self):
         return f"{self.api_key.name} - {self.method} {self.endpoint} ({self.status_code})"
+
+
+class APIKeyUsageStat(models.Model):
+    """Pre-aggregated per-key counters for one hour or one day, fed by the usage recorder"""
+    
+    GRANULARITY_CHOICES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+    
+    api_key = models.ForeignKey(APIKey, on_delete=models.CASCADE, related_name='usage_stats')
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    period_start = models.DateTimeField(help_text='Start of the hour or day (UTC)')
+    
+    # Counters
+    request_count = models.IntegerField(default=0)
+    status_2xx = models.IntegerField(default=0)
+    status_3xx = models.IntegerField(default=0)
+    status_4xx = models.IntegerField(default=0)
+    status_5xx = models.IntegerField(default=0)
+    total_response_time = models.FloatField(default=0, help_text='Sum of response times in seconds')
+    
+    # Requests per endpoint and a log-bucket latency histogram (see histogram.py)
+    endpoint_counts = models.JSONField(default=dict, blank=True)
+    latency_histogram = models.JSONField(default=dict, blank=True)
+    
+    class Meta:
+        db_table = 'api_key_usage_stats'
+        ordering = ['-period_start']
+        unique_together = ['api_key', 'granularity', 'period_start']
+        indexes = [
+            models.Index(fields=['granularity', 'period_start']),
+        ]
+    
+    def __str__(self):
+        return f"{self.api_key_id} {self.granularity} @ {self.period_start:%Y-%m-%d %H}:00"
+
+
+class APIKeyLatencyHistogram(models.Model):
+    """Response time histogram per key, endpoint template and hour or day (see histogram.py)"""
+    
+    api_key = models.ForeignKey(APIKey, on_delete=models.CASCADE, related_name='latency_histograms')
+    granularity = models.CharField(max_length=4, choices=APIKeyUsageStat.GRANULARITY_CHOICES)
+    period_start = models.DateTimeField(help_text='Start of the hour or day (UTC)')
+    endpoint = models.CharField(max_length=500, help_text='Request path with ids replaced by {id}')
+    
+    request_count = models.IntegerField(default=0)
+    buckets = models.JSONField(default=dict, blank=True)
+    
+    class Meta:
+        db_table = 'api_key_latency_histograms'
+        ordering = ['-period_start']
+        unique_together = ['api_key', 'granularity', 'period_start', 'endpoint']
+        indexes = [
+            models.Index(fields=['granularity', 'period_start']),
+        ]
+    
+    def __str__(self):
+        return f"{self.api_key_id} {self.endpoint} {self.granularity} @ {self.period_start:%Y-%m-%d %H}:00"
@@ -0,0 +1,131 @@
+"""
+IP allowlists and client IP extraction for API keys
+
+An allowlist is compiled once from the comma-separated ``allowed_ips`` text
+into collapsed ``ipaddress`` networks, stored per IP version as sorted,
+non-overlapping integer ranges. Membership is a binary search, so a
+10k-entry list costs the same handful of comparisons as a single address.
+Both IPv4 and IPv6 addresses and CIDR ranges are supported.
+"""
+import ipaddress
+from bisect import bisect_right
+
+from django.conf import settings
+
+
+def parse_networks(text, invalid=None):
+    """
+    Parse comma-separated addresses/CIDRs into collapsed networks
+
+    Raises ValueError on the first invalid entry, unless an ``invalid`` list
+    is given; invalid entries are then appended to it and skipped.
+    """
+    networks = {4: [], 6: []}
+    for entry in (text or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            network = ipaddress.ip_network(entry, strict=False)
+        except ValueError:
+            if invalid is None:
+                raise
+            invalid.append(entry)
+            continue
+        networks[network.version].append(network)
+    return [
+        network
+        for version in (4, 6)
+        for network in ipaddress.collapse_addresses(networks[version])
+    ]
+
+
+def format_network(network):
+    """Single hosts are written as plain addresses, ranges in CIDR notation"""
+    if network.prefixlen == network.max_prefixlen:
+        return str(network.network_address)
+    return str(network)
+
+
+def normalize_allowlist(text):
+    """Canonical form of an allowlist: collapsed, sorted and de-duplicated"""
+    return ','.join(format_network(network) for network in parse_networks(text))
+
+
+class IPAllowlist:
+    """
+    Compiled allowlist; an empty allowlist allows every address
+
+    An allowlist compiled with ``strict=False`` skips entries that are not
+    addresses or CIDR ranges; they never match, and a list that had entries
+    but none valid denies every address instead of allowing all of them.
+    """
+
+    def __init__(self, networks=(), invalid=()):
+        self.invalid = list(invalid)
+        ranges = {4: [], 6: []}
+        for network in networks:
+            ranges[network.version].append((int(network.network_address), int(network.broadcast_address)))
+        self._starts = {}
+        self._ends = {}
+        for version, spans in ranges.items():
+            spans.sort()
+            self._starts[version] = [start for start, _ in spans]
+            self._ends[version] = [end for _, end in spans]
+        self.size = len(self._starts[4]) + len(self._starts[6])
+
+    @classmethod
+    def compile(cls, text, strict=True):
+        if strict:
+            return cls(parse_networks(text))
+        invalid = []
+        networks = parse_networks(text, invalid)
+        return cls(networks, invalid)
+
+    @property
+    def unrestricted(self):
+        return self.size == 0 and not self.invalid
+
+    def __contains__(self, ip_address):
+        if self.unrestricted:
+            return True
+        try:
+            address = ipaddress.ip_address(ip_address)
+        except ValueError:
+            return False
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+
+        starts = self._starts[address.version]
+        index = bisect_right(starts, int(address)) - 1
+        return index >= 0 and int(address) <= self._ends[address.version][index]
+
+
+def trusted_proxies():
+    """Compiled TRUSTED_PROXIES setting (cached per value)"""
+    text = ','.join(getattr(settings, 'TRUSTED_PROXIES', []))
+    cached = getattr(trusted_proxies, '_cache', None)
+    if cached is None or cached[0] != text:
+        cached = (text, IPAllowlist.compile(text))
+        trusted_proxies._cache = cached
+    return cached[1]
+
+
+def get_client_ip(request):
+    """
+    Client address for ``request``
+
+    X-Forwarded-For is only honoured when the direct peer is a trusted proxy;
+    the header is then read right to left, skipping further trusted proxies,
+    so a client cannot spoof its address by sending the header itself.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    proxies = trusted_proxies()
+    if proxies.unrestricted or remote_addr not in proxies:
+        return remote_addr
+
+    forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+    for ip_address in reversed(forwarded):
+        if ip_address not in proxies:
+            return ip_address
+    return forwarded[0] if forwarded else remote_addr
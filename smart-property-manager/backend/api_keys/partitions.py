@@ -0,0 +1,130 @@
+"""
+Monthly partitioning and retention for APIKeyUsageLog
+
+On PostgreSQL the usage log is a declaratively partitioned table
+(PARTITION BY RANGE ("timestamp")) with one partition per calendar month
+plus a DEFAULT partition that catches rows outside the prepared range.
+Retention drops whole partitions, which is instant and leaves no bloat.
+The table itself is converted by migration 0003_partition_usage_log.
+Other backends (SQLite in tests) keep a plain table and fall back to a
+batched DELETE.
+"""
+import logging
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.db import DatabaseError, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'api_keys_apikeyusagelog'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def is_partitioned(conn=None):
+    """Whether the usage log table is a PostgreSQL partitioned table"""
+    conn = conn or connection
+    if conn.vendor != 'postgresql':
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = %s",
+            [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month.year:04d}_{month.month:02d}'
+
+
+def partition_month(name):
+    """Inverse of partition_name(); None for the default partition or foreign tables"""
+    prefix = f'{TABLE}_p'
+    if not name.startswith(prefix):
+        return None
+    try:
+        year, month = name[len(prefix):].split('_')
+        return date(int(year), int(month), 1)
+    except ValueError:
+        return None
+
+
+def _bound(month):
+    return datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc).isoformat()
+
+
+def create_partition_sql(month, parent=TABLE):
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(month)}" PARTITION OF "{parent}" '
+        f"FOR VALUES FROM ('{_bound(month)}') TO ('{_bound(add_months(month, 1))}')"
+    )
+
+
+def list_partitions(conn=None):
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [TABLE]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def ensure_partitions(start, months_ahead=2, conn=None):
+    """Create monthly partitions from ``start`` through ``months_ahead`` months past today"""
+    conn = conn or connection
+    if not is_partitioned(conn):
+        return []
+
+    today = date.today()
+    month = date(start.year, start.month, 1)
+    last = add_months(date(today.year, today.month, 1), months_ahead)
+    existing = set(list_partitions(conn))
+
+    created = []
+    with conn.cursor() as cursor:
+        while month <= last:
+            if partition_name(month) not in existing:
+                try:
+                    with transaction.atomic(using=conn.alias):
+                        cursor.execute(create_partition_sql(month))
+                    created.append(partition_name(month))
+                except DatabaseError:
+                    # The default partition already holds rows for this month
+                    logger.exception('Could not create usage log partition %s', partition_name(month))
+            month = add_months(month, 1)
+    return created
+
+
+def drop_expired_partitions(cutoff, conn=None):
+    """
+    Drop every monthly partition that ends on or before ``cutoff`` (a month start)
+
+    Stray rows older than the cutoff in the default partition are deleted.
+    Returns the names of the dropped partitions.
+    """
+    conn = conn or connection
+    dropped = []
+    with conn.cursor() as cursor:
+        for name in list_partitions(conn):
+            month = partition_month(name)
+            if month is not None and add_months(month, 1) <= cutoff:
+                cursor.execute(f'DROP TABLE IF EXISTS "{name}"')
+                dropped.append(name)
+        cursor.execute(
+            f'DELETE FROM "{DEFAULT_PARTITION}" WHERE "timestamp" < %s',
+            [_bound(cutoff)]
+        )
+    return dropped
+
@@ -0,0 +1,103 @@
+"""
+Sliding-window rate limiting for API keys
+
+Each key has one counter per fixed window (an hour by default). A request is
+allowed when the weighted estimate
+
+    previous_window_count * (1 - elapsed / window) + current_window_count
+
+stays within the key's limit, which smooths the burst a fixed window allows
+at its boundary. Counters only ever change through atomic increments: on
+django-redis a Lua script performs the increment, the estimate and the
+rollback of rejected hits in one round trip; on other cache backends
+cache.incr() is used. Counters expire two windows after they start, so an
+idle key is released automatically.
+
+The counters must live in a cache shared by every worker (Redis). On the
+per-process LocMem cache each worker counts on its own and a key gets
+rate_limit requests per worker; the api_keys.W001 system check warns
+about that at startup.
+"""
+import math
+import time
+from collections import namedtuple
+
+from django.core.cache import cache as default_cache
+
+
+RateLimit = namedtuple('RateLimit', ['allowed', 'limit', 'remaining', 'reset', 'retry_after'])
+
+REDIS_SCRIPT = """
+local current = redis.call('INCR', KEYS[1])
+if current == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+local previous = tonumber(redis.call('GET', KEYS[2])) or 0
+local estimated = previous * tonumber(ARGV[2]) + current
+if estimated > tonumber(ARGV[3]) then
+    redis.call('DECR', KEYS[1])
+    return {0, tostring(estimated)}
+end
+return {1, tostring(estimated)}
+"""
+
+
+class SlidingWindowRateLimiter:
+    """Atomic sliding-window counter on top of the Django cache"""
+
+    def __init__(self, cache=None, window=3600, prefix='api_key_rate'):
+        self.cache = cache or default_cache
+        self.window = window
+        self.prefix = prefix
+        self._script = None
+
+    def _redis_script(self):
+        """Registered Lua script when the cache is django-redis, else None"""
+        if self._script is None:
+            client = getattr(self.cache, 'client', None)
+            if client is None or not hasattr(client, 'get_client'):
+                self._script = False
+            else:
+                self._script = client.get_client(write=True).register_script(REDIS_SCRIPT)
+        return self._script or None
+
+    def hit(self, identity, limit, now=None):
+        """Count one request for ``identity`` and report whether it is within ``limit``"""
+        now = time.time() if now is None else now
+        index = int(now // self.window)
+        weight = 1 - (now - index * self.window) / self.window
+        current_key = f'{self.prefix}:{identity}:{index}'
+        previous_key = f'{self.prefix}:{identity}:{index - 1}'
+
+        script = self._redis_script()
+        if script is not None:
+            allowed, estimated = script(
+                keys=[self.cache.make_key(current_key), self.cache.make_key(previous_key)],
+                args=[self.window * 2, weight, limit]
+            )
+            allowed, estimated = bool(int(allowed)), float(estimated)
+        else:
+            self.cache.add(current_key, 0, self.window * 2)
+            try:
+                current = self.cache.incr(current_key)
+            except ValueError:
+                # Expired between add() and incr()
+                self.cache.add(current_key, 1, self.window * 2)
+                current = 1
+            estimated = self.cache.get(previous_key, 0) * weight + current
+            allowed = estimated <= limit
+            if not allowed:
+                self.cache.decr(current_key)
+
+        reset = (index + 1) * self.window
+        return RateLimit(
+            allowed=allowed,
+            limit=limit,
+            remaining=max(0, math.floor(limit - estimated)),
+            reset=int(reset),
+            # Hint only: the estimate starts to decay once the current window ends
+            retry_after=0 if allowed else max(1, math.ceil(reset - now))
+        )
+
+
+rate_limiter = SlidingWindowRateLimiter()
@@ -0,0 +1,129 @@
+"""
+Buffered API key usage recording
+
+APIKeyMiddleware hands each usage log entry to ``usage_recorder`` instead of
+writing it on the request path. Entries are collected in memory and flushed
+from a background thread every API_USAGE_FLUSH_SIZE entries or
+API_USAGE_FLUSH_INTERVAL_MS milliseconds, whichever comes first: one
+bulk_create for the log rows, one ``F('usage_count') + n`` UPDATE per
+key and the pre-aggregated statistics and latency histogram updates (see
+stats.py and latency.py). The buffer is flushed at interpreter shutdown. With API_USAGE_LOG_SYNC
+enabled (tests, one-off scripts) every entry is flushed immediately.
+
+The raw log insert and the aggregate updates run in separate transactions,
+each retried once: a deadlock between two workers updating the same stat
+rows must not take the audit log down with it.
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+from .latency import record_latency
+from .models import APIKey, APIKeyUsageLog
+from .stats import record_usage_stats
+
+logger = logging.getLogger(__name__)
+
+
+class UsageRecorder:
+    """Thread-safe in-memory buffer of APIKeyUsageLog rows"""
+
+    def __init__(self, background=True):
+        self.background = background
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    @property
+    def flush_size(self):
+        return getattr(settings, 'API_USAGE_FLUSH_SIZE', 500)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'API_USAGE_FLUSH_INTERVAL_MS', 1000) / 1000
+
+    def record(self, entry):
+        """Queue an unsaved APIKeyUsageLog for the next flush"""
+        if getattr(settings, 'API_USAGE_LOG_SYNC', False):
+            self._write([entry])
+            return
+
+        with self._lock:
+            self._buffer.append(entry)
+            pending = len(self._buffer)
+        self._ensure_worker()
+        if pending >= self.flush_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of entries written"""
+        with self._lock:
+            entries, self._buffer = self._buffer, []
+        if entries:
+            self._write(entries)
+        return len(entries)
+
+    def _write(self, entries):
+        usage = defaultdict(lambda: [0, None])
+        for entry in entries:
+            counts = usage[entry.api_key_id]
+            counts[0] += 1
+            counts[1] = max(counts[1], entry.timestamp) if counts[1] else entry.timestamp
+
+        def write_logs():
+            APIKeyUsageLog.objects.bulk_create(entries, batch_size=self.flush_size)
+
+        def write_aggregates():
+            for api_key_id, (count, last_used_at) in usage.items():
+                APIKey.objects.filter(pk=api_key_id).update(
+                    usage_count=F('usage_count') + count,
+                    last_used_at=last_used_at
+                )
+            record_usage_stats(entries)
+            record_latency(entries)
+
+        self._attempt(write_logs, 'usage log entries', len(entries))
+        self._attempt(write_aggregates, 'usage statistics', len(entries))
+
+    def _attempt(self, write, what, count, attempts=2):
+        """Run ``write`` in its own transaction, retrying once on failure"""
+        for attempt in range(1, attempts + 1):
+            try:
+                with transaction.atomic():
+                    write()
+                return True
+            except Exception:
+                if attempt < attempts:
+                    continue
+                # Usage logging must never break requests; the entries are dropped
+                logger.exception('Failed to write %s for %d API key requests', what, count)
+        return False
+
+    def _ensure_worker(self):
+        if not self.background:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='api-usage-recorder', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+usage_recorder = UsageRecorder()
+atexit.register(usage_recorder.flush)
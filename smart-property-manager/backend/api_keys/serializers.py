@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import APIKey, APIKeyUsageLog
+from .network import normalize_allowlist
 from users.serializers import UserSerializer
 
 
@@ -68,6 +69,12 @@ class CreateAPIKeySerializer(serializers.ModelSerializer):
         if value > 10000:
             raise serializers.ValidationError("Rate limit cannot exceed 10000 requests per hour")
         return value
+    
+    def validate_allowed_ips(self, value):
+        try:
+            return normalize_allowlist(value)
+        except ValueError as e:
+            raise serializers.ValidationError(f"Invalid IP address or CIDR range: {e}")
 
 
 class UpdateAPIKeySerializer(serializers.ModelSerializer):
@@ -78,6 +85,12 @@ class UpdateAPIKeySerializer(serializers.ModelSerializer):
             'name', 'is_active', 'allowed_ips', 'rate_limit',
             'can_read', 'can_write', 'can_delete', 'expires_at'
         ]
+    
+    def validate_allowed_ips(self, value):
+        try:
+            return normalize_allowlist(value)
+        except ValueError as e:
+            raise serializers.ValidationError(f"Invalid IP address or CIDR range: {e}")
 
 
 class APIKeyResponseSerializer(serializers.Serializer):
@@ -114,5 +127,37 @@ class APIKeyStatisticsSerializer(serializers.Serializer):
     total_usage = serializers.IntegerField()
     usage_by_key = serializers.DictField()
     recent_usage = serializers.ListField()
+    window = serializers.CharField()
+    window_start = serializers.DateTimeField()
+    granularity = serializers.CharField()
+    window_requests = serializers.IntegerField()
     usage_by_endpoint = serializers.DictField()
     usage_by_status = serializers.DictField()
+    response_time = serializers.DictField()
+    window_by_key = serializers.DictField()
+
+
+class LatencySummarySerializer(serializers.Serializer):
+    """Request count and response time percentiles (seconds)"""
+    requests = serializers.IntegerField()
+    p50 = serializers.FloatField(allow_null=True)
+    p90 = serializers.FloatField(allow_null=True)
+    p99 = serializers.FloatField(allow_null=True)
+
+
+class EndpointLatencySerializer(LatencySummarySerializer):
+    endpoint = serializers.CharField()
+
+
+class KeyLatencySerializer(LatencySummarySerializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+
+
+class APIKeyLatencySerializer(serializers.Serializer):
+    """Serializer for per-endpoint and per-key latency percentiles"""
+    window = serializers.CharField()
+    window_start = serializers.DateTimeField()
+    granularity = serializers.CharField()
+    endpoints = EndpointLatencySerializer(many=True)
+    keys = KeyLatencySerializer(many=True)
@@ -0,0 +1,26 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from users.models import User
+from .keycache import api_key_cache
+from .models import APIKey
+
+
+@receiver(post_save, sender=APIKey, dispatch_uid='api_key_cache_save')
+@receiver(post_delete, sender=APIKey, dispatch_uid='api_key_cache_delete')
+def invalidate_api_key_cache(sender, instance, **kwargs):
+    """
+    Drop cached keys when a key is saved (including rotate/deactivate) or deleted
+
+    Usage counters are written with queryset.update() and don't trigger this.
+    """
+    api_key_cache.invalidate()
+
+
+@receiver(post_save, sender=User, dispatch_uid='api_key_cache_user_save')
+def invalidate_api_key_cache_for_user(sender, instance, **kwargs):
+    """Cached keys carry their user; a deactivated user must stop authenticating"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'last_login', 'last_login_ip'}:
+        return
+    api_key_cache.invalidate()
@@ -0,0 +1,246 @@
+"""
+Pre-aggregated API key statistics
+
+Every flush of the usage recorder folds its entries into APIKeyUsageStat
+rows, one per key and hour plus one per key and day: request and
+status-class counters, requests per endpoint template and a latency
+histogram.
+The statistics endpoint reads only these rows for its time window, so its
+cost depends on the number of keys and periods, not on the size of the
+raw usage log.
+"""
+import re
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .histogram import LatencyHistogram
+from .models import APIKeyLatencyHistogram, APIKeyUsageLog, APIKeyUsageStat
+
+STATUS_FIELDS = ['status_2xx', 'status_3xx', 'status_4xx', 'status_5xx']
+COUNTER_FIELDS = ['request_count', 'total_response_time'] + STATUS_FIELDS
+OTHER_ENDPOINT = '(other)'
+
+# Windows up to this long are answered from hourly rows, longer ones from daily rows
+HOURLY_WINDOW_LIMIT = timedelta(hours=48)
+
+WINDOW_PATTERN = re.compile(r'^(\d+)([hd])$')
+
+ID_SEGMENT = re.compile(
+    r'^(\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})$', re.IGNORECASE
+)
+
+
+def endpoint_template(path):
+    """'/api/properties/42/' -> '/api/properties/{id}/' so detail routes are counted together"""
+    return '/'.join('{id}' if ID_SEGMENT.match(segment) else segment for segment in path.split('/'))[:500]
+
+
+def period_start(timestamp, granularity):
+    """Start (UTC) of the hour or day containing ``timestamp``"""
+    start = timestamp.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        start = start.replace(hour=0)
+    return start
+
+
+def status_field(status_code):
+    """Counter for the status class of ``status_code`` (1xx is counted as 2xx)"""
+    status_class = min(max(status_code // 100, 2), 5)
+    return f'status_{status_class}xx'
+
+
+def new_delta():
+    delta = dict.fromkeys(COUNTER_FIELDS, 0)
+    delta['endpoints'] = defaultdict(int)
+    delta['latency'] = LatencyHistogram()
+    return delta
+
+
+def merge_endpoints(counts, additions, limit):
+    """Add endpoint counts, folding endpoints beyond ``limit`` distinct ones into OTHER_ENDPOINT"""
+    for endpoint, count in additions.items():
+        if endpoint not in counts and len(counts) >= limit:
+            endpoint = OTHER_ENDPOINT
+        counts[endpoint] = counts.get(endpoint, 0) + count
+    return counts
+
+
+def lock_period_rows(model, key_fields, keys):
+    """
+    Create any missing rows for ``keys`` and lock them all; returns {key: row}
+
+    ``keys`` are tuples of values for ``key_fields`` (the model's unique
+    fields, starting with api_key_id and including period_start). Missing
+    rows are inserted with ignore_conflicts, then every row is locked in
+    primary key order, so concurrent writers from several processes
+    serialize instead of losing updates or deadlocking. The lock filters on
+    every key field, so rows of the same key and period that this batch does
+    not touch (other endpoints) stay unlocked. Must run inside a
+    transaction.
+    """
+    model.objects.bulk_create(
+        [model(**dict(zip(key_fields, key))) for key in sorted(keys)],
+        ignore_conflicts=True,
+    )
+    rows = model.objects.select_for_update().filter(**{
+        f'{field}__in': {key[index] for key in keys}
+        for index, field in enumerate(key_fields)
+    }).order_by('pk')
+
+    locked = {}
+    for row in rows:
+        key = tuple(getattr(row, field) for field in key_fields)
+        if key in keys:
+            locked[key] = row
+    return locked
+
+
+def record_usage_stats(entries):
+    """
+    Fold unsaved or saved APIKeyUsageLog entries into the hourly and daily stat rows
+
+    Must run inside a transaction (see lock_period_rows); the affected rows
+    are updated in one batch. Returns the number of stat rows updated.
+    """
+    deltas = defaultdict(new_delta)
+    for entry in entries:
+        endpoint = endpoint_template(entry.endpoint)
+        for granularity in ('hour', 'day'):
+            delta = deltas[(entry.api_key_id, granularity, period_start(entry.timestamp, granularity))]
+            delta['request_count'] += 1
+            delta[status_field(entry.status_code)] += 1
+            delta['total_response_time'] += entry.response_time
+            delta['endpoints'][endpoint] += 1
+            delta['latency'].add(entry.response_time)
+    if not deltas:
+        return 0
+
+    limit = getattr(settings, 'API_KEY_STATS_MAX_ENDPOINTS', 200)
+    rows = lock_period_rows(APIKeyUsageStat, ['api_key_id', 'granularity', 'period_start'], deltas)
+    for key, row in rows.items():
+        delta = deltas[key]
+        for field in COUNTER_FIELDS:
+            setattr(row, field, getattr(row, field) + delta[field])
+        row.endpoint_counts = merge_endpoints(row.endpoint_counts, delta['endpoints'], limit)
+        row.latency_histogram = LatencyHistogram.from_json(row.latency_histogram).merge(delta['latency']).to_json()
+
+    APIKeyUsageStat.objects.bulk_update(
+        rows.values(), COUNTER_FIELDS + ['endpoint_counts', 'latency_histogram']
+    )
+    return len(rows)
+
+
+def parse_window(value):
+    """'36h' / '7d' -> timedelta; raises ValueError for anything else"""
+    match = WINDOW_PATTERN.match(value or '')
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid window '{value}', expected e.g. '24h' or '7d'")
+    amount, unit = int(match.group(1)), match.group(2)
+    window = timedelta(hours=amount) if unit == 'h' else timedelta(days=amount)
+    max_days = getattr(settings, 'API_KEY_STATS_MAX_WINDOW_DAYS', 366)
+    if window > timedelta(days=max_days):
+        raise ValueError(f'Window cannot exceed {max_days} days')
+    return window
+
+
+def window_bounds(window, now=None):
+    """Granularity and first period start covering the last ``window`` (current period included)"""
+    now = now or timezone.now()
+    if window <= HOURLY_WINDOW_LIMIT:
+        return 'hour', period_start(now, 'hour') - window + timedelta(hours=1)
+    days = -(-window // timedelta(days=1))  # round up to whole days
+    return 'day', period_start(now, 'day') - timedelta(days=days - 1)
+
+
+def summarize(rows):
+    """Merge stat rows into one summary dict"""
+    totals = dict.fromkeys(COUNTER_FIELDS, 0)
+    endpoints = defaultdict(int)
+    latency = LatencyHistogram()
+    for row in rows:
+        for field in COUNTER_FIELDS:
+            totals[field] += row[field]
+        for endpoint, count in row['endpoint_counts'].items():
+            endpoints[endpoint] += count
+        latency.merge(row['latency_histogram'])
+
+    requests = totals['request_count']
+    return {
+        'requests': requests,
+        'status_classes': {field[len('status_'):]: totals[field] for field in STATUS_FIELDS},
+        'endpoints': dict(endpoints),
+        'response_time': {
+            'avg': totals['total_response_time'] / requests if requests else None,
+            **latency.percentiles([50, 95]),
+        },
+    }
+
+
+def window_statistics(api_key_filter, window, now=None):
+    """
+    Statistics for the keys matching ``api_key_filter`` over the last ``window``
+
+    ``api_key_filter`` is a dict of lookups relative to the api_key relation,
+    e.g. {'user': user}. Returns (granularity, start, overall summary,
+    {api_key_id: summary}) from a single query over the stat rows.
+    """
+    granularity, start = window_bounds(window, now)
+    key_lookups = {f'api_key__{field}': value for field, value in api_key_filter.items()}
+    rows = APIKeyUsageStat.objects.filter(
+        granularity=granularity, period_start__gte=start, **key_lookups
+    ).values('api_key_id', 'endpoint_counts', 'latency_histogram', *COUNTER_FIELDS).order_by()
+
+    by_key = defaultdict(list)
+    for row in rows:
+        by_key[row['api_key_id']].append(row)
+    overall = summarize(row for key_rows in by_key.values() for row in key_rows)
+    return granularity, start, overall, {
+        api_key_id: summarize(key_rows) for api_key_id, key_rows in by_key.items()
+    }
+
+
+def rebuild_usage_stats(since, batch_size=2000):
+    """
+    Recompute stat rows and latency histograms from raw usage logs from the day containing ``since``
+
+    Used to backfill after deployment; raw logs older than the retention
+    cutoff are gone, so earlier periods cannot be rebuilt.
+    Returns the number of log rows folded in.
+    """
+    from .latency import record_latency
+
+    start = period_start(since, 'day')
+    with transaction.atomic():
+        APIKeyUsageStat.objects.filter(period_start__gte=start).delete()
+        APIKeyLatencyHistogram.objects.filter(period_start__gte=start).delete()
+        logs = APIKeyUsageLog.objects.filter(timestamp__gte=start).order_by().only(
+            'api_key_id', 'endpoint', 'status_code', 'response_time', 'timestamp'
+        )
+        batch, total = [], 0
+        for entry in logs.iterator(chunk_size=batch_size):
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                record_usage_stats(batch)
+                record_latency(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            record_usage_stats(batch)
+            record_latency(batch)
+            total += len(batch)
+    return total
+
+
+def prune_usage_stats(hourly_days=None):
+    """Drop hourly stat and latency rows past API_KEY_STATS_HOURLY_RETENTION_DAYS; daily rows are kept"""
+    if hourly_days is None:
+        hourly_days = getattr(settings, 'API_KEY_STATS_HOURLY_RETENTION_DAYS', 14)
+    cutoff = period_start(timezone.now(), 'day') - timedelta(days=hourly_days)
+    return sum(
+        model.objects.filter(granularity='hour', period_start__lt=cutoff).delete()[0]
+        for model in (APIKeyUsageStat, APIKeyLatencyHistogram)
+    )
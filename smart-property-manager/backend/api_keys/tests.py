@@ -0,0 +1,338 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from users.models import User
+from .authentication import APIKeyAuthentication
+from .checks import check_rate_limit_cache
+from .keycache import api_key_cache
+from .models import APIKey, APIKeyUsageLog, APIKeyUsageStat
+from .network import IPAllowlist, get_client_ip, normalize_allowlist
+from .ratelimit import SlidingWindowRateLimiter
+from .recorder import UsageRecorder
+from .latency import endpoint_template, record_latency
+from .stats import record_usage_stats, window_statistics
+from .usage import apply_retention
+
+
+class APIKeyTestCase(TestCase):
+    """Creates a user and an API key for it; self.key holds the plain key"""
+
+    key_name = 'Integration'
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='keys', email='keys@example.com', password='pass1234'
+        )
+        self.key = APIKey.generate_key()
+        self.api_key = APIKey.objects.create(
+            user=self.user, name=self.key_name, key_prefix=self.key[:8], key_hash=APIKey.hash_key(self.key)
+        )
+
+
+class UsageRetentionTests(APIKeyTestCase):
+    """Statistics come from the aggregates, so they survive dropping raw logs"""
+
+    def log(self, age, endpoint='/api/properties/', status_code=200):
+        entry = APIKeyUsageLog.objects.create(
+            api_key=self.api_key, endpoint=endpoint, method='GET', ip_address='10.0.0.1',
+            status_code=status_code, response_time=0.05, timestamp=timezone.now() - age
+        )
+        record_usage_stats([entry])
+
+    def test_statistics_survive_retention(self):
+        for index in range(3):
+            self.log(timedelta(days=200), endpoint=f'/api/properties/{index}/')
+        self.log(timedelta(days=200), status_code=404)
+        self.log(timedelta(minutes=0), endpoint='/api/tenants/')
+
+        apply_retention(months=3)
+        self.assertEqual(APIKeyUsageLog.objects.count(), 1)
+        self.assertFalse(APIKeyUsageStat.objects.filter(granularity='hour', request_count=4).exists())
+
+        _, _, overall, _ = window_statistics({'user': self.user}, timedelta(days=300))
+        self.assertEqual(overall['endpoints'], {'/api/properties/{id}/': 3, '/api/properties/': 1, '/api/tenants/': 1})
+        self.assertEqual(overall['status_classes']['4xx'], 1)
+
+
+class UsageRecorderTests(APIKeyTestCase):
+    """Buffered usage entries are written in one batch with atomic usage counts"""
+
+    def setUp(self):
+        super().setUp()
+        # No background thread: each test drives flush() itself
+        self.recorder = UsageRecorder(background=False)
+
+    def entry(self):
+        return APIKeyUsageLog(
+            api_key=self.api_key, endpoint='/api/properties/', method='GET',
+            ip_address='10.0.0.1', status_code=200, response_time=0.01
+        )
+
+    @override_settings(API_USAGE_FLUSH_SIZE=1000, API_USAGE_FLUSH_INTERVAL_MS=60000)
+    def test_flush_writes_buffered_entries(self):
+        for _ in range(5):
+            self.recorder.record(self.entry())
+        self.assertFalse(APIKeyUsageLog.objects.exists())
+
+        self.assertEqual(self.recorder.flush(), 5)
+        self.assertEqual(APIKeyUsageLog.objects.count(), 5)
+        self.api_key.refresh_from_db()
+        self.assertEqual(self.api_key.usage_count, 5)
+        self.assertIsNotNone(self.api_key.last_used_at)
+
+    @override_settings(API_USAGE_LOG_SYNC=True)
+    def test_sync_mode_writes_immediately(self):
+        self.recorder.record(self.entry())
+        self.assertEqual(APIKeyUsageLog.objects.count(), 1)
+
+    @override_settings(API_USAGE_FLUSH_SIZE=1000, API_USAGE_FLUSH_INTERVAL_MS=60000)
+    def test_failed_aggregates_keep_raw_logs(self):
+        self.recorder.record(self.entry())
+        with mock.patch('api_keys.recorder.record_usage_stats', side_effect=OperationalError('deadlock')) as stats:
+            with self.assertLogs('api_keys.recorder', 'ERROR'):
+                self.recorder.flush()
+
+        self.assertEqual(stats.call_count, 2)
+        self.assertEqual(APIKeyUsageLog.objects.count(), 1)
+        self.api_key.refresh_from_db()
+        self.assertEqual(self.api_key.usage_count, 0)
+
+    @override_settings(API_USAGE_FLUSH_SIZE=1000, API_USAGE_FLUSH_INTERVAL_MS=60000)
+    def test_transient_error_is_retried(self):
+        self.recorder.record(self.entry())
+        with mock.patch('api_keys.recorder.record_latency', side_effect=[OperationalError('deadlock'), None]):
+            self.recorder.flush()
+
+        self.api_key.refresh_from_db()
+        self.assertEqual(self.api_key.usage_count, 1)
+
+
+class SlidingWindowRateLimiterTests(TestCase):
+    """The limiter never admits more than the limit and decays the previous window"""
+
+    def setUp(self):
+        # LocMem caches with the same name share one process-wide store
+        limiter_cache = LocMemCache('rate-limit-tests', {})
+        limiter_cache.clear()
+        self.limiter = SlidingWindowRateLimiter(cache=limiter_cache, window=3600)
+
+    def test_rejects_over_limit(self):
+        now = 7200.0
+        results = [self.limiter.hit('key', 5, now=now) for _ in range(7)]
+
+        self.assertEqual([result.allowed for result in results], [True] * 5 + [False] * 2)
+        self.assertEqual(results[0].remaining, 4)
+        self.assertEqual(results[4].remaining, 0)
+        self.assertEqual(results[-1].reset, 10800)
+        self.assertGreater(results[-1].retry_after, 0)
+
+    def test_previous_window_is_weighted(self):
+        for _ in range(10):
+            self.limiter.hit('key', 10, now=7200.0)
+
+        # Halfway through the next window half of the previous count still applies
+        results = [self.limiter.hit('key', 10, now=10800.0 + 1800) for _ in range(6)]
+        self.assertEqual([result.allowed for result in results], [True] * 5 + [False])
+
+    @override_settings(DEBUG=False)
+    def test_unshared_cache_is_reported(self):
+        with mock.patch('api_keys.checks.cache_is_shared', lambda alias='default': False):
+            self.assertEqual([warning.id for warning in check_rate_limit_cache(None)], ['api_keys.W001'])
+        with mock.patch('api_keys.checks.cache_is_shared', lambda alias='default': True):
+            self.assertEqual(check_rate_limit_cache(None), [])
+
+
+# LocMem stands in for a shared cache here: the test run is a single process
+@override_settings(API_KEY_CACHE_ENABLED=True)
+@mock.patch('api_keys.keycache.cache_is_shared', lambda alias='default': True)
+class APIKeyAuthenticationCacheTests(APIKeyTestCase):
+    """Repeat authentications are served from the in-process key cache"""
+
+    def setUp(self):
+        cache.clear()
+        api_key_cache.invalidate()
+        super().setUp()
+
+    def authenticate(self):
+        request = Request(APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'ApiKey {self.key}'))
+        return APIKeyAuthentication().authenticate(request)
+
+    def test_second_request_skips_the_database(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user, api_key = self.authenticate()
+        self.assertEqual(user, self.user)
+        self.assertEqual(api_key.pk, self.api_key.pk)
+
+    def test_deactivation_invalidates(self):
+        self.authenticate()
+        self.api_key.deactivate()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_disabled_without_a_shared_cache(self):
+        self.authenticate()
+        with mock.patch('api_keys.keycache.cache_is_shared', lambda alias='default': False):
+            with self.assertNumQueries(1):
+                self.authenticate()
+
+    def test_invalid_allowlist_denies_instead_of_failing(self):
+        # Rows saved before allowed_ips was validated
+        APIKey.objects.filter(pk=self.api_key.pk).update(allowed_ips='10.0.0.1;10.0.0.2')
+        api_key_cache.invalidate()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+        self.api_key.refresh_from_db()
+        self.api_key.deactivate()
+        self.assertFalse(APIKey.objects.get(pk=self.api_key.pk).is_active)
+
+
+class IPAllowlistTests(TestCase):
+    """Compiled allowlists match IPv4/IPv6 addresses and CIDR ranges"""
+
+    def test_cidr_membership(self):
+        allowlist = IPAllowlist.compile('10.0.0.0/8, 192.168.1.5, 2001:db8::/32')
+        self.assertIn('10.20.30.40', allowlist)
+        self.assertIn('192.168.1.5', allowlist)
+        self.assertIn('2001:db8::1', allowlist)
+        self.assertIn('::ffff:10.1.1.1', allowlist)
+        self.assertNotIn('11.0.0.1', allowlist)
+        self.assertNotIn('2001:db9::1', allowlist)
+        self.assertNotIn('not-an-ip', allowlist)
+
+    def test_empty_allowlist_is_unrestricted(self):
+        self.assertIn('203.0.113.7', IPAllowlist.compile(''))
+
+    def test_lenient_compile_skips_invalid_entries(self):
+        allowlist = IPAllowlist.compile('10.0.0.1, office-gateway', strict=False)
+        self.assertEqual(allowlist.invalid, ['office-gateway'])
+        self.assertIn('10.0.0.1', allowlist)
+        self.assertNotIn('10.0.0.2', allowlist)
+        # Nothing valid left must deny everything, not allow everything
+        self.assertNotIn('10.0.0.1', IPAllowlist.compile('10.0.0.1;10.0.0.2', strict=False))
+        with self.assertRaises(ValueError):
+            IPAllowlist.compile('office-gateway')
+
+    def test_normalization(self):
+        self.assertEqual(
+            normalize_allowlist('10.0.0.1/24, 10.0.0.5, 1.2.3.4,1.2.3.4, ::1'),
+            '1.2.3.4,10.0.0.0/24,::1'
+        )
+        with self.assertRaises(ValueError):
+            normalize_allowlist('10.0.0.300')
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.0/8'])
+    def test_forwarded_for_only_from_trusted_proxies(self):
+        factory = APIRequestFactory()
+        proxied = factory.get('/', REMOTE_ADDR='10.0.0.2', HTTP_X_FORWARDED_FOR='6.6.6.6, 1.2.3.4, 10.0.0.9')
+        direct = factory.get('/', REMOTE_ADDR='5.5.5.5', HTTP_X_FORWARDED_FOR='6.6.6.6')
+        self.assertEqual(get_client_ip(proxied), '1.2.3.4')
+        self.assertEqual(get_client_ip(direct), '5.5.5.5')
+
+
+class UsageStatisticsTests(APIKeyTestCase):
+    """Usage is pre-aggregated per key and period, and statistics read only the aggregates"""
+
+    key_name = 'Stats'
+
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        record_usage_stats([
+            APIKeyUsageLog(
+                api_key=self.api_key, endpoint='/api/properties/', method='GET', ip_address='10.0.0.1',
+                status_code=200 if i < 8 else 503, response_time=0.01 * (i + 1), timestamp=now
+            )
+            for i in range(10)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_hourly_and_daily_rows(self):
+        self.assertEqual(APIKeyUsageStat.objects.count(), 2)
+        for stat in APIKeyUsageStat.objects.all():
+            self.assertEqual(stat.request_count, 10)
+            self.assertEqual((stat.status_2xx, stat.status_5xx), (8, 2))
+            self.assertEqual(stat.endpoint_counts, {'/api/properties/': 10})
+
+    def test_statistics_window(self):
+        response = self.client.get('/api/api-keys/keys/statistics/', {'window': '24h'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['granularity'], 'hour')
+        self.assertEqual(response.data['window_requests'], 10)
+        self.assertEqual(response.data['usage_by_status']['5xx'], 2)
+        self.assertAlmostEqual(response.data['response_time']['p50'], 0.05, delta=0.005)
+        self.assertEqual(response.data['window_by_key']['Stats']['requests'], 10)
+
+        response = self.client.get('/api/api-keys/keys/statistics/', {'window': '30d'})
+        self.assertEqual(response.data['granularity'], 'day')
+        self.assertEqual(response.data['window_requests'], 10)
+
+    def test_invalid_window(self):
+        response = self.client.get('/api/api-keys/keys/statistics/', {'window': 'forever'})
+        self.assertEqual(response.status_code, 400)
+
+
+class LatencyHistogramTests(APIKeyTestCase):
+    """Per-endpoint latency histograms merge across flushes and report percentiles"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def entries(self, path, times):
+        return [
+            APIKeyUsageLog(
+                api_key=self.api_key, endpoint=path, method='GET', ip_address='10.0.0.1',
+                status_code=200, response_time=response_time, timestamp=timezone.now()
+            )
+            for response_time in times
+        ]
+
+    def test_endpoint_template(self):
+        self.assertEqual(endpoint_template('/api/properties/42/'), '/api/properties/{id}/')
+        self.assertEqual(
+            endpoint_template('/api/leases/0b9e7c1e-6d1f-4a55-9f43-2f6f0c7a1d2e/renew/'),
+            '/api/leases/{id}/renew/'
+        )
+
+    def test_percentiles_per_endpoint(self):
+        # Separate flushes (as from several workers) land in the same histogram rows
+        for path, times in (('/api/properties/1/', [0.01] * 90), ('/api/properties/2/', [1.0] * 10),
+                            ('/api/tenants/', [0.02] * 10)):
+            entries = self.entries(path, times)
+            record_usage_stats(entries)
+            record_latency(entries)
+
+        response = self.client.get('/api/api-keys/keys/latency/', {'window': '24h'})
+        self.assertEqual(response.status_code, 200)
+        slowest = response.data['endpoints'][0]
+        self.assertEqual(slowest['endpoint'], '/api/properties/{id}/')
+        self.assertEqual(slowest['requests'], 100)
+        self.assertAlmostEqual(slowest['p50'], 0.01, delta=0.001)
+        self.assertAlmostEqual(slowest['p99'], 1.0, delta=0.1)
+        self.assertEqual(response.data['keys'][0]['requests'], 110)
+
+        response = self.client.get('/api/api-keys/keys/latency/', {'window': '24h', 'endpoint': '/api/tenants/'})
+        self.assertEqual(response.data['keys'][0]['requests'], 10)
+
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_flush_locks_only_touched_rows(self):
+        record_latency(self.entries('/api/tenants/', [0.02]))
+        with CaptureQueriesContext(connection) as queries:
+            record_latency(self.entries('/api/properties/', [0.01]))
+        locking = [query['sql'] for query in queries.captured_queries if 'FOR UPDATE' in query['sql']]
+        self.assertEqual(len(locking), 1)
+        self.assertIn('"endpoint" IN', locking[0])
@@ -0,0 +1,25 @@
+from rest_framework.throttling import BaseThrottle
+from .models import APIKey
+from .ratelimit import rate_limiter
+
+
+class APIKeyRateThrottle(BaseThrottle):
+    """
+    Per-key sliding-window rate limit (APIKey.rate_limit requests per hour)
+    
+    Runs after authentication, so the key is always known. The result is
+    stored on the underlying HttpRequest so APIKeyMiddleware can add
+    X-RateLimit-* headers to the response.
+    """
+    
+    def allow_request(self, request, view):
+        api_key = request.auth
+        if not isinstance(api_key, APIKey):
+            return True  # JWT/session requests are not rate limited here
+        
+        self.result = rate_limiter.hit(api_key.id, api_key.rate_limit)
+        request._request.rate_limit = self.result
+        return self.result.allowed
+    
+    def wait(self):
+        return self.result.retry_after
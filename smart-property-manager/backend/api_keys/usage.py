@@ -0,0 +1,51 @@
+"""
+Retention for APIKeyUsageLog
+
+apply_retention() prepares upcoming monthly partitions and drops raw usage
+logs past API_USAGE_LOG_RETENTION_MONTHS. Statistics do not depend on the
+raw rows: they are read from the APIKeyUsageStat and APIKeyLatencyHistogram
+aggregates written by the usage recorder (see stats.py and latency.py).
+"""
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import APIKeyUsageLog
+from .partitions import add_months, drop_expired_partitions, ensure_partitions, is_partitioned
+from .stats import prune_usage_stats
+
+
+def retention_cutoff(months=None):
+    """First day of the oldest month kept by the retention policy"""
+    months = months if months is not None else getattr(settings, 'API_USAGE_LOG_RETENTION_MONTHS', 3)
+    today = timezone.now().date()
+    return add_months(today.replace(day=1), -months)
+
+
+def apply_retention(months=None, months_ahead=2, batch_size=10000):
+    """
+    Prune hourly statistics, prepare upcoming partitions and drop expired raw logs
+
+    Returns a dict describing what was done.
+    """
+    cutoff = retention_cutoff(months)
+    cutoff_at = datetime.combine(cutoff, time.min, tzinfo=dt_timezone.utc)
+    result = {
+        'stats_pruned': prune_usage_stats(),
+        'cutoff': cutoff, 'created': [], 'dropped': [], 'deleted': 0
+    }
+
+    if is_partitioned():
+        result['created'] = ensure_partitions(cutoff, months_ahead)
+        result['dropped'] = drop_expired_partitions(cutoff)
+        return result
+
+    while True:
+        ids = list(
+            APIKeyUsageLog.objects.filter(timestamp__lt=cutoff_at).order_by().values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        result['deleted'] += APIKeyUsageLog.objects.filter(id__in=ids).delete()[0]
+    return result
@@ -3,9 +3,13 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Sum
+from config.pagination import LogCursorPagination
+from django.conf import settings
+from django.db.models import Count, Q, Sum
 from django.utils import timezone
 from .models import APIKey, APIKeyUsageLog
+from .latency import latency_report
+from .stats import parse_window, window_statistics
 from .serializers import (
     APIKeySerializer,
     APIKeyListSerializer,
@@ -13,7 +17,8 @@ from .serializers import (
     UpdateAPIKeySerializer,
     APIKeyResponseSerializer,
     APIKeyUsageLogSerializer,
-    APIKeyStatisticsSerializer
+    APIKeyStatisticsSerializer,
+    APIKeyLatencySerializer
 )
 
 
@@ -128,24 +133,32 @@ class APIKeyViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        """Get API key statistics"""
-        queryset = self.get_queryset()
+        """
+        Get API key statistics
         
-        total_keys = queryset.count()
-        active_keys = queryset.filter(is_active=True).count()
-        inactive_keys = queryset.filter(is_active=False).count()
+        Usage figures cover the last ``?window=`` (e.g. 24h, 7d; defaults to
+        API_KEY_STATS_DEFAULT_WINDOW) and are read from the pre-aggregated
+        hourly/daily statistics, never from the raw usage log.
+        """
+        window_param = request.query_params.get('window', settings.API_KEY_STATS_DEFAULT_WINDOW)
+        try:
+            window = parse_window(window_param)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Count expired keys
+        queryset = self.get_queryset()
         now = timezone.now()
-        expired_keys = queryset.filter(expires_at__lt=now).count()
-        
-        # Total usage
-        total_usage = queryset.aggregate(total=Sum('usage_count'))['total'] or 0
+        counts = queryset.aggregate(
+            total_keys=Count('id'),
+            active_keys=Count('id', filter=Q(is_active=True)),
+            inactive_keys=Count('id', filter=Q(is_active=False)),
+            expired_keys=Count('id', filter=Q(expires_at__lt=now)),
+            total_usage=Sum('usage_count')
+        )
         
-        # Usage by key
-        usage_by_key = {}
-        for key in queryset:
-            usage_by_key[key.name] = key.usage_count
+        # Lifetime usage by key
+        names = dict(queryset.values_list('id', 'name'))
+        usage_by_key = dict(queryset.values_list('name', 'usage_count'))
         
         # Recent usage logs
         recent_logs = APIKeyUsageLog.objects.filter(
@@ -153,37 +166,78 @@ class APIKeyViewSet(viewsets.ModelViewSet):
         ).order_by('-timestamp')[:20]
         recent_usage = APIKeyUsageLogSerializer(recent_logs, many=True).data
         
-        # Usage by endpoint
-        usage_by_endpoint = {}
-        endpoint_stats = APIKeyUsageLog.objects.filter(
-            api_key__user=request.user
-        ).values('endpoint').annotate(count=Count('id'))
-        for stat in endpoint_stats:
-            usage_by_endpoint[stat['endpoint']] = stat['count']
-        
-        # Usage by status code
-        usage_by_status = {}
-        status_stats = APIKeyUsageLog.objects.filter(
-            api_key__user=request.user
-        ).values('status_code').annotate(count=Count('id'))
-        for stat in status_stats:
-            usage_by_status[str(stat['status_code'])] = stat['count']
+        # Window statistics from the pre-aggregated rows
+        granularity, window_start, overall, by_key = window_statistics({'user': request.user}, window, now)
         
         data = {
-            'total_keys': total_keys,
-            'active_keys': active_keys,
-            'inactive_keys': inactive_keys,
-            'expired_keys': expired_keys,
-            'total_usage': total_usage,
+            'total_keys': counts['total_keys'],
+            'active_keys': counts['active_keys'],
+            'inactive_keys': counts['inactive_keys'],
+            'expired_keys': counts['expired_keys'],
+            'total_usage': counts['total_usage'] or 0,
             'usage_by_key': usage_by_key,
             'recent_usage': recent_usage,
-            'usage_by_endpoint': usage_by_endpoint,
-            'usage_by_status': usage_by_status
+            'window': window_param,
+            'window_start': window_start,
+            'granularity': granularity,
+            'window_requests': overall['requests'],
+            'usage_by_endpoint': overall['endpoints'],
+            'usage_by_status': overall['status_classes'],
+            'response_time': overall['response_time'],
+            'window_by_key': {
+                names.get(api_key_id, str(api_key_id)): summary
+                for api_key_id, summary in by_key.items()
+            }
         }
         
         serializer = APIKeyStatisticsSerializer(data)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def latency(self, request):
+        """
+        Response time percentiles (p50/p90/p99) per endpoint and per key
+        
+        Query params: window (e.g. 24h, 7d), api_key (id), endpoint (path),
+        limit (number of endpoints, slowest p99 first).
+        """
+        window_param = request.query_params.get('window', settings.API_KEY_STATS_DEFAULT_WINDOW)
+        try:
+            window = parse_window(window_param)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        api_key_filter = {'user': request.user}
+        try:
+            limit = int(request.query_params.get('limit', 50))
+            if request.query_params.get('api_key'):
+                api_key_filter['pk'] = int(request.query_params['api_key'])
+        except ValueError:
+            return Response(
+                {'error': 'limit and api_key must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        names = dict(self.get_queryset().values_list('id', 'name'))
+        granularity, window_start, by_endpoint, by_key = latency_report(
+            api_key_filter, window, endpoint=request.query_params.get('endpoint')
+        )
+        
+        slowest = sorted(by_endpoint.items(), key=lambda item: item[1]['p99'], reverse=True)[:max(limit, 1)]
+        data = {
+            'window': window_param,
+            'window_start': window_start,
+            'granularity': granularity,
+            'endpoints': [{'endpoint': endpoint, **summary} for endpoint, summary in slowest],
+            'keys': [
+                {'id': key_id, 'name': names.get(key_id, ''), **summary}
+                for key_id, summary in sorted(by_key.items(), key=lambda item: item[1]['p99'], reverse=True)
+            ]
+        }
+        
+        serializer = APIKeyLatencySerializer(data)
+        return Response(serializer.data)
+    
     @action(detail=False, methods=['get'])
     def verify(self, request):
         """Verify if an API key is valid"""
@@ -233,6 +287,8 @@ class APIKeyUsageLogViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['endpoint', 'ip_address']
     ordering_fields = ['timestamp', 'response_time', 'status_code']
     ordering = ['-timestamp']
+    pagination_class = LogCursorPagination
+    cursor_ordering_fields = ['timestamp']
     
     def get_queryset(self):
         # Users can only see logs for their own API keys
@@ -0,0 +1,16 @@
+"""
+Helpers for features that coordinate workers through the Django cache
+
+Cross-process invalidation (API key cache, template registry), the unread
+counters and the API key rate limiter all rely on every worker seeing the
+same cache. The default per-process LocMem cache (no REDIS_URL) does not
+give them that, so they check cache_is_shared() before relying on it.
+"""
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def cache_is_shared(alias='default'):
+    """True when the cache is visible to every worker process, not held in process memory"""
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
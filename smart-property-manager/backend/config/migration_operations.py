@@ -0,0 +1,70 @@
+"""
+Index operations for migrations on hot tables
+
+On PostgreSQL the index is built or dropped with CREATE/DROP INDEX
+CONCURRENTLY, so writes to the table are not blocked while it runs; the
+migration must set ``atomic = False``. Other backends (SQLite in tests)
+have no concurrent variant and run the plain AddIndex/RemoveIndex.
+
+Unlike django.contrib.postgres.operations these do not import the
+PostgreSQL driver, so migrations using them load on every backend.
+"""
+from django.db import NotSupportedError
+from django.db.migrations.operations import AddIndex, RemoveIndex
+
+
+def _concurrently(schema_editor):
+    """Whether to use the CONCURRENTLY variant; refuses to run inside a transaction"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return False
+    if schema_editor.connection.in_atomic_block:
+        raise NotSupportedError(
+            'Concurrent index operations cannot run inside a transaction; set atomic = False on the migration.'
+        )
+    return True
+
+
+class AddIndexConcurrently(AddIndex):
+    """AddIndex that builds the index concurrently on PostgreSQL"""
+
+    def describe(self):
+        return f'Create index {self.index.name} on {self.model_name} (concurrently on PostgreSQL)'
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not _concurrently(schema_editor):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not _concurrently(schema_editor):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+
+
+class RemoveIndexConcurrently(RemoveIndex):
+    """RemoveIndex that drops the index concurrently on PostgreSQL"""
+
+    def describe(self):
+        return f'Remove index {self.name} from {self.model_name} (concurrently on PostgreSQL)'
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not _concurrently(schema_editor):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            from_model_state = from_state.models[app_label, self.model_name_lower]
+            index = from_model_state.get_index_by_name(self.name)
+            schema_editor.remove_index(model, index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not _concurrently(schema_editor):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            to_model_state = to_state.models[app_label, self.model_name_lower]
+            index = to_model_state.get_index_by_name(self.name)
+            schema_editor.add_index(model, index, concurrently=True)
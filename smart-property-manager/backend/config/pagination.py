@@ -0,0 +1,159 @@
+"""
+Shared pagination classes
+
+Page-number pagination runs COUNT(*) and an OFFSET that grows with the page
+number. Cursor (keyset) pagination seeks on the ordering column instead, so
+deep pages cost the same as the first one as long as the ordering matches an
+index such as (user, created_at), (api_key, timestamp) or (date, id).
+"""
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination, _reverse_ordering
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination that follows the view's ordering
+
+    When the view uses OrderingFilter, DRF takes the ordering from it (the
+    view's default ``ordering`` or ``?ordering=``); ``ordering`` below is
+    only the fallback. Only fields listed in the view's
+    ``cursor_ordering_fields`` (columns an index leads with) can be paged
+    by cursor, and the primary key is always added as a tiebreaker: the
+    cursor holds the (value, pk) of the last row, so runs of equal values
+    never fall back to an offset and rows are neither skipped nor repeated.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = '-created_at'
+
+    def get_ordering(self, request, queryset, view):
+        order = super().get_ordering(request, queryset, view)[0]
+        field = order.lstrip('-')
+        allowed = getattr(view, 'cursor_ordering_fields', [self.ordering.lstrip('-')])
+        if field not in allowed:
+            raise ValidationError({
+                'ordering': f"Cursor pagination supports ordering by {', '.join(allowed)} only"
+            })
+        tiebreaker = '-pk' if order.startswith('-') else 'pk'
+        return (order, tiebreaker)
+
+    def _get_position_from_instance(self, instance, ordering):
+        field_name = ordering[0].lstrip('-')
+        if isinstance(instance, dict):
+            value, pk = instance[field_name], instance.get('pk', instance.get('id'))
+        else:
+            value, pk = getattr(instance, field_name), instance.pk
+        return json.dumps([str(value), pk])
+
+    def _after_position(self, queryset, position, reverse):
+        """Rows following ``position`` in the current paging direction"""
+        try:
+            value, pk = json.loads(position)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        order = self.ordering[0]
+        lookup = 'lt' if reverse != order.startswith('-') else 'gt'
+        field = order.lstrip('-')
+        return queryset.filter(
+            Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'pk__{lookup}': pk})
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Same as CursorPagination.paginate_queryset, filtering on (value, pk)
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = self._after_position(queryset, current_position, reverse)
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+class LogCursorPagination(KeysetPagination):
+    """Default pagination for append-only log endpoints, newest first"""
+    ordering = '-timestamp'
+
+
+class OptInCursorPagination(PageNumberPagination):
+    """
+    Page-number pagination that switches to keyset pagination per request
+
+    Passing ``?cursor=`` (an empty value requests the first page) returns
+    ``next``/``previous`` cursor links instead of ``count`` and page numbers.
+    Existing clients that use ``?page=`` are unaffected.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_pagination_class = KeysetPagination
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_pagination_class.cursor_query_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_html_context()
+        return super().get_html_context()
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
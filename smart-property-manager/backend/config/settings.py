@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
+import json
 import os
 from dotenv import load_dotenv
 
@@ -166,6 +167,9 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api_keys.throttling.APIKeyRateThrottle',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
@@ -188,3 +192,63 @@ CORS_ALLOWED_ORIGINS = os.getenv(
 ).split(',')
 
 CORS_ALLOW_CREDENTIALS = True
+
+# Cache: Redis when REDIS_URL is set, per-process memory otherwise
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            },
+        }
+    }
+
+# Notification dispatch: fan-out runs on a background thread after commit
+NOTIFICATION_DISPATCH_ASYNC = os.getenv('NOTIFICATION_DISPATCH_ASYNC', 'True') == 'True'
+NOTIFICATION_DISPATCH_BATCH_SIZE = int(os.getenv('NOTIFICATION_DISPATCH_BATCH_SIZE', '100'))
+NOTIFICATION_UNREAD_CACHE_TIMEOUT = int(os.getenv('NOTIFICATION_UNREAD_CACHE_TIMEOUT', '300'))
+# Outbox: seconds before the first retry of a failed delivery (doubling per
+# attempt) and days sent rows are kept before drain_notification_outbox purges them
+NOTIFICATION_OUTBOX_RETRY_DELAY = int(os.getenv('NOTIFICATION_OUTBOX_RETRY_DELAY', '30'))
+NOTIFICATION_OUTBOX_RETENTION_DAYS = int(os.getenv('NOTIFICATION_OUTBOX_RETENTION_DAYS', '7'))
+
+# API key usage logs: raw rows are kept for this many full months (older
+# monthly partitions are dropped); daily statistics rows are kept indefinitely
+API_USAGE_LOG_RETENTION_MONTHS = int(os.getenv('API_USAGE_LOG_RETENTION_MONTHS', '3'))
+
+# API key usage logs are buffered in memory and flushed in batches
+API_USAGE_LOG_SYNC = os.getenv('API_USAGE_LOG_SYNC', 'False') == 'True'
+API_USAGE_FLUSH_SIZE = int(os.getenv('API_USAGE_FLUSH_SIZE', '500'))
+API_USAGE_FLUSH_INTERVAL_MS = int(os.getenv('API_USAGE_FLUSH_INTERVAL_MS', '1000'))
+
+# In-process cache of authenticated API keys. Revocations reach other workers
+# through the shared cache, so it is only enabled when REDIS_URL is set
+API_KEY_CACHE_ENABLED = os.getenv('API_KEY_CACHE_ENABLED', 'True' if REDIS_URL else 'False') == 'True'
+API_KEY_CACHE_SIZE = int(os.getenv('API_KEY_CACHE_SIZE', '1024'))
+API_KEY_CACHE_TTL = int(os.getenv('API_KEY_CACHE_TTL', '60'))
+
+# Proxies whose X-Forwarded-For header is trusted for the client IP
+TRUSTED_PROXIES = [ip.strip() for ip in os.getenv('TRUSTED_PROXIES', '127.0.0.1,::1').split(',') if ip.strip()]
+
+# Pre-aggregated API key statistics
+API_KEY_STATS_DEFAULT_WINDOW = os.getenv('API_KEY_STATS_DEFAULT_WINDOW', '7d')
+API_KEY_STATS_MAX_WINDOW_DAYS = int(os.getenv('API_KEY_STATS_MAX_WINDOW_DAYS', '366'))
+API_KEY_STATS_MAX_ENDPOINTS = int(os.getenv('API_KEY_STATS_MAX_ENDPOINTS', '200'))
+API_KEY_STATS_HOURLY_RETENTION_DAYS = int(os.getenv('API_KEY_STATS_HOURLY_RETENTION_DAYS', '14'))
+
+# Live notification stream (SSE): 'memory' delivers within one process, 'redis' across workers
+NOTIFICATION_STREAM_BACKEND = os.getenv('NOTIFICATION_STREAM_BACKEND', 'redis' if REDIS_URL else 'memory')
+NOTIFICATION_STREAM_HEARTBEAT = int(os.getenv('NOTIFICATION_STREAM_HEARTBEAT', '15'))
+NOTIFICATION_STREAM_MAX_AGE = int(os.getenv('NOTIFICATION_STREAM_MAX_AGE', '300'))
+NOTIFICATION_STREAM_QUEUE_SIZE = int(os.getenv('NOTIFICATION_STREAM_QUEUE_SIZE', '100'))
+NOTIFICATION_STREAM_RETRY_MS = int(os.getenv('NOTIFICATION_STREAM_RETRY_MS', '3000'))
+# Seconds a ticket from notifications/stream_ticket/ can be used to open the stream
+NOTIFICATION_STREAM_TICKET_TTL = int(os.getenv('NOTIFICATION_STREAM_TICKET_TTL', '30'))
+
+# Notification expiry: {notification_type: days}. TTL sets expires_at on creation;
+# read notifications are deleted after their type's (or 'default') retention, null keeps them
+NOTIFICATION_TTL_DAYS = json.loads(os.getenv('NOTIFICATION_TTL_DAYS', '{"digest": 30, "report_ready": 30}'))
+NOTIFICATION_READ_RETENTION_DAYS = json.loads(os.getenv('NOTIFICATION_READ_RETENTION_DAYS', '{"default": 90}'))
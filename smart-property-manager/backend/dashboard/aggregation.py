@@ -0,0 +1,349 @@
+from django.db.models import Sum, Count, Avg, Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+from datetime import timedelta
+
+from properties.models import Property
+from properties.snapshot import get_global_snapshot
+from tenants.models import Tenant
+from leases.models import Lease
+from financials.models import Payment, Transaction
+from financials.rollups import windowed_totals
+from maintenance.models import MaintenanceRequest
+from documents.models import Document
+from notifications.models import Notification
+
+
+class DashboardAggregator:
+    """
+    Computes dashboard statistics with one conditional-aggregate query per table
+
+    Property, tenant, lease and payment figures are read from the global
+    portfolio snapshot; only the date-dependent lease expirations are
+    counted live. Every other module's counters are folded into a single
+    aggregate() call using Count(filter=Q(...)) / Sum(filter=Q(...)), so
+    the number of queries is fixed regardless of how many statuses or
+    windows are reported.
+    """
+
+    def __init__(self, user, days=30):
+        self.user = user
+        self.days = days
+        self.now = timezone.now()
+        self.today = self.now.date()
+        self.start_date = self.now - timedelta(days=days)
+        self.previous_start = self.start_date - timedelta(days=days)
+
+    @cached_property
+    def snapshot(self):
+        """The global portfolio snapshot, or None before it has been built"""
+        return get_global_snapshot()
+
+    def property_stats(self):
+        """Portfolio totals and averages, read from the global snapshot when available"""
+        snapshot = self.snapshot
+        if snapshot is not None:
+            totals = {
+                'total_properties': snapshot.property_count,
+                'total_value': snapshot.total_value,
+                'total_units': snapshot.total_units,
+                'occupied_units': snapshot.occupied_units,
+                'average_occupancy': snapshot.average_occupancy,
+                'average_roi': snapshot.average_roi,
+            }
+        else:
+            totals = self._live_property_totals()
+
+        stats = {
+            'total_properties': totals['total_properties'],
+            'total_value': float(totals['total_value'] or 0),
+            'total_units': totals['total_units'] or 0,
+            'occupied_units': totals['occupied_units'] or 0,
+            'average_occupancy': totals['average_occupancy'] or 0,
+            'average_roi': totals['average_roi'] or 0,
+        }
+
+        # Calculate overall occupancy percentage
+        if stats['total_units'] > 0:
+            stats['occupancy_percentage'] = round(
+                (stats['occupied_units'] / stats['total_units']) * 100, 2
+            )
+        else:
+            stats['occupancy_percentage'] = 0
+
+        return stats
+
+    def _live_property_totals(self):
+        return Property.objects.with_metrics().aggregate(
+            total_properties=Count('id'),
+            total_value=Sum('current_value'),
+            total_units=Sum('total_units'),
+            occupied_units=Sum('occupied_units'),
+            average_occupancy=Avg('occupancy_rate'),
+            average_roi=Avg('roi'),
+        )
+
+    def tenant_stats(self):
+        """Tenant counts by status and contact completeness"""
+        snapshot = self.snapshot
+        if snapshot is not None:
+            return {
+                'total_tenants': snapshot.tenant_count,
+                'active_tenants': snapshot.active_tenant_count,
+                'inactive_tenants': snapshot.inactive_tenant_count,
+                'tenants_with_email': snapshot.tenant_with_email_count,
+                'tenants_with_emergency_contact': snapshot.tenant_with_emergency_contact_count,
+            }
+        return Tenant.objects.aggregate(
+            total_tenants=Count('id'),
+            active_tenants=Count('id', filter=Q(status='active')),
+            inactive_tenants=Count('id', filter=Q(status='inactive')),
+            tenants_with_email=Count(
+                'id', filter=Q(email__isnull=False) & ~Q(email='')
+            ),
+            tenants_with_emergency_contact=Count(
+                'id', filter=Q(emergency_contact_name__isnull=False) & ~Q(emergency_contact_name='')
+            ),
+        )
+
+    def lease_stats(self):
+        """
+        Lease counts by status and upcoming expirations (next 30 days)
+
+        The expirations depend on today's date, so they are always counted
+        live; the status counts come from the snapshot when available.
+        """
+        upcoming_date = self.today + timedelta(days=30)
+        expiring = Q(
+            end_date__lte=upcoming_date,
+            end_date__gte=self.today,
+            status__in=['active', 'expiring_soon']
+        )
+        snapshot = self.snapshot
+        if snapshot is not None:
+            return {
+                'total_leases': snapshot.lease_count,
+                'active_leases': snapshot.active_lease_count,
+                'expiring_soon': snapshot.expiring_soon_lease_count,
+                'expired_leases': snapshot.expired_lease_count,
+                'pending_leases': snapshot.pending_lease_count,
+                'expiring_next_30_days': Lease.objects.filter(expiring).count(),
+            }
+        return Lease.objects.aggregate(
+            total_leases=Count('id'),
+            active_leases=Count('id', filter=Q(status='active')),
+            expiring_soon=Count('id', filter=Q(status='expiring_soon')),
+            expired_leases=Count('id', filter=Q(status='expired')),
+            pending_leases=Count('id', filter=Q(status='pending')),
+            expiring_next_30_days=Count('id', filter=expiring),
+        )
+
+    def payment_stats(self):
+        """Payment totals and counts by status"""
+        snapshot = self.snapshot
+        if snapshot is not None:
+            payments = {
+                'total_due': snapshot.payment_amount_due,
+                'total_paid': snapshot.payment_amount_paid,
+                'pending_payments': snapshot.pending_payment_count,
+                'overdue_payments': snapshot.overdue_payment_count,
+                'paid_payments': snapshot.paid_payment_count,
+            }
+        else:
+            payments = Payment.objects.aggregate(
+                total_due=Sum('amount_due'),
+                total_paid=Sum('amount_paid'),
+                pending_payments=Count('id', filter=Q(status='pending')),
+                overdue_payments=Count('id', filter=Q(status='overdue')),
+                paid_payments=Count('id', filter=Q(status='paid')),
+            )
+        return {
+            'total_due': float(payments['total_due'] or 0),
+            'total_paid': float(payments['total_paid'] or 0),
+            'pending_payments': payments['pending_payments'],
+            'overdue_payments': payments['overdue_payments'],
+            'paid_payments': payments['paid_payments'],
+        }
+
+    def _period_totals(self, kind):
+        """
+        Current and previous period totals and counts for a ledger
+
+        The current window is open-ended like the transaction count, so
+        future-dated entries are included.
+        """
+        start = self.start_date.date()
+        windows = {
+            'current': (start, None),
+            'previous': (self.previous_start.date(), start - timedelta(days=1)),
+        }
+        totals = windowed_totals(kind, windows)
+        return {
+            'total': totals['current']['total'],
+            'count': totals['current']['count'],
+            'previous_total': totals['previous']['total'],
+        }
+
+    def financial_stats(self):
+        """Revenue, expense, transaction and payment figures for the date range"""
+        revenue = self._period_totals('revenue')
+        expense = self._period_totals('expense')
+        transaction_count = Transaction.objects.filter(date__gte=self.start_date).count()
+        payment_stats = self.payment_stats()
+
+        total_revenue = revenue['total'] or 0
+        total_expenses = expense['total'] or 0
+        net_income = float(total_revenue) - float(total_expenses)
+
+        stats = {
+            'total_revenue': float(total_revenue),
+            'total_expenses': float(total_expenses),
+            'net_income': net_income,
+            'revenue_count': revenue['count'],
+            'expense_count': expense['count'],
+            'transaction_count': transaction_count,
+            'payment_stats': payment_stats,
+        }
+
+        # Calculate profit margin
+        if total_revenue > 0:
+            stats['profit_margin'] = round((net_income / float(total_revenue)) * 100, 2)
+        else:
+            stats['profit_margin'] = 0
+
+        trends = {
+            'revenue_change': self.calculate_change(total_revenue, revenue['previous_total'] or 0),
+            'expense_change': self.calculate_change(total_expenses, expense['previous_total'] or 0),
+        }
+
+        return stats, trends
+
+    def maintenance_stats(self):
+        """Maintenance request counts by status and priority"""
+        return MaintenanceRequest.objects.aggregate(
+            total_requests=Count('id'),
+            open=Count('id', filter=Q(status='open')),
+            in_progress=Count('id', filter=Q(status='in_progress')),
+            on_hold=Count('id', filter=Q(status='on_hold')),
+            completed=Count('id', filter=Q(status='completed')),
+            cancelled=Count('id', filter=Q(status='cancelled')),
+            high_priority=Count('id', filter=Q(priority='high')),
+            emergency=Count('id', filter=Q(priority='emergency')),
+            overdue=Count('id', filter=Q(
+                scheduled_date__lt=self.today,
+                status__in=['open', 'in_progress', 'on_hold']
+            )),
+        )
+
+    def document_stats(self):
+        """Document totals and recent uploads"""
+        totals = Document.objects.aggregate(
+            total_documents=Count('id'),
+            total_size=Sum('file_size'),
+            recent_uploads=Count('id', filter=Q(uploaded_at__gte=self.start_date)),
+        )
+        totals['total_size'] = totals['total_size'] or 0
+        return totals
+
+    def notification_stats(self):
+        """Notification counts for the requesting user"""
+        return Notification.objects.active().filter(user=self.user).aggregate(
+            total_notifications=Count('id'),
+            unread_count=Count('id', filter=Q(is_read=False)),
+            urgent_count=Count('id', filter=Q(priority='urgent', is_read=False)),
+        )
+
+    def recent_activities(self, limit=10):
+        """Latest additions across properties, tenants, leases and maintenance"""
+        activities = []
+
+        for prop in Property.objects.only('name', 'created_at').order_by('-created_at')[:3]:
+            activities.append({
+                'type': 'property',
+                'action': 'added',
+                'title': f'Property Added: {prop.name}',
+                'timestamp': prop.created_at,
+                'icon': 'building'
+            })
+
+        tenants = Tenant.objects.only('first_name', 'last_name', 'created_at').order_by('-created_at')[:3]
+        for tenant in tenants:
+            activities.append({
+                'type': 'tenant',
+                'action': 'added',
+                'title': f'Tenant Added: {tenant.get_full_name()}',
+                'timestamp': tenant.created_at,
+                'icon': 'user'
+            })
+
+        for lease in Lease.objects.select_related('lease_property').order_by('-created_at')[:3]:
+            activities.append({
+                'type': 'lease',
+                'action': 'created',
+                'title': f'Lease Created: {lease.lease_property.name}',
+                'timestamp': lease.created_at,
+                'icon': 'file-text'
+            })
+
+        for maint in MaintenanceRequest.objects.only('title', 'reported_date').order_by('-reported_date')[:3]:
+            activities.append({
+                'type': 'maintenance',
+                'action': 'reported',
+                'title': f'Maintenance: {maint.title}',
+                'timestamp': maint.reported_date,
+                'icon': 'tool'
+            })
+
+        # Sort by timestamp and limit
+        activities.sort(key=lambda x: x['timestamp'], reverse=True)
+        activities = activities[:limit]
+
+        for activity in activities:
+            activity['timestamp'] = activity['timestamp'].isoformat()
+
+        return activities
+
+    def build(self):
+        """Assemble the full dashboard payload"""
+        property_stats = self.property_stats()
+        tenant_stats = self.tenant_stats()
+        lease_stats = self.lease_stats()
+        financial_stats, trends = self.financial_stats()
+        maintenance_stats = self.maintenance_stats()
+        document_stats = self.document_stats()
+        notification_stats = self.notification_stats()
+
+        # Quick Stats for Dashboard Cards
+        quick_stats = {
+            'total_properties': property_stats['total_properties'],
+            'total_tenants': tenant_stats['active_tenants'],
+            'active_leases': lease_stats['active_leases'],
+            'monthly_revenue': financial_stats['total_revenue'],
+            'pending_maintenance': maintenance_stats['open'] + maintenance_stats['in_progress'],
+            'unread_notifications': notification_stats['unread_count'],
+        }
+
+        return {
+            'date_range': {
+                'start_date': self.start_date.isoformat(),
+                'end_date': self.now.isoformat(),
+                'days': self.days
+            },
+            'quick_stats': quick_stats,
+            'property_stats': property_stats,
+            'tenant_stats': tenant_stats,
+            'lease_stats': lease_stats,
+            'financial_stats': financial_stats,
+            'maintenance_stats': maintenance_stats,
+            'document_stats': document_stats,
+            'notification_stats': notification_stats,
+            'recent_activities': self.recent_activities(),
+            'trends': trends,
+        }
+
+    @staticmethod
+    def calculate_change(current, previous):
+        """Calculate percentage change between periods"""
+        if previous == 0:
+            return 100.0 if current > 0 else 0.0
+        return round(((float(current) - float(previous)) / float(previous)) * 100, 2)
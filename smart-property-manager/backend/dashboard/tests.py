@@ -0,0 +1,99 @@
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.models import User
+from properties.models import Property
+from tenants.models import Tenant
+
+
+class DashboardStatisticsQueryCountTests(TestCase):
+    """Regression tests pinning the number of queries behind the dashboard"""
+
+    # The global portfolio snapshot row (property, tenant, lease status and
+    # payment figures), the live count of leases expiring in the next 30
+    # days, one aggregate per table (Revenue, Expense, Transaction,
+    # MaintenanceRequest, Document, Notification) plus four "recent
+    # activity" lookups.
+    # Revenue and Expense are read through financials.rollups.windowed_totals:
+    # the open-ended current window reads whole months after its start from
+    # the rollup and the partial first month from raw rows, and NOW keeps
+    # the previous window inside partial months, so each ledger is one
+    # rollup query and one raw query.
+    EXPECTED_QUERIES = 14
+    NOW = datetime(2024, 6, 15, 12, 0, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        patcher = mock.patch('dashboard.aggregation.timezone.now', return_value=self.NOW)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(
+            username='dashboard', email='dashboard@example.com', password='pass1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_property(self, index):
+        return Property.objects.create(
+            name=f'Property {index}', address='1 Main St', city='Austin', state='TX',
+            zip_code='78701', total_units=10, occupied_units=index % 10,
+            current_value=100000, purchase_price=90000,
+            monthly_revenue=2000, monthly_expenses=500
+        )
+
+    def test_query_count_is_constant(self):
+        url = reverse('dashboard-statistics')
+        self.create_property(0)
+
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        for index in range(1, 25):
+            self.create_property(index)
+
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['property_stats']['total_properties'], 25)
+
+    def test_response_shape(self):
+        response = self.client.get(reverse('dashboard-statistics'), {'days': 7})
+
+        self.assertEqual(set(response.data.keys()), {
+            'date_range', 'quick_stats', 'property_stats', 'tenant_stats',
+            'lease_stats', 'financial_stats', 'maintenance_stats',
+            'document_stats', 'notification_stats', 'recent_activities', 'trends',
+        })
+        self.assertEqual(response.data['date_range']['days'], 7)
+        self.assertEqual(set(response.data['financial_stats'].keys()), {
+            'total_revenue', 'total_expenses', 'net_income', 'revenue_count',
+            'expense_count', 'transaction_count', 'payment_stats', 'profit_margin',
+        })
+        self.assertEqual(set(response.data['trends'].keys()), {'revenue_change', 'expense_change'})
+
+    def test_tenant_stats_follow_saves_and_deletes(self):
+        prop = self.create_property(1)
+        first = Tenant.objects.create(
+            first_name='First', last_name='Tenant', email='first@example.com',
+            phone='555-0100', property=prop, status='active'
+        )
+        Tenant.objects.create(
+            first_name='Second', last_name='Tenant', email='second@example.com',
+            phone='555-0101', status='pending', emergency_contact_name='Contact'
+        )
+        first.status = 'inactive'
+        first.save()
+        prop.delete()
+
+        stats = self.client.get(reverse('dashboard-statistics')).data['tenant_stats']
+        self.assertEqual(stats, {
+            'total_tenants': 2,
+            'active_tenants': 0,
+            'inactive_tenants': 1,
+            'tenants_with_email': 2,
+            'tenants_with_emergency_contact': 1,
+        })
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from financials.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Backfill or rebuild the monthly revenue/expense rollup table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=str, help='First month to rebuild (YYYY-MM-DD, widened to the month)')
+        parser.add_argument('--end', type=str, help='Last month to rebuild (YYYY-MM-DD, widened to the month)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per batch')
+
+    def handle(self, *args, **options):
+        try:
+            start = self.parse_date(options.get('start'))
+            end = self.parse_date(options.get('end'))
+        except ValueError:
+            raise CommandError('--start and --end must be dates in YYYY-MM-DD format')
+
+        self.stdout.write('Rebuilding financial rollups...')
+        written = rebuild_rollups(start=start, end=end, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} rollup rows'))
+
+    def parse_date(self, value):
+        if not value:
+            return None
+        return datetime.strptime(value, '%Y-%m-%d').date()
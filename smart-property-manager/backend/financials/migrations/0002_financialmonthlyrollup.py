@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0001_initial'),
+        ('financials', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinancialMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('kind', models.CharField(choices=[('revenue', 'Revenue'), ('expense', 'Expense')], max_length=20)),
+                ('category', models.CharField(help_text='Revenue source or expense category', max_length=50)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('entry_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('financial_property', models.ForeignKey(db_column='property_id', on_delete=django.db.models.deletion.CASCADE, related_name='financial_rollups', to='properties.property')),
+            ],
+            options={
+                'verbose_name': 'Financial Monthly Rollup',
+                'verbose_name_plural': 'Financial Monthly Rollups',
+                'db_table': 'financial_monthly_rollups',
+                'ordering': ['-month'],
+                'indexes': [models.Index(fields=['month', 'kind'], name='financial_m_month_d07db3_idx')],
+                'unique_together': {('financial_property', 'month', 'kind', 'category')},
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+
+LEDGERS = [
+    # (kind, model, category field)
+    ('revenue', 'Revenue', 'source'),
+    ('expense', 'Expense', 'category'),
+]
+
+
+def backfill_rollups(apps, schema_editor):
+    """
+    Build FinancialMonthlyRollup from the existing ledgers
+
+    Without this, analytics answered from the rollup show zeros for every
+    month before the deploy. Existing rollup rows are replaced, so running
+    the migration again after a rollback is safe.
+    """
+    FinancialMonthlyRollup = apps.get_model('financials', 'FinancialMonthlyRollup')
+    FinancialMonthlyRollup.objects.all().delete()
+
+    for kind, model_name, category_field in LEDGERS:
+        model = apps.get_model('financials', model_name)
+        rows = model.objects.annotate(month=TruncMonth('date')).order_by().values(
+            'financial_property_id', 'month', rollup_category=F(category_field)
+        ).annotate(total=Sum('amount'), count=Count('id'))
+
+        FinancialMonthlyRollup.objects.bulk_create(
+            (
+                FinancialMonthlyRollup(
+                    financial_property_id=row['financial_property_id'],
+                    month=row['month'],
+                    kind=kind,
+                    category=row['rollup_category'],
+                    total_amount=row['total'],
+                    entry_count=row['count'],
+                )
+                for row in rows.iterator()
+            ),
+            batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financials', '0002_financialmonthlyrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+
+from config.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY (used on PostgreSQL) cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('financials', '0003_backfill_financial_rollups'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='revenue',
+            index=models.Index(fields=['date', 'id'], name='revenues_date_c58185_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='expense',
+            index=models.Index(fields=['date', 'id'], name='expenses_date_4801c0_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transaction',
+            index=models.Index(fields=['date', 'id'], name='transaction_date_8dc5d9_idx'),
+        ),
+    ]
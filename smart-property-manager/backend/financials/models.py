@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from properties.models import Property
 from tenants.models import Tenant
@@ -7,6 +7,40 @@ from leases.models import Lease
 User = get_user_model()
 
 
+class LedgerQuerySet(models.QuerySet):
+    """
+    Revenue/Expense queryset that keeps FinancialMonthlyRollup in step
+
+    Saves and deletes refresh the rollup through signals (signals.py), but
+    update() and bulk_create() send none, so they refresh the rollup cells
+    they touch themselves.
+    """
+    
+    rollup_fields = {'amount', 'date', 'financial_property', 'financial_property_id', 'source', 'category'}
+    
+    def update(self, **kwargs):
+        if not self.rollup_fields.intersection(kwargs):
+            return super().update(**kwargs)
+        
+        from .rollups import ledger_cells, refresh_rollup_cells
+        kind = self.model._meta.model_name
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list('pk', flat=True))
+            touched = self.model.objects.filter(pk__in=pks)
+            cells = ledger_cells(kind, touched)
+            rows = super().update(**kwargs)
+            refresh_rollup_cells(kind, cells | ledger_cells(kind, touched))
+        return rows
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        from .rollups import object_cells, refresh_rollup_cells
+        kind = self.model._meta.model_name
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            refresh_rollup_cells(kind, object_cells(kind, objs))
+        return objs
+
+
 class Revenue(models.Model):
     """Revenue tracking model"""
     
@@ -67,8 +101,11 @@ class Revenue(models.Model):
             models.Index(fields=['financial_property', 'date']),
             models.Index(fields=['tenant', 'date']),
             models.Index(fields=['source']),
+            models.Index(fields=['date', 'id']),
         ]
     
+    objects = LedgerQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.get_source_display()} - ${self.amount} - {self.date}"
 
@@ -132,8 +169,11 @@ class Expense(models.Model):
             models.Index(fields=['financial_property', 'date']),
             models.Index(fields=['category']),
             models.Index(fields=['paid']),
+            models.Index(fields=['date', 'id']),
         ]
     
+    objects = LedgerQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.get_category_display()} - ${self.amount} - {self.date}"
 
@@ -201,6 +241,7 @@ class Transaction(models.Model):
             models.Index(fields=['financial_property', 'date']),
             models.Index(fields=['transaction_type']),
             models.Index(fields=['status']),
+            models.Index(fields=['date', 'id']),
         ]
     
     def __str__(self):
@@ -281,3 +322,46 @@ class Payment(models.Model):
             return False
         return self.due_date < timezone.now().date()
 
+
+
+class FinancialMonthlyRollup(models.Model):
+    """
+    Monthly revenue/expense totals per property and source/category
+
+    Maintained incrementally by financials.signals and rebuilt with the
+    rebuild_financial_rollups management command. Analytics read whole months
+    from here and only touch raw Revenue/Expense rows for partial edge months.
+    """
+    
+    KIND_CHOICES = [
+        ('revenue', 'Revenue'),
+        ('expense', 'Expense'),
+    ]
+    
+    financial_property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        related_name='financial_rollups',
+        db_column='property_id'
+    )
+    month = models.DateField(help_text='First day of the month')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    category = models.CharField(max_length=50, help_text='Revenue source or expense category')
+    
+    total_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    entry_count = models.IntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'financial_monthly_rollups'
+        ordering = ['-month']
+        verbose_name = 'Financial Monthly Rollup'
+        verbose_name_plural = 'Financial Monthly Rollups'
+        unique_together = [('financial_property', 'month', 'kind', 'category')]
+        indexes = [
+            models.Index(fields=['month', 'kind']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.category} - {self.month:%Y-%m} - ${self.total_amount}"
@@ -0,0 +1,8 @@
+from rest_framework.pagination import PageNumberPagination
+
+
+class AnalyticsPagination(PageNumberPagination):
+    """Page-number pagination with a client-selectable page size for analytics endpoints"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 500
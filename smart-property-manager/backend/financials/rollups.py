@@ -0,0 +1,268 @@
+"""
+Monthly rollups of Revenue and Expense rows
+
+Whole months inside a requested range are answered from
+FinancialMonthlyRollup; partial months at either edge fall back to the raw
+ledger rows. This keeps long-range analytics proportional to the number of
+months rather than the number of ledger entries.
+"""
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Sum, Count, Q, F
+from django.db.models.functions import TruncMonth
+
+from .models import Revenue, Expense, FinancialMonthlyRollup
+
+
+KIND_MODELS = {
+    'revenue': Revenue,
+    'expense': Expense,
+}
+
+# Column holding the rollup category on each ledger
+CATEGORY_FIELDS = {
+    'revenue': 'source',
+    'expense': 'category',
+}
+
+
+def month_start(value):
+    return value.replace(day=1)
+
+
+def month_end(value):
+    return value + relativedelta(day=31)
+
+
+def split_range(start, end):
+    """
+    Split an inclusive date range into whole months and partial edges
+
+    Returns ``(full_months, edges)`` where ``full_months`` is a
+    ``(first_month, last_month)`` tuple or None, and ``edges`` is a list of
+    ``(start, end)`` date ranges to read from the raw ledger. ``None`` bounds
+    are open-ended.
+    """
+    if start is None or start.day == 1:
+        first_full = start
+    else:
+        first_full = month_start(start) + relativedelta(months=1)
+
+    if end is None:
+        last_full = None
+    elif end == month_end(end):
+        last_full = month_start(end)
+    else:
+        last_full = month_start(end) - relativedelta(months=1)
+
+    if first_full is not None and last_full is not None and first_full > last_full:
+        return None, [(start, end)]
+
+    edges = []
+    if start is not None and start.day != 1:
+        edges.append((start, month_end(start)))
+    if end is not None and end != month_end(end):
+        edges.append((month_start(end), end))
+    return (first_full, last_full), edges
+
+
+def _range_q(field, start, end):
+    conditions = {}
+    if start is not None:
+        conditions[f'{field}__gte'] = start
+    if end is not None:
+        conditions[f'{field}__lte'] = end
+    return Q(**conditions) if conditions else None
+
+
+def _rollups(kind, property_id=None, category=None):
+    queryset = FinancialMonthlyRollup.objects.filter(kind=kind)
+    if property_id:
+        queryset = queryset.filter(financial_property_id=property_id)
+    if category:
+        queryset = queryset.filter(category=category)
+    return queryset
+
+
+def _ledger(kind, property_id=None, category=None):
+    queryset = KIND_MODELS[kind].objects.all()
+    if property_id:
+        queryset = queryset.filter(financial_property_id=property_id)
+    if category:
+        queryset = queryset.filter(**{CATEGORY_FIELDS[kind]: category})
+    return queryset
+
+
+def windowed_totals(kind, windows, property_id=None, category=None):
+    """
+    Sum a ledger over several named date windows
+
+    ``windows`` maps a name to an inclusive ``(start, end)`` date range.
+    Returns ``{name: {'total': Decimal, 'count': int}}`` using at most one
+    rollup query and one raw query, skipping whichever is not needed.
+    """
+    rollup_aggregates = {}
+    raw_aggregates = {}
+    raw_ranges = []
+
+    for name, (start, end) in windows.items():
+        full_months, edges = split_range(start, end)
+        if full_months:
+            months_q = _range_q('month', *full_months)
+            rollup_aggregates[f'{name}__total'] = Sum('total_amount', filter=months_q)
+            rollup_aggregates[f'{name}__count'] = Sum('entry_count', filter=months_q)
+        if edges:
+            edge_q = reduce(or_, [_range_q('date', *edge) for edge in edges])
+            raw_ranges.append(edge_q)
+            raw_aggregates[f'{name}__total'] = Sum('amount', filter=edge_q)
+            raw_aggregates[f'{name}__count'] = Count('id', filter=edge_q)
+
+    results = {name: {'total': Decimal('0'), 'count': 0} for name in windows}
+
+    if rollup_aggregates:
+        values = _rollups(kind, property_id, category).aggregate(**rollup_aggregates)
+        _accumulate(results, values)
+    if raw_aggregates:
+        values = _ledger(kind, property_id, category).filter(
+            reduce(or_, raw_ranges)
+        ).aggregate(**raw_aggregates)
+        _accumulate(results, values)
+
+    return results
+
+
+def _accumulate(results, values):
+    for key, value in values.items():
+        name, metric = key.rsplit('__', 1)
+        results[name][metric] += value or 0
+
+
+def monthly_totals(kind, start, end, property_id=None, breakdown=None):
+    """
+    Per-month totals for an inclusive date range
+
+    ``breakdown`` may be 'property' or 'category'. Returns
+    ``{month: {key: total}}`` where ``key`` is None without a breakdown.
+    """
+    rollup_key = {'property': 'financial_property_id', 'category': 'category'}.get(breakdown)
+    raw_key = {'property': 'financial_property_id', 'category': CATEGORY_FIELDS[kind]}.get(breakdown)
+    full_months, edges = split_range(start, end)
+    totals = {}
+
+    if full_months:
+        rows = _rollups(kind, property_id).filter(_range_q('month', *full_months) or Q())
+        rows = rows.order_by().values('month', **({'key': F(rollup_key)} if rollup_key else {})).annotate(
+            total=Sum('total_amount')
+        )
+        for row in rows:
+            totals.setdefault(row['month'], {})[row.get('key')] = row['total']
+
+    if edges:
+        edge_q = reduce(or_, [_range_q('date', *edge) for edge in edges])
+        rows = _ledger(kind, property_id).filter(edge_q).annotate(month=TruncMonth('date'))
+        rows = rows.order_by().values('month', **({'key': F(raw_key)} if raw_key else {})).annotate(
+            total=Sum('amount')
+        )
+        for row in rows:
+            bucket = totals.setdefault(row['month'], {})
+            bucket[row.get('key')] = bucket.get(row.get('key'), Decimal('0')) + row['total']
+
+    return totals
+
+
+def refresh_rollup_cell(kind, property_id, month, category):
+    """Recompute one rollup row from the raw ledger (deleting it when empty)"""
+    lookup = {
+        'kind': kind,
+        'financial_property_id': property_id,
+        'month': month,
+        'category': category,
+    }
+    totals = KIND_MODELS[kind].objects.filter(
+        financial_property_id=property_id,
+        date__gte=month,
+        date__lte=month_end(month),
+        **{CATEGORY_FIELDS[kind]: category}
+    ).aggregate(total=Sum('amount'), count=Count('id'))
+
+    if not totals['count']:
+        FinancialMonthlyRollup.objects.filter(**lookup).delete()
+        return
+
+    FinancialMonthlyRollup.objects.update_or_create(
+        defaults={'total_amount': totals['total'], 'entry_count': totals['count']},
+        **lookup
+    )
+
+
+def ledger_cells(kind, queryset):
+    """Distinct (property_id, month, category) rollup cells covered by ledger rows"""
+    rows = queryset.annotate(rollup_month=TruncMonth('date')).order_by().values_list(
+        'financial_property_id', 'rollup_month', CATEGORY_FIELDS[kind]
+    ).distinct()
+    return set(rows)
+
+
+def object_cells(kind, objs):
+    """Rollup cells of unsaved or freshly created ledger instances"""
+    date_field = KIND_MODELS[kind]._meta.get_field('date')
+    return {
+        (obj.financial_property_id, month_start(date_field.to_python(obj.date)), getattr(obj, CATEGORY_FIELDS[kind]))
+        for obj in objs
+    }
+
+
+def refresh_rollup_cells(kind, cells):
+    for cell in cells:
+        refresh_rollup_cell(kind, *cell)
+
+
+def rebuild_rollups(start=None, end=None, batch_size=1000):
+    """
+    Rebuild rollup rows for the months between ``start`` and ``end``
+
+    Both bounds are optional and are widened to whole months. Returns the
+    number of rollup rows written.
+    """
+    start = month_start(start) if start else None
+    end = month_end(end) if end else None
+    written = 0
+
+    with transaction.atomic():
+        stale = FinancialMonthlyRollup.objects.all()
+        if start:
+            stale = stale.filter(month__gte=start)
+        if end:
+            stale = stale.filter(month__lte=end)
+        stale.delete()
+
+        for kind, model in KIND_MODELS.items():
+            ledger = model.objects.all()
+            if start:
+                ledger = ledger.filter(date__gte=start)
+            if end:
+                ledger = ledger.filter(date__lte=end)
+
+            rows = ledger.annotate(month=TruncMonth('date')).order_by().values(
+                'financial_property_id', 'month', rollup_category=F(CATEGORY_FIELDS[kind])
+            ).annotate(total=Sum('amount'), count=Count('id'))
+
+            rollups = [
+                FinancialMonthlyRollup(
+                    financial_property_id=row['financial_property_id'],
+                    month=row['month'],
+                    kind=kind,
+                    category=row['rollup_category'],
+                    total_amount=row['total'],
+                    entry_count=row['count'],
+                )
+                for row in rows.iterator()
+            ]
+            FinancialMonthlyRollup.objects.bulk_create(rollups, batch_size=batch_size)
+            written += len(rollups)
+
+    return written
@@ -84,6 +84,40 @@ class PaymentSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
 
+class ExpandableDetailsMixin:
+    """
+    Compact list rows: nested ``*_details`` objects only when asked for
+
+    The view passes the names requested with ``?expand=property,tenant`` as
+    ``context['expand']``; every detail field not requested is dropped, so a
+    row carries just the related ids and names.
+    """
+    expandable_fields = {'property': 'property_details', 'tenant': 'tenant_details'}
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        expand = self.context.get('expand', ())
+        for name, field_name in self.expandable_fields.items():
+            if name not in expand:
+                self.fields.pop(field_name, None)
+
+
+class RevenueListSerializer(ExpandableDetailsMixin, RevenueSerializer):
+    """Revenue list rows with property/tenant details behind ?expand="""
+
+
+class ExpenseListSerializer(ExpandableDetailsMixin, ExpenseSerializer):
+    """Expense list rows with property details behind ?expand="""
+
+
+class TransactionListSerializer(ExpandableDetailsMixin, TransactionSerializer):
+    """Transaction list rows with property details behind ?expand="""
+
+
+class PaymentListSerializer(ExpandableDetailsMixin, PaymentSerializer):
+    """Payment list rows with property/tenant details behind ?expand="""
+
+
 class FinancialStatisticsSerializer(serializers.Serializer):
     """Serializer for financial statistics"""
     total_revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
@@ -108,8 +142,10 @@ class PropertyFinancialSummarySerializer(serializers.Serializer):
 
 
 class MonthlyRevenueSerializer(serializers.Serializer):
-    """Serializer for monthly revenue breakdown"""
+    """Serializer for per-period revenue breakdown (month is kept for compatibility)"""
     month = serializers.DateField()
+    period = serializers.DateField()
     total_revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
     total_expenses = serializers.DecimalField(max_digits=12, decimal_places=2)
     net_income = serializers.DecimalField(max_digits=12, decimal_places=2)
+    breakdown = serializers.DictField(required=False)
@@ -0,0 +1,46 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+
+from .models import Revenue, Expense
+from .rollups import CATEGORY_FIELDS, month_start, refresh_rollup_cell
+
+
+LEDGER_KINDS = {
+    Revenue: 'revenue',
+    Expense: 'expense',
+}
+
+
+def _rollup_cell(sender, property_id, date_value, category):
+    date_value = sender._meta.get_field('date').to_python(date_value)
+    return (property_id, month_start(date_value), category)
+
+
+def remember_previous_rollup_cell(sender, instance, **kwargs):
+    """Record the rollup cell a ledger row belonged to before it is saved"""
+    if instance.pk is None:
+        return
+    kind = LEDGER_KINDS[sender]
+    previous = sender.objects.filter(pk=instance.pk).values_list(
+        'financial_property_id', 'date', CATEGORY_FIELDS[kind]
+    ).first()
+    if previous is not None:
+        instance._rollup_previous_cell = _rollup_cell(sender, *previous)
+
+
+def refresh_rollups(sender, instance, **kwargs):
+    """Refresh the monthly rollup cells touched by a saved or deleted ledger row"""
+    kind = LEDGER_KINDS[sender]
+    cell = _rollup_cell(
+        sender, instance.financial_property_id, instance.date, getattr(instance, CATEGORY_FIELDS[kind])
+    )
+    refresh_rollup_cell(kind, *cell)
+
+    previous = getattr(instance, '_rollup_previous_cell', None)
+    if previous is not None and previous != cell:
+        refresh_rollup_cell(kind, *previous)
+
+
+for ledger in LEDGER_KINDS:
+    pre_save.connect(remember_previous_rollup_cell, sender=ledger, dispatch_uid=f'rollup_pre_save_{ledger.__name__}')
+    post_save.connect(refresh_rollups, sender=ledger, dispatch_uid=f'rollup_post_save_{ledger.__name__}')
+    post_delete.connect(refresh_rollups, sender=ledger, dispatch_uid=f'rollup_post_delete_{ledger.__name__}')
@@ -1,3 +1,256 @@
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.models import User
+from properties.models import Owner, Property
+from tenants.models import Tenant
+from .models import Revenue, Expense, FinancialMonthlyRollup
+from .rollups import windowed_totals, rebuild_rollups
+
+
+class PropertyPerformanceViewTests(TestCase):
+    """The performance report must not issue queries per property"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='finance', email='finance@example.com', password='pass1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('financials:property_performance')
+
+    def create_properties(self, count):
+        for index in range(count):
+            prop = Property.objects.create(
+                name=f'Property {index}', address='1 Main St', city='Austin', state='TX',
+                zip_code='78701', current_value=Decimal('100000'),
+                purchase_price=Decimal('100000')
+            )
+            Revenue.objects.create(
+                financial_property=prop, amount=Decimal('1000') * (index + 1), date=date(2024, 1, 15)
+            )
+            Expense.objects.create(
+                financial_property=prop, category='utilities', amount=Decimal('100'),
+                date=date(2024, 1, 20), description='Utilities'
+            )
+
+    def test_query_count_is_constant(self):
+        self.create_properties(3)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 3)
+
+        self.create_properties(20)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'start_date': '2024-01-01', 'end_date': '2024-01-31'})
+        self.assertEqual(len(response.data), 23)
+
+    def test_ordering_and_pagination(self):
+        self.create_properties(5)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'ordering': '-net_income', 'page_size': 2})
+
+        self.assertEqual(response.data['count'], 5)
+        top = response.data['results']
+        self.assertEqual([row['property_name'] for row in top], ['Property 4', 'Property 3'])
+        self.assertEqual(Decimal(top[0]['net_income']), Decimal('4900'))
+        self.assertEqual(Decimal(top[0]['roi']), Decimal('4.90'))
+
+    def test_date_window_excludes_other_periods(self):
+        self.create_properties(1)
+        response = self.client.get(self.url, {'start_date': '2024-02-01'})
+        self.assertEqual(Decimal(response.data[0]['total_revenue']), Decimal('0'))
+
+
+class LedgerListExpandTests(TestCase):
+    """Ledger lists are compact by default and expand without per-row queries"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='ledger', email='ledger@example.com', password='pass1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('financials:revenue-list')
+        self.created = 0
+
+    def create_revenues(self, count):
+        for _ in range(count):
+            index = self.created = self.created + 1
+            owner = Owner.objects.create(name=f'Owner {index}', email=f'owner{index}@example.com')
+            prop = Property.objects.create(
+                name=f'Property {index}', address='1 Main St', city='Austin', state='TX',
+                zip_code='78701', current_value=Decimal('100000'), owner=owner
+            )
+            tenant = Tenant.objects.create(
+                first_name='Tenant', last_name=str(index), email=f'tenant{index}@example.com',
+                phone='555-0100', property=prop
+            )
+            Revenue.objects.create(
+                financial_property=prop, tenant=tenant, amount=Decimal('1000'), date=date(2024, 1, 15)
+            )
+
+    def rows(self, response):
+        return response.data['results'] if isinstance(response.data, dict) else response.data
+
+    def test_list_rows_are_compact(self):
+        self.create_revenues(2)
+        row = self.rows(self.client.get(self.url))[0]
+        self.assertNotIn('property_details', row)
+        self.assertNotIn('tenant_details', row)
+        self.assertTrue(row['property_name'].startswith('Property'))
+        self.assertTrue(row['tenant_name'].startswith('Tenant'))
+
+        detail = self.client.get(reverse('financials:revenue-detail', args=[row['id']]))
+        self.assertIn('property_details', detail.data)
+
+    def test_expand_adds_details(self):
+        self.create_revenues(2)
+        row = self.rows(self.client.get(self.url, {'expand': 'property'}))[0]
+        self.assertTrue(row['property_details']['owner_name'].startswith('Owner'))
+        self.assertNotIn('tenant_details', row)
+
+        row = self.rows(self.client.get(self.url, {'expand': 'property,tenant,unknown'}))[0]
+        self.assertIn('property_details', row)
+        self.assertTrue(row['tenant_details']['property_name'].startswith('Property'))
+
+    def test_expanded_query_count_is_constant(self):
+        params = {'expand': 'property,tenant'}
+        self.create_revenues(2)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url, params)
+
+        self.create_revenues(10)
+        with self.assertNumQueries(len(small.captured_queries)):
+            response = self.client.get(self.url, params)
+        self.assertEqual(len(self.rows(response)), 12)
+
+
+class MonthlyRevenueViewTests(TestCase):
+    """Period totals come from one grouped query per ledger"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='monthly', email='monthly@example.com', password='pass1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('financials:monthly_revenue')
+        self.prop = Property.objects.create(
+            name='Ledger Property', address='1 Main St', city='Austin', state='TX',
+            zip_code='78701', current_value=Decimal('100000')
+        )
+        for month in (1, 3):
+            Revenue.objects.create(
+                financial_property=self.prop, source='rent', amount=Decimal('1500'), date=date(2020, month, 5)
+            )
+        Expense.objects.create(
+            financial_property=self.prop, category='insurance', amount=Decimal('200'),
+            date=date(2020, 3, 9), description='Insurance'
+        )
+
+    def test_multi_year_range_uses_two_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'start': '2019-01-01', 'end': '2023-12-31'})
+
+        self.assertEqual(len(response.data), 60)
+        by_period = {row['period']: row for row in response.data}
+        self.assertEqual(Decimal(by_period['2020-02-01']['total_revenue']), Decimal('0'))
+        self.assertEqual(Decimal(by_period['2020-03-01']['net_income']), Decimal('1300'))
+
+    def test_category_breakdown(self):
+        response = self.client.get(self.url, {
+            'start': '2020-03-01', 'end': '2020-03-31', 'granularity': 'week', 'breakdown': 'category'
+        })
+
+        self.assertEqual(response.status_code, 200)
+        breakdowns = [row['breakdown'] for row in response.data if row['breakdown']]
+        self.assertEqual(breakdowns[0], {'revenue:rent': {'revenue': Decimal('1500'), 'expenses': Decimal('0')}})
+        self.assertEqual(breakdowns[1], {'expense:insurance': {'revenue': Decimal('0'), 'expenses': Decimal('200')}})
+
+    def test_category_breakdown_keeps_shared_names_apart(self):
+        Revenue.objects.create(
+            financial_property=self.prop, source='other', amount=Decimal('50'), date=date(2020, 3, 10)
+        )
+        Expense.objects.create(
+            financial_property=self.prop, category='other', amount=Decimal('20'),
+            date=date(2020, 3, 11), description='Misc'
+        )
+        response = self.client.get(self.url, {
+            'start': '2020-03-01', 'end': '2020-03-31', 'breakdown': 'category'
+        })
+
+        breakdown = response.data[0]['breakdown']
+        self.assertEqual(breakdown['revenue:other'], {'revenue': Decimal('50'), 'expenses': Decimal('0')})
+        self.assertEqual(breakdown['expense:other'], {'revenue': Decimal('0'), 'expenses': Decimal('20')})
+
+    def test_rejects_unknown_granularity(self):
+        response = self.client.get(self.url, {'granularity': 'hour'})
+        self.assertEqual(response.status_code, 400)
+
+
+class FinancialMonthlyRollupTests(TestCase):
+    """Rollups stay in step with the ledgers and agree with raw sums"""
+
+    def setUp(self):
+        self.prop = Property.objects.create(
+            name='Rollup Property', address='1 Main St', city='Austin', state='TX',
+            zip_code='78701', current_value=Decimal('100000')
+        )
+
+    def test_rollup_tracks_saves_moves_and_deletes(self):
+        rent = Revenue.objects.create(
+            financial_property=self.prop, source='rent', amount=Decimal('1000'), date=date(2021, 5, 3)
+        )
+        Revenue.objects.create(
+            financial_property=self.prop, source='rent', amount=Decimal('500'), date=date(2021, 5, 20)
+        )
+        may = FinancialMonthlyRollup.objects.get(kind='revenue', month=date(2021, 5, 1), category='rent')
+        self.assertEqual((may.total_amount, may.entry_count), (Decimal('1500'), 2))
+
+        rent.date = date(2021, 6, 1)
+        rent.save()
+        may.refresh_from_db()
+        self.assertEqual((may.total_amount, may.entry_count), (Decimal('500'), 1))
+        self.assertTrue(FinancialMonthlyRollup.objects.filter(month=date(2021, 6, 1)).exists())
+
+        rent.delete()
+        self.assertFalse(FinancialMonthlyRollup.objects.filter(month=date(2021, 6, 1)).exists())
+
+    def test_bulk_writes_refresh_the_rollup(self):
+        Revenue.objects.bulk_create([
+            Revenue(financial_property=self.prop, source='rent', amount=Decimal('100'), date=date(2021, 7, day))
+            for day in (1, 2, 3)
+        ])
+        july = FinancialMonthlyRollup.objects.get(kind='revenue', month=date(2021, 7, 1), category='rent')
+        self.assertEqual((july.total_amount, july.entry_count), (Decimal('300'), 3))
+
+        Revenue.objects.filter(date=date(2021, 7, 3)).update(date=date(2021, 8, 3), source='parking')
+        july.refresh_from_db()
+        self.assertEqual((july.total_amount, july.entry_count), (Decimal('200'), 2))
+        self.assertTrue(FinancialMonthlyRollup.objects.filter(month=date(2021, 8, 1), category='parking').exists())
+
+    def test_windowed_totals_match_raw_rows(self):
+        for day, amount in ((14, '100'), (28, '200')):
+            for month in (1, 2, 3):
+                Revenue.objects.create(
+                    financial_property=self.prop, amount=Decimal(amount), date=date(2022, month, day)
+                )
+
+        rebuild_rollups()
+        start, end = date(2022, 1, 20), date(2022, 3, 20)
+        totals = windowed_totals('revenue', {'range': (start, end)})['range']
+        raw = Revenue.objects.filter(date__gte=start, date__lte=end)
+
+        self.assertEqual(totals['total'], sum(r.amount for r in raw))
+        self.assertEqual(totals['count'], raw.count())
 
-# Create your tests here.
+        open_ended = windowed_totals('revenue', {'range': (start, None)})['range']
+        self.assertEqual(open_ended['count'], Revenue.objects.filter(date__gte=start).count())
@@ -3,46 +3,107 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Sum, Count, Q, F
+from config.pagination import OptInCursorPagination
+from django.db.models import (
+    Sum, Count, Q, F, OuterRef, Subquery, Value, Case, When, DecimalField, FloatField
+)
+from django.db.models.functions import Cast, Coalesce, Round, TruncMonth, TruncWeek, TruncDay
 from django.utils import timezone
 from datetime import datetime, timedelta
+from decimal import Decimal
+from dateutil.relativedelta import relativedelta
 from .models import Revenue, Expense, Transaction, Payment
+from .pagination import AnalyticsPagination
+from .rollups import windowed_totals, monthly_totals
 from .serializers import (
     RevenueSerializer,
+    RevenueListSerializer,
     ExpenseSerializer,
+    ExpenseListSerializer,
     TransactionSerializer,
+    TransactionListSerializer,
     PaymentSerializer,
+    PaymentListSerializer,
     FinancialStatisticsSerializer,
     PropertyFinancialSummarySerializer,
     MonthlyRevenueSerializer
 )
 
 
-class RevenueViewSet(viewsets.ModelViewSet):
+class ExpandableListMixin:
+    """
+    Compact list responses with opt-in nested objects
+
+    List actions use ``list_serializer_class``, which returns related ids and
+    names only. ``?expand=property,tenant`` adds the nested details, and the
+    relations they read (e.g. the property owner) are joined into the list
+    query so a page costs the same number of queries at any size. Other
+    actions keep the full serializer with every relation joined.
+    """
+    list_actions = ('list',)
+    list_serializer_class = None
+    expand_related = {
+        'property': ['financial_property__owner'],
+    }
+    
+    def get_expand(self):
+        requested = self.request.query_params.get('expand', '') if self.request else ''
+        return {name.strip() for name in requested.split(',') if name.strip() in self.expand_related}
+    
+    def get_serializer_class(self):
+        if self.action in self.list_actions and self.list_serializer_class is not None:
+            return self.list_serializer_class
+        return super().get_serializer_class()
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['expand'] = self.get_expand()
+        return context
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Single-object actions always render the full serializer
+        names = self.get_expand() if self.action in self.list_actions else self.expand_related
+        for name in sorted(names):
+            queryset = queryset.select_related(*self.expand_related[name])
+        return queryset
+
+
+class RevenueViewSet(ExpandableListMixin, viewsets.ModelViewSet):
     """ViewSet for Revenue management"""
     permission_classes = [IsAuthenticated]
     queryset = Revenue.objects.select_related('financial_property', 'tenant', 'lease').all()
     serializer_class = RevenueSerializer
+    list_serializer_class = RevenueListSerializer
+    expand_related = {
+        'property': ['financial_property__owner'],
+        'tenant': ['tenant__property'],
+    }
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['financial_property', 'tenant', 'source', 'date']
     search_fields = ['description', 'reference_number', 'tenant__first_name', 'tenant__last_name']
     ordering_fields = ['date', 'amount', 'created_at']
     ordering = ['-date']
+    pagination_class = OptInCursorPagination
+    cursor_ordering_fields = ['date']
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
 
-class ExpenseViewSet(viewsets.ModelViewSet):
+class ExpenseViewSet(ExpandableListMixin, viewsets.ModelViewSet):
     """ViewSet for Expense management"""
     permission_classes = [IsAuthenticated]
     queryset = Expense.objects.select_related('financial_property').all()
     serializer_class = ExpenseSerializer
+    list_serializer_class = ExpenseListSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['financial_property', 'category', 'paid', 'date']
     search_fields = ['description', 'vendor_name', 'invoice_number']
     ordering_fields = ['date', 'amount', 'created_at']
     ordering = ['-date']
+    pagination_class = OptInCursorPagination
+    cursor_ordering_fields = ['date']
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -61,26 +122,35 @@ class ExpenseViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(ExpandableListMixin, viewsets.ModelViewSet):
     """ViewSet for Transaction management"""
     permission_classes = [IsAuthenticated]
     queryset = Transaction.objects.select_related('financial_property').all()
     serializer_class = TransactionSerializer
+    list_serializer_class = TransactionListSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['financial_property', 'transaction_type', 'status', 'date']
     search_fields = ['description', 'category']
     ordering_fields = ['date', 'amount', 'created_at']
     ordering = ['-date']
+    pagination_class = OptInCursorPagination
+    cursor_ordering_fields = ['date']
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(ExpandableListMixin, viewsets.ModelViewSet):
     """ViewSet for Payment management"""
     permission_classes = [IsAuthenticated]
     queryset = Payment.objects.select_related('lease', 'tenant', 'financial_property').all()
     serializer_class = PaymentSerializer
+    list_serializer_class = PaymentListSerializer
+    list_actions = ('list', 'overdue')
+    expand_related = {
+        'property': ['financial_property__owner'],
+        'tenant': ['tenant__property'],
+    }
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['financial_property', 'tenant', 'lease', 'status']
     search_fields = ['tenant__first_name', 'tenant__last_name', 'transaction_id']
@@ -138,25 +208,27 @@ class AnalyticsView(views.APIView):
     def get(self, request):
         """Get overall financial statistics"""
         # Date filtering
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
+        try:
+            start_date = self._parse_date(request.query_params.get('start_date'))
+            end_date = self._parse_date(request.query_params.get('end_date'))
+        except ValueError:
+            return Response(
+                {'error': 'start_date and end_date must be dates in YYYY-MM-DD format'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        revenue_qs = Revenue.objects.all()
-        expense_qs = Expense.objects.all()
         payment_qs = Payment.objects.all()
         
         if start_date:
-            revenue_qs = revenue_qs.filter(date__gte=start_date)
-            expense_qs = expense_qs.filter(date__gte=start_date)
             payment_qs = payment_qs.filter(due_date__gte=start_date)
         
         if end_date:
-            revenue_qs = revenue_qs.filter(date__lte=end_date)
-            expense_qs = expense_qs.filter(date__lte=end_date)
             payment_qs = payment_qs.filter(due_date__lte=end_date)
         
-        total_revenue = revenue_qs.aggregate(total=Sum('amount'))['total'] or 0
-        total_expenses = expense_qs.aggregate(total=Sum('amount'))['total'] or 0
+        # Whole months come from the monthly rollup, partial edge months from raw rows
+        window = {'range': (start_date, end_date)}
+        total_revenue = windowed_totals('revenue', window)['range']['total']
+        total_expenses = windowed_totals('expense', window)['range']['total']
         net_income = total_revenue - total_expenses
         
         # Payment statistics
@@ -188,92 +260,253 @@ class AnalyticsView(views.APIView):
         
         serializer = FinancialStatisticsSerializer(data)
         return Response(serializer.data)
+    
+    def _parse_date(self, value):
+        if not value:
+            return None
+        return datetime.strptime(value, '%Y-%m-%d').date()
 
 
 class PropertyPerformanceView(views.APIView):
     """Property-wise financial performance"""
     permission_classes = [IsAuthenticated]
+    pagination_class = AnalyticsPagination
+    
+    # ordering parameter -> annotated column
+    ORDERING_FIELDS = {
+        'net_income': 'net_income',
+        'roi': 'period_roi',
+        'total_revenue': 'total_revenue',
+        'total_expenses': 'total_expenses',
+        'occupancy_rate': 'occupancy_rate',
+        'property_name': 'name',
+    }
     
     def get(self, request):
-        """Get financial summary for each property"""
+        """
+        Get financial summary for each property
+
+        Revenues and expenses are summed per property in correlated
+        subqueries, so the whole report is a single query (plus a COUNT when
+        paginated). Supports ?ordering=[-]net_income|roi|... and opt-in
+        ?page=/?page_size=.
+        """
         from properties.models import Property
         
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
         
-        properties = Property.objects.all()
-        results = []
+        window = Q()
+        if start_date:
+            window &= Q(date__gte=start_date)
+        if end_date:
+            window &= Q(date__lte=end_date)
         
-        for prop in properties:
-            revenue_qs = prop.revenues.all()
-            expense_qs = prop.expenses.all()
-            
-            if start_date:
-                revenue_qs = revenue_qs.filter(date__gte=start_date)
-                expense_qs = expense_qs.filter(date__gte=start_date)
-            
-            if end_date:
-                revenue_qs = revenue_qs.filter(date__lte=end_date)
-                expense_qs = expense_qs.filter(date__lte=end_date)
-            
-            total_revenue = revenue_qs.aggregate(total=Sum('amount'))['total'] or 0
-            total_expenses = expense_qs.aggregate(total=Sum('amount'))['total'] or 0
-            net_income = total_revenue - total_expenses
-            
-            # Calculate ROI
-            roi = (net_income / prop.purchase_price * 100) if prop.purchase_price > 0 else 0
-            
-            results.append({
-                'property_id': prop.id,
-                'property_name': prop.name,
-                'total_revenue': total_revenue,
-                'total_expenses': total_expenses,
-                'net_income': net_income,
-                'roi': round(roi, 2),
-                'occupancy_rate': prop.occupancy_rate
-            })
+        def period_total(model):
+            totals = model.objects.filter(
+                window, financial_property=OuterRef('pk')
+            ).order_by().values('financial_property').annotate(total=Sum('amount')).values('total')
+            return Coalesce(Subquery(totals), Value(Decimal('0')), output_field=DecimalField())
+        
+        properties = Property.objects.with_metrics().annotate(
+            total_revenue=period_total(Revenue),
+            total_expenses=period_total(Expense),
+        ).annotate(
+            net_income=F('total_revenue') - F('total_expenses'),
+        ).annotate(
+            period_roi=Case(
+                When(Q(purchase_price__isnull=True) | Q(purchase_price__lte=0), then=Value(0.0)),
+                default=Round(
+                    Cast(F('net_income') * 100, FloatField()) / Cast(F('purchase_price'), FloatField()),
+                    2
+                ),
+                output_field=FloatField()
+            )
+        )
+        
+        ordering = request.query_params.get('ordering')
+        if ordering and ordering.lstrip('-') in self.ORDERING_FIELDS:
+            prefix = '-' if ordering.startswith('-') else ''
+            properties = properties.order_by(f"{prefix}{self.ORDERING_FIELDS[ordering.lstrip('-')]}", 'id')
+        
+        rows = properties.values(
+            'id', 'name', 'total_revenue', 'total_expenses', 'net_income',
+            'period_roi', 'occupancy_rate'
+        )
+        
+        paginator = None
+        if 'page' in request.query_params or 'page_size' in request.query_params:
+            paginator = self.pagination_class()
+            rows = paginator.paginate_queryset(rows, request, view=self)
+        
+        results = [
+            {
+                'property_id': row['id'],
+                'property_name': row['name'],
+                'total_revenue': row['total_revenue'],
+                'total_expenses': row['total_expenses'],
+                'net_income': row['net_income'],
+                'roi': row['period_roi'],
+                'occupancy_rate': row['occupancy_rate'],
+            }
+            for row in rows
+        ]
         
         serializer = PropertyFinancialSummarySerializer(results, many=True)
+        if paginator is not None:
+            return paginator.get_paginated_response(serializer.data)
         return Response(serializer.data)
 
 
 class MonthlyRevenueView(views.APIView):
-    """Monthly revenue breakdown"""
+    """Revenue and expense breakdown by month, week or day"""
     permission_classes = [IsAuthenticated]
     
+    GRANULARITIES = {
+        'month': (TruncMonth, relativedelta(months=1)),
+        'week': (TruncWeek, relativedelta(weeks=1)),
+        'day': (TruncDay, relativedelta(days=1)),
+    }
+    BREAKDOWNS = {
+        # breakdown -> (revenue column, expense column)
+        'property': ('financial_property', 'financial_property'),
+        'category': ('source', 'category'),
+    }
+    # Revenue sources and expense categories share names such as 'other' and
+    # 'maintenance', so their keys are prefixed with the ledger they come from
+    PREFIXED_BREAKDOWNS = {'category'}
+    MAX_BUCKETS = 5000
+    
     def get(self, request):
-        """Get monthly revenue for the last 12 months"""
-        from dateutil.relativedelta import relativedelta
-        
+        """
+        Get revenue and expenses per period
+
+        Query params:
+        - start, end: YYYY-MM-DD (default: the last 12 months up to today)
+        - granularity: month (default), week or day
+        - property_id: restrict to one property
+        - breakdown: property or category, adds per-period totals per key
+          (category keys are revenue:<source> and expense:<category>)
+
+        Runs one grouped query per ledger regardless of the range. Monthly
+        totals read whole months from the monthly rollup and only group raw
+        rows for partial edge months. Empty periods are zero-filled.
+        """
         today = timezone.now().date()
-        start_date = today - relativedelta(months=12)
+        granularity = request.query_params.get('granularity', 'month')
+        breakdown = request.query_params.get('breakdown')
+        property_id = request.query_params.get('property_id')
         
-        results = []
-        current_date = start_date
+        if granularity not in self.GRANULARITIES:
+            return Response(
+                {'error': f"granularity must be one of: {', '.join(self.GRANULARITIES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if breakdown and breakdown not in self.BREAKDOWNS:
+            return Response(
+                {'error': f"breakdown must be one of: {', '.join(self.BREAKDOWNS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        while current_date <= today:
-            month_start = current_date.replace(day=1)
-            month_end = (month_start + relativedelta(months=1)) - timedelta(days=1)
-            
-            revenues = Revenue.objects.filter(
-                date__gte=month_start,
-                date__lte=month_end
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
-            expenses = Expense.objects.filter(
-                date__gte=month_start,
-                date__lte=month_end
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
-            results.append({
-                'month': month_start,
-                'total_revenue': revenues,
-                'total_expenses': expenses,
-                'net_income': revenues - expenses
-            })
+        try:
+            start_date = self._parse_date(request.query_params.get('start')) or (
+                today - relativedelta(months=12)
+            ).replace(day=1)
+            end_date = self._parse_date(request.query_params.get('end')) or today
+        except ValueError:
+            return Response(
+                {'error': 'start and end must be dates in YYYY-MM-DD format'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if start_date > end_date:
+            return Response(
+                {'error': 'start must not be after end'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        trunc, step = self.GRANULARITIES[granularity]
+        buckets = self._buckets(start_date, end_date, granularity, step)
+        if len(buckets) > self.MAX_BUCKETS:
+            return Response(
+                {'error': f'Range too large: at most {self.MAX_BUCKETS} {granularity} periods per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        revenue_qs = Revenue.objects.filter(date__gte=start_date, date__lte=end_date)
+        expense_qs = Expense.objects.filter(date__gte=start_date, date__lte=end_date)
+        if property_id:
+            revenue_qs = revenue_qs.filter(financial_property_id=property_id)
+            expense_qs = expense_qs.filter(financial_property_id=property_id)
+        
+        if granularity == 'month':
+            # Whole months come from the monthly rollup, partial edge months from raw rows
+            revenues = monthly_totals('revenue', start_date, end_date, property_id, breakdown)
+            expenses = monthly_totals('expense', start_date, end_date, property_id, breakdown)
+        else:
+            revenue_key, expense_key = self.BREAKDOWNS.get(breakdown, (None, None))
+            revenues = self._grouped_totals(revenue_qs, trunc, revenue_key)
+            expenses = self._grouped_totals(expense_qs, trunc, expense_key)
+        
+        results = []
+        for bucket in buckets:
+            bucket_revenue = revenues.get(bucket, {})
+            bucket_expenses = expenses.get(bucket, {})
+            total_revenue = sum(bucket_revenue.values(), Decimal('0'))
+            total_expenses = sum(bucket_expenses.values(), Decimal('0'))
             
-            current_date = month_start + relativedelta(months=1)
+            row = {
+                'month': bucket,
+                'period': bucket,
+                'total_revenue': total_revenue,
+                'total_expenses': total_expenses,
+                'net_income': total_revenue - total_expenses
+            }
+            if breakdown:
+                if breakdown in self.PREFIXED_BREAKDOWNS:
+                    bucket_revenue = {f'revenue:{key}': value for key, value in bucket_revenue.items()}
+                    bucket_expenses = {f'expense:{key}': value for key, value in bucket_expenses.items()}
+                keys = set(bucket_revenue) | set(bucket_expenses)
+                row['breakdown'] = {
+                    str(key): {
+                        'revenue': bucket_revenue.get(key, Decimal('0')),
+                        'expenses': bucket_expenses.get(key, Decimal('0')),
+                    }
+                    for key in keys
+                }
+            results.append(row)
         
         serializer = MonthlyRevenueSerializer(results, many=True)
         return Response(serializer.data)
-
+    
+    def _parse_date(self, value):
+        if not value:
+            return None
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    
+    def _buckets(self, start_date, end_date, granularity, step):
+        """Every period start between start_date and end_date, aligned like the Trunc functions"""
+        if granularity == 'month':
+            current = start_date.replace(day=1)
+        elif granularity == 'week':
+            current = start_date - timedelta(days=start_date.weekday())
+        else:
+            current = start_date
+        
+        buckets = []
+        while current <= end_date and len(buckets) <= self.MAX_BUCKETS:
+            buckets.append(current)
+            current = current + step
+        return buckets
+    
+    def _grouped_totals(self, queryset, trunc, key=None):
+        """Sum amounts per period (and per breakdown key) in a single query"""
+        columns = ['bucket'] + ([key] if key else [])
+        rows = queryset.annotate(bucket=trunc('date')).order_by().values(*columns).annotate(
+            total=Sum('amount')
+        )
+        
+        totals = {}
+        for row in rows:
+            totals.setdefault(row['bucket'], {})[row[key] if key else None] = row['total']
+        return totals
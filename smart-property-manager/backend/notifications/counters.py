@@ -0,0 +1,196 @@
+"""
+Per-user unread notification counters
+
+The unread count lives in the Django cache with NotificationCounter as the
+durable fallback. Every code path that creates, reads, unreads or deletes
+notifications calls adjust_unread()/adjust_unread_many(), which apply an
+F() increment to the counter row and, once the transaction commits, an
+atomic cache.incr() and an "unread_count" event on the user's live stream
+(see pubsub.py). Counter rows are created lazily from a COUNT(*) on
+first read; ``manage.py reconcile_unread_counts`` periodically corrects any
+drift (e.g. after raw SQL or queryset updates that bypass this module).
+
+The cache is seeded from the counter row while it is locked, so writers
+queue behind the read instead of landing between the read and the cache
+write. The cached counts need a cache shared by every worker (Redis):
+with the per-process LocMem cache one worker's increments never reach the
+others, so reads go to the counter row instead.
+
+The counter includes expired rows until the sweeper deletes them, so the
+badge subtracts the user's expired unread rows. That number is cached with
+the next expiry time among the user's unread rows and recomputed once that
+moment passes or the user's unread set changes.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from config.caching import cache_is_shared
+from .models import Notification, NotificationCounter
+from .pubsub import publish_unread_deltas
+
+
+def cache_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def expiry_cache_key(user_id):
+    return f'notifications:unread-expired:{user_id}'
+
+
+def _cache_timeout():
+    return getattr(settings, 'NOTIFICATION_UNREAD_CACHE_TIMEOUT', 300)
+
+
+def _after_commit(deltas):
+    now = timezone.now()
+    expiry = cache.get_many([expiry_cache_key(user_id) for user_id in deltas])
+    cache.delete_many(list(expiry))
+
+    counts = {}
+    for user_id, delta in deltas.items():
+        try:
+            count = cache.incr(cache_key(user_id), delta)
+        except ValueError:
+            # Not cached; the next read loads the counter row
+            continue
+        # The raw counter is only the badge when none of the user's unread
+        # rows had expired
+        expired, next_expiry = expiry.get(expiry_cache_key(user_id), (None, None))
+        if expired == 0 and (next_expiry is None or next_expiry > now):
+            counts[user_id] = count
+    publish_unread_deltas(deltas, counts)
+
+
+def adjust_unread_many(deltas):
+    """Apply {user_id: delta} to the unread counters, one UPDATE per distinct delta"""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    users_by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        users_by_delta[delta].append(user_id)
+    for delta, user_ids in users_by_delta.items():
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(
+            unread_count=F('unread_count') + delta
+        )
+
+    transaction.on_commit(lambda: _after_commit(deltas))
+
+
+def adjust_unread(user_id, delta):
+    """Apply ``delta`` to one user's unread counter"""
+    adjust_unread_many({user_id: delta})
+
+
+def expired_unread_count(user_id, now=None):
+    """Unread rows of the user that have expired but not been swept yet"""
+    now = now or timezone.now()
+    key = expiry_cache_key(user_id)
+    shared = cache_is_shared()
+    if shared:
+        cached = cache.get(key)
+        if cached is not None:
+            expired, next_expiry = cached
+            if next_expiry is None or next_expiry > now:
+                return expired
+
+    stats = Notification.objects.filter(user_id=user_id, is_read=False, expires_at__isnull=False).aggregate(
+        expired=Count('id', filter=Q(expires_at__lte=now)),
+        next_expiry=Min('expires_at', filter=Q(expires_at__gt=now)),
+    )
+    if shared:
+        cache.set(key, (stats['expired'], stats['next_expiry']), _cache_timeout())
+    return stats['expired']
+
+
+def get_unread_count(user_id):
+    """Return the user's unread badge: the cached counter minus expired unread rows"""
+    return max(_counter_value(user_id) - expired_unread_count(user_id), 0)
+
+
+def _counter_value(user_id):
+    if not cache_is_shared():
+        return _locked_counter_value(user_id)
+
+    key = cache_key(user_id)
+    count = cache.get(key)
+    if count is not None:
+        return count
+
+    with transaction.atomic():
+        count = _locked_counter_value(user_id)
+        # Written before the lock is released: an adjustment queued behind
+        # it commits afterwards and its cache.incr() applies to this value
+        cache.set(key, count, _cache_timeout())
+    return count
+
+
+def _locked_counter_value(user_id):
+    """Read the counter row under a row lock, creating it from a COUNT(*) on first use"""
+    with transaction.atomic():
+        count = NotificationCounter.objects.select_for_update().filter(
+            user_id=user_id
+        ).values_list('unread_count', flat=True).first()
+        if count is not None:
+            return count
+
+    try:
+        with transaction.atomic():
+            count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+            NotificationCounter.objects.create(
+                user_id=user_id, unread_count=count, reconciled_at=timezone.now()
+            )
+            return count
+    except IntegrityError:
+        # Another request created the row first
+        return NotificationCounter.objects.values_list('unread_count', flat=True).get(user_id=user_id)
+
+
+def reconcile_unread_counts(batch_size=1000):
+    """
+    Reset every counter to the true unread count
+
+    Counter rows are locked before counting, so concurrent adjustments
+    queue behind the reconciliation instead of being overwritten.
+    Returns the number of counters that had drifted.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        counters = {
+            counter.user_id: counter
+            for counter in NotificationCounter.objects.select_for_update()
+        }
+        actual = dict(
+            Notification.objects.filter(is_read=False).order_by()
+            .values('user_id').annotate(unread=Count('id'))
+            .values_list('user_id', 'unread')
+        )
+
+        drifted = []
+        for user_id, counter in counters.items():
+            expected = actual.get(user_id, 0)
+            if counter.unread_count != expected:
+                drifted.append(user_id)
+            counter.unread_count = expected
+            counter.reconciled_at = now
+
+        NotificationCounter.objects.bulk_update(
+            counters.values(), ['unread_count', 'reconciled_at'], batch_size=batch_size
+        )
+        NotificationCounter.objects.bulk_create([
+            NotificationCounter(user_id=user_id, unread_count=unread, reconciled_at=now)
+            for user_id, unread in actual.items()
+            if user_id not in counters
+        ], batch_size=batch_size, ignore_conflicts=True)
+
+    if drifted:
+        cache.delete_many(
+            [cache_key(user_id) for user_id in drifted] + [expiry_cache_key(user_id) for user_id in drifted]
+        )
+    return len(drifted)
@@ -0,0 +1,226 @@
+"""
+Digest batching for NotificationPreference.digest_frequency and quiet hours
+
+dispatch_notification() holds events back as NotificationDigestItem rows for
+users on an hourly/daily/weekly digest or inside their quiet hours. Once a
+user's digest boundary has passed (top of the hour, midnight, Monday
+midnight) and they are outside quiet hours, send_digests() coalesces their
+pending items into one summary Notification and one email. Run it on a
+schedule with ``manage.py send_notification_digests``. Quiet hours and
+period boundaries are in the user's NotificationPreference.time_zone
+(TIME_ZONE when blank).
+"""
+from collections import defaultdict
+from datetime import timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from users.models import User
+from .counters import adjust_unread_many
+from .expiry import default_expiry
+from .models import Notification, NotificationDigestItem, NotificationPreference
+from .pubsub import publish_notifications
+
+
+# notification_type -> NotificationPreference email toggle
+EMAIL_PREFERENCE_FIELDS = {
+    'lease_expiring': 'email_lease_expiring',
+    'lease_expired': 'email_lease_expiring',
+    'payment_due': 'email_payment_due',
+    'payment_overdue': 'email_payment_due',
+    'payment_received': 'email_payment_received',
+    'maintenance_created': 'email_maintenance_updates',
+    'maintenance_updated': 'email_maintenance_updates',
+    'maintenance_completed': 'email_maintenance_updates',
+    'document_uploaded': 'email_document_uploaded',
+    'report_ready': 'email_report_ready',
+}
+
+PRIORITY_ORDER = ['low', 'normal', 'high', 'urgent']
+
+DIGEST_MAX_LINES = 20
+
+
+@lru_cache(maxsize=None)
+def user_timezone(name):
+    """tzinfo for a preference's time_zone, the default time zone when blank or unknown"""
+    if name:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return timezone.get_default_timezone()
+
+
+def period_start(frequency, moment, tz=None):
+    """Start of the digest period containing ``moment`` in ``tz``"""
+    local = timezone.localtime(moment, tz or timezone.get_default_timezone())
+    if frequency == 'hourly':
+        return local.replace(minute=0, second=0, microsecond=0)
+    if frequency == 'daily':
+        return local.replace(hour=0, minute=0, second=0, microsecond=0)
+    if frequency == 'weekly':
+        midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+        return midnight - timedelta(days=midnight.weekday())
+    return moment
+
+
+def in_quiet_hours(start, end, moment, tz=None):
+    """Whether ``moment`` falls in the quiet window (which may wrap past midnight) in ``tz``"""
+    if start is None or end is None or start == end:
+        return False
+    current = timezone.localtime(moment, tz or timezone.get_default_timezone()).time()
+    if start < end:
+        return start <= current < end
+    return current >= start or current < end
+
+
+def split_recipients(rows, priority, now=None):
+    """
+    Partition recipient rows into (immediate, deferred) user id lists
+
+    ``rows`` are (user id, digest_frequency, quiet_hours_start,
+    quiet_hours_end, time_zone) tuples as returned by resolve_recipients().
+    Urgent notifications skip the digest but are still held during quiet
+    hours.
+    """
+    now = now or timezone.now()
+    immediate, deferred = [], []
+    for user_id, frequency, quiet_start, quiet_end, time_zone in rows:
+        batched = frequency not in (None, 'immediate') and priority != 'urgent'
+        if batched or in_quiet_hours(quiet_start, quiet_end, now, user_timezone(time_zone)):
+            deferred.append(user_id)
+        else:
+            immediate.append(user_id)
+    return immediate, deferred
+
+
+def due_digests(now=None):
+    """Return {user_id: digest_frequency} for users whose digest should go out now"""
+    now = now or timezone.now()
+    pending = NotificationDigestItem.objects.values(
+        'user_id',
+        'user__notification_settings__digest_frequency',
+        'user__notification_settings__quiet_hours_start',
+        'user__notification_settings__quiet_hours_end',
+        'user__notification_settings__time_zone',
+    ).annotate(oldest=Min('created_at')).order_by()
+
+    due = {}
+    for row in pending:
+        frequency = row['user__notification_settings__digest_frequency'] or 'immediate'
+        tz = user_timezone(row['user__notification_settings__time_zone'])
+        if in_quiet_hours(row['user__notification_settings__quiet_hours_start'],
+                          row['user__notification_settings__quiet_hours_end'], now, tz):
+            continue
+        if row['oldest'] < period_start(frequency, now, tz):
+            due[row['user_id']] = frequency
+    return due
+
+
+def build_digest(user_id, frequency, items):
+    """Coalesce pending items into a single unsaved digest Notification"""
+    count = len(items)
+    noun = 'notification' if count == 1 else 'notifications'
+    if frequency in ('hourly', 'daily', 'weekly'):
+        title = f'Your {frequency} digest: {count} new {noun}'
+    else:
+        title = f'While you were away: {count} new {noun}'
+
+    lines = [f'- {item.title}' for item in items[:DIGEST_MAX_LINES]]
+    if count > DIGEST_MAX_LINES:
+        lines.append(f'...and {count - DIGEST_MAX_LINES} more')
+
+    return Notification(
+        user_id=user_id,
+        title=title,
+        message='\n'.join(lines),
+        notification_type='digest',
+        priority=max((item.priority for item in items), key=PRIORITY_ORDER.index),
+        related_object_type='digest',
+        action_url='/notifications',
+        expires_at=default_expiry('digest')
+    )
+
+
+def email_enabled(preferences, notification_type):
+    field = EMAIL_PREFERENCE_FIELDS.get(notification_type)
+    if field is None:
+        return True
+    if preferences is None:
+        return NotificationPreference._meta.get_field(field).default
+    return getattr(preferences, field)
+
+
+def send_digest_emails(digests, items_by_user):
+    """Send one email per digest, listing only the items the user opted into by email"""
+    users = User.objects.filter(
+        pk__in=[digest.user_id for digest in digests]
+    ).exclude(email='').select_related('notification_settings')
+    digests_by_user = {digest.user_id: digest for digest in digests}
+
+    messages = []
+    for user in users:
+        preferences = getattr(user, 'notification_settings', None)
+        lines = [
+            f'- {item.title}: {item.message}'
+            for item in items_by_user[user.pk]
+            if email_enabled(preferences, item.notification_type)
+        ]
+        if lines:
+            messages.append(EmailMessage(
+                subject=digests_by_user[user.pk].title,
+                body='\n'.join(lines),
+                to=[user.email]
+            ))
+
+    if messages:
+        get_connection(fail_silently=True).send_messages(messages)
+    return len(messages)
+
+
+def send_digests(now=None, batch_size=500):
+    """
+    Deliver every digest that is due
+
+    Items are claimed with SELECT ... FOR UPDATE SKIP LOCKED and deleted in
+    the same transaction that creates the summary notifications, so
+    overlapping runs never send the same item twice. Returns the number of
+    digests created.
+    """
+    now = now or timezone.now()
+    due = due_digests(now)
+    user_ids = sorted(due)
+
+    sent = 0
+    for offset in range(0, len(user_ids), batch_size):
+        chunk = user_ids[offset:offset + batch_size]
+        with transaction.atomic():
+            items = list(
+                NotificationDigestItem.objects.select_for_update(skip_locked=True)
+                .filter(user_id__in=chunk, created_at__lte=now)
+                .order_by('user_id', 'created_at')
+            )
+            items_by_user = defaultdict(list)
+            for item in items:
+                items_by_user[item.user_id].append(item)
+
+            digests = [
+                build_digest(user_id, due[user_id], user_items)
+                for user_id, user_items in items_by_user.items()
+            ]
+            Notification.objects.bulk_create(digests)
+            adjust_unread_many({digest.user_id: 1 for digest in digests})
+            transaction.on_commit(lambda digests=digests: publish_notifications(digests))
+            NotificationDigestItem.objects.filter(pk__in=[item.pk for item in items]).delete()
+
+        if digests:
+            send_digest_emails(digests, items_by_user)
+        sent += len(digests)
+
+    return sent
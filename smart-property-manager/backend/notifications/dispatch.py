@@ -0,0 +1,139 @@
+"""
+Notification fan-out
+
+dispatch_notification() turns one event into Notification rows for many
+users with a fixed number of queries: a single recipient query that applies
+NotificationPreference app_* opt-outs and de-duplicates against existing
+unread notifications and pending digest items, followed by one bulk_create. Users on a digest or in
+their quiet hours receive NotificationDigestItem rows instead (see digest.py).
+Created notifications are pushed to the recipients' live streams once the
+transaction commits.
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef, QuerySet
+
+from users.models import User
+from .counters import adjust_unread_many
+from .digest import split_recipients
+from .expiry import default_expiry
+from .models import Notification, NotificationDigestItem, NotificationPreference
+from .pubsub import publish_notifications
+
+
+# notification_type -> NotificationPreference in-app toggle
+APP_PREFERENCE_FIELDS = {
+    'lease_expiring': 'app_lease_expiring',
+    'lease_expired': 'app_lease_expiring',
+    'payment_due': 'app_payment_due',
+    'payment_overdue': 'app_payment_due',
+    'payment_received': 'app_payment_received',
+    'maintenance_created': 'app_maintenance_updates',
+    'maintenance_updated': 'app_maintenance_updates',
+    'maintenance_completed': 'app_maintenance_updates',
+    'document_uploaded': 'app_document_uploaded',
+    'report_ready': 'app_report_ready',
+}
+
+
+def recipient_queryset(recipients, notification_type, related_object_type='',
+                       related_object_id=None, dedupe=False, exclude=None):
+    """
+    Query for the (user id, digest_frequency, quiet_hours_start,
+    quiet_hours_end, time_zone) rows of the users who should receive a
+    notification
+
+    ``recipients`` may be a User queryset or an iterable of users/user ids.
+    Users who switched off the in-app toggle for ``notification_type`` are
+    dropped, as are users that already have an unread notification or a
+    pending digest item for the same object when ``dedupe`` is set.
+    """
+    if isinstance(recipients, QuerySet):
+        users = recipients
+    else:
+        ids = {getattr(user, 'pk', user) for user in recipients if user is not None}
+        users = User.objects.filter(pk__in=ids)
+
+    if exclude is not None:
+        users = users.exclude(pk=getattr(exclude, 'pk', exclude))
+
+    preference_field = APP_PREFERENCE_FIELDS.get(notification_type)
+    if preference_field:
+        users = users.exclude(Exists(
+            NotificationPreference.objects.filter(user=OuterRef('pk'), **{preference_field: False})
+        ))
+
+    if dedupe:
+        same_object = {
+            'user': OuterRef('pk'),
+            'related_object_type': related_object_type,
+            'related_object_id': related_object_id,
+            'notification_type': notification_type,
+        }
+        users = users.exclude(Exists(Notification.objects.filter(is_read=False, **same_object)))
+        users = users.exclude(Exists(NotificationDigestItem.objects.filter(**same_object)))
+
+    return users.order_by().values_list(
+        'pk',
+        'notification_settings__digest_frequency',
+        'notification_settings__quiet_hours_start',
+        'notification_settings__quiet_hours_end',
+        'notification_settings__time_zone',
+    ).distinct()
+
+
+def resolve_recipients(recipients, notification_type, **kwargs):
+    """Rows of recipient_queryset() as a list; runs a single query (none for an empty id list)"""
+    if not isinstance(recipients, QuerySet):
+        recipients = [user for user in recipients if user is not None]
+        if not recipients:
+            return []
+    return list(recipient_queryset(recipients, notification_type, **kwargs))
+
+
+def dispatch_notification(recipients, *, title, message, notification_type, priority='normal',
+                          related_object_type='', related_object_id=None, action_url='',
+                          expires_at=None, dedupe=False, exclude=None):
+    """
+    Create one notification per eligible recipient with a single bulk insert
+
+    Recipients whose preferences defer delivery get a digest item instead.
+    Returns the list of created Notification objects.
+    """
+    rows = resolve_recipients(
+        recipients,
+        notification_type,
+        related_object_type=related_object_type,
+        related_object_id=related_object_id,
+        dedupe=dedupe,
+        exclude=exclude
+    )
+    if not rows:
+        return []
+
+    immediate, deferred = split_recipients(rows, priority)
+    fields = {
+        'title': title,
+        'message': message,
+        'notification_type': notification_type,
+        'priority': priority,
+        'related_object_type': related_object_type,
+        'related_object_id': related_object_id,
+        'action_url': action_url,
+    }
+
+    if deferred:
+        NotificationDigestItem.objects.bulk_create([
+            NotificationDigestItem(user_id=user_id, **fields) for user_id in deferred
+        ])
+    if not immediate:
+        return []
+
+    if expires_at is None:
+        expires_at = default_expiry(notification_type)
+    notifications = Notification.objects.bulk_create([
+        Notification(user_id=user_id, expires_at=expires_at, **fields)
+        for user_id in immediate
+    ])
+    adjust_unread_many({user_id: 1 for user_id in immediate})
+    transaction.on_commit(lambda: publish_notifications(notifications))
+    return notifications
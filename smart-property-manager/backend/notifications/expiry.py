@@ -0,0 +1,105 @@
+"""
+Notification TTLs and the expiry sweeper
+
+Notifications of a type listed in NOTIFICATION_TTL_DAYS get an expires_at
+when they are created. Expired rows are hidden from list and count queries
+right away (Notification.objects.active()) and deleted by
+sweep_notifications(). The sweeper also removes read notifications older
+than the per-type NOTIFICATION_READ_RETENTION_DAYS. Deletion runs in small
+batches, each in its own short transaction that skips rows locked by
+concurrent requests, and unread rows it removes are taken off the users'
+unread counters.
+"""
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .counters import adjust_unread_many
+from .models import Notification
+
+
+def ttl_days(notification_type):
+    return getattr(settings, 'NOTIFICATION_TTL_DAYS', {}).get(notification_type)
+
+
+def default_expiry(notification_type, now=None):
+    """expires_at for a new notification of ``notification_type`` (None means it never expires)"""
+    days = ttl_days(notification_type)
+    if days is None:
+        return None
+    return (now or timezone.now()) + timedelta(days=days)
+
+
+def read_retention_conditions(now=None):
+    """
+    One condition per retention rule for read notifications past their retention
+
+    Types listed in NOTIFICATION_READ_RETENTION_DAYS use their own period
+    (None keeps them forever); every other type uses the 'default' entry.
+    """
+    now = now or timezone.now()
+    retention = dict(getattr(settings, 'NOTIFICATION_READ_RETENTION_DAYS', {'default': 90}))
+    default_days = retention.pop('default', None)
+
+    conditions = []
+    for notification_type, days in retention.items():
+        if days is not None:
+            conditions.append(Q(notification_type=notification_type) & _read_before(now - timedelta(days=days)))
+    if default_days is not None:
+        conditions.append(
+            ~Q(notification_type__in=list(retention)) & _read_before(now - timedelta(days=default_days))
+        )
+    return conditions
+
+
+def _read_before(cutoff):
+    # Rows marked read before read_at was tracked fall back to created_at
+    return Q(is_read=True) & (Q(read_at__lt=cutoff) | Q(read_at__isnull=True, created_at__lt=cutoff))
+
+
+def delete_in_batches(condition, batch_size=1000, pause=0.0, max_batches=None):
+    """
+    Delete notifications matching ``condition`` batch by batch
+
+    Each batch selects ids through the index, then locks and deletes them in
+    a short transaction (rows locked elsewhere are left for the next run).
+    Returns the number of rows deleted.
+    """
+    deleted = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = list(Notification.objects.filter(condition).order_by().values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            rows = list(
+                Notification.objects.select_for_update(skip_locked=True)
+                .filter(condition, id__in=ids)
+                .values_list('id', 'user_id', 'is_read')
+            )
+            if rows:
+                Notification.objects.filter(id__in=[row[0] for row in rows]).delete()
+                unread = Counter(user_id for _, user_id, is_read in rows if not is_read)
+                adjust_unread_many({user_id: -count for user_id, count in unread.items()})
+        deleted += len(rows)
+        batches += 1
+        if not rows:
+            # Everything left is locked by other transactions
+            break
+        if pause:
+            time.sleep(pause)
+    return deleted
+
+
+def sweep_notifications(batch_size=1000, pause=0.0, now=None):
+    """Delete expired notifications and read notifications past retention; returns counts"""
+    now = now or timezone.now()
+    result = {'expired': delete_in_batches(Q(expires_at__lte=now), batch_size, pause), 'read': 0}
+    for condition in read_retention_conditions(now):
+        result['read'] += delete_in_batches(condition, batch_size, pause)
+    return result
@@ -0,0 +1,96 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from notifications.expiry import sweep_notifications
+from notifications.models import Notification
+from users.models import User
+
+SEED_SQL = """
+INSERT INTO notifications_notification
+    (user_id, title, message, notification_type, priority, is_read, read_at,
+     related_object_type, action_url, created_at, expires_at)
+SELECT
+    (%(user_ids)s::bigint[])[1 + (n %% %(user_count)s)],
+    'Benchmark notification', 'Seeded by benchmark_notification_expiry', 'info', 'normal',
+    n %% 3 = 0,
+    CASE WHEN n %% 3 = 0 THEN %(now)s - (n %% 365) * interval '1 day' END,
+    'benchmark', '',
+    %(now)s - (n %% 365) * interval '1 day',
+    CASE WHEN n %% 2 = 0 THEN %(now)s - (n %% 30 - 10) * interval '1 day' END
+FROM generate_series(1, %(rows)s) AS n
+"""
+
+
+class Command(BaseCommand):
+    help = 'Measure notification list/count latency before and after the expiry sweep on a seeded table (PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000, help='Notifications to seed')
+        parser.add_argument('--users', type=int, default=1000, help='Users the rows are spread over')
+        parser.add_argument('--samples', type=int, default=50, help='Timed queries per measurement')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded users and rows')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('The benchmark seeds rows with generate_series and needs PostgreSQL')
+
+        users = self.seed_users(options['users'])
+        user_ids = [user.pk for user in users]
+        try:
+            self.stdout.write(f"Seeding {options['rows']} notifications...")
+            with connection.cursor() as cursor:
+                cursor.execute(SEED_SQL, {
+                    'user_ids': user_ids, 'user_count': len(user_ids),
+                    'now': timezone.now(), 'rows': options['rows'],
+                })
+                cursor.execute('ANALYZE notifications_notification')
+
+            self.report('before sweep (expired rows filtered)', user_ids, options['samples'])
+
+            start = time.perf_counter()
+            result = sweep_notifications(batch_size=5000)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"Sweep deleted {result['expired']} expired and {result['read']} read rows in {elapsed:.1f}s"
+            )
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM ANALYZE notifications_notification')
+
+            self.report('after sweep', user_ids, options['samples'])
+        finally:
+            if not options['keep']:
+                # Cascades to the seeded notifications
+                User.objects.filter(pk__in=user_ids).delete()
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def seed_users(self, count):
+        stamp = int(time.time())
+        return User.objects.bulk_create([
+            User(username=f'bench-expiry-{stamp}-{i}', email=f'bench-expiry-{stamp}-{i}@example.com')
+            for i in range(count)
+        ])
+
+    def report(self, label, user_ids, samples):
+        list_times, count_times = [], []
+        for i in range(samples):
+            queryset = Notification.objects.active().filter(user_id=user_ids[i % len(user_ids)])
+            start = time.perf_counter()
+            list(queryset.order_by('-created_at')[:20])
+            list_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            queryset.count()
+            count_times.append(time.perf_counter() - start)
+
+        self.stdout.write(f'{label}:')
+        for name, times in (('list (first page)', list_times), ('count', count_times)):
+            times.sort()
+            self.stdout.write(
+                f'  {name:18} p50 {statistics.median(times) * 1000:8.2f} ms'
+                f'  p95 {times[int(len(times) * 0.95) - 1] * 1000:8.2f} ms'
+            )
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from notifications.outbox import process_outbox, purge_outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver notifications left pending in the outbox (e.g. after a restart) and purge old sent rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Outbox rows claimed per batch')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when the outbox is empty')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls with --loop')
+        parser.add_argument('--retention-days', type=int, default=None, help='Keep sent rows this many days (default: NOTIFICATION_OUTBOX_RETENTION_DAYS)')
+
+    def handle(self, *args, **options):
+        total = 0
+        purged = 0
+        while True:
+            processed = process_outbox(batch_size=options['batch_size'])
+            total += processed
+            if processed:
+                continue
+            purged += purge_outbox(retention_days=options['retention_days'])
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} outbox entries, purged {purged} sent entries'))
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from notifications.dispatch import recipient_queryset
+from notifications.models import Notification
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Print EXPLAIN output for the notification hot queries (use --check in CI to catch sequential scans)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='User id to plan for (defaults to a user with notifications)')
+        parser.add_argument('--analyze', action='store_true', help='Run EXPLAIN ANALYZE (executes the queries)')
+        parser.add_argument('--check', action='store_true',
+                            help='Exit with an error if a plan scans the whole notifications table')
+
+    def handle(self, *args, **options):
+        user_id = options.get('user') or self.default_user()
+        if user_id is None:
+            raise CommandError('No users found; pass --user')
+
+        sample = Notification.objects.filter(user_id=user_id).exclude(related_object_id=None).first()
+        related = {
+            'related_object_type': sample.related_object_type if sample else 'lease',
+            'related_object_id': sample.related_object_id if sample else 1,
+            'notification_type': sample.notification_type if sample else 'lease_expiring',
+        }
+
+        user_notifications = Notification.objects.active().filter(user_id=user_id)
+        queries = [
+            ('List (newest first)', user_notifications.order_by('-created_at')[:20]),
+            ('Unread list', user_notifications.filter(is_read=False).order_by('-created_at')[:20]),
+            ('Unread count', Notification.objects.filter(user_id=user_id, is_read=False).values('user_id')
+                .annotate(unread=Count('id')).order_by()),
+            ('Dedup check', Notification.objects.filter(user_id=user_id, is_read=False, **related).values('id')[:1]),
+            ('Dispatch recipients (dedupe)', recipient_queryset(
+                User.objects.filter(pk=user_id), related['notification_type'], dedupe=True,
+                related_object_type=related['related_object_type'],
+                related_object_id=related['related_object_id']
+            )),
+            ('Mark all read', Notification.objects.filter(user_id=user_id, is_read=False).values('id')),
+            ('Expiry sweep', Notification.objects.filter(expires_at__lte=timezone.now()).values('id')[:1000]),
+        ]
+
+        explain_options = {'analyze': True, 'buffers': True} if options['analyze'] else {}
+        if connection.vendor != 'postgresql':
+            explain_options = {}
+        table = Notification._meta.db_table
+        full_scans = []
+        for name, queryset in queries:
+            plan = queryset.explain(**explain_options)
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{name}:'))
+            self.stdout.write(plan)
+            self.stdout.write('')
+            if f'Seq Scan on {table}' in plan:
+                full_scans.append(name)
+
+        if full_scans and options['check']:
+            raise CommandError(f"Full table scans in: {', '.join(full_scans)}")
+        if full_scans:
+            self.stdout.write(self.style.WARNING(f"Full table scans in: {', '.join(full_scans)}"))
+        self.stdout.write(self.style.SUCCESS(f'Explained {len(queries)} queries for user {user_id}'))
+
+    def default_user(self):
+        user_id = Notification.objects.order_by().values_list('user_id', flat=True).first()
+        return user_id or User.objects.order_by('pk').values_list('pk', flat=True).first()
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from notifications.counters import reconcile_unread_counts
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-user unread notification counters (run periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Counter rows written per batch')
+
+    def handle(self, *args, **options):
+        drifted = reconcile_unread_counts(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Reconciled unread counters ({drifted} had drifted)'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from notifications.digest import send_digests
+
+
+class Command(BaseCommand):
+    help = 'Coalesce pending digest items into one summary notification and email per user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Users processed per transaction')
+
+    def handle(self, *args, **options):
+        sent = send_digests(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} digests'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from notifications.expiry import sweep_notifications
+
+
+class Command(BaseCommand):
+    help = 'Delete expired notifications and read notifications past their retention (run periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per transaction')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        result = sweep_notifications(batch_size=options['batch_size'], pause=options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {result['expired']} expired and {result['read']} old read notifications"
+        ))
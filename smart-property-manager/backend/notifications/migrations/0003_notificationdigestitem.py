@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notifications', '0002_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('info', 'Information'), ('success', 'Success'), ('warning', 'Warning'), ('error', 'Error'), ('lease_expiring', 'Lease Expiring'), ('lease_expired', 'Lease Expired'), ('payment_due', 'Payment Due'), ('payment_overdue', 'Payment Overdue'), ('payment_received', 'Payment Received'), ('maintenance_created', 'Maintenance Request Created'), ('maintenance_updated', 'Maintenance Request Updated'), ('maintenance_completed', 'Maintenance Request Completed'), ('document_uploaded', 'Document Uploaded'), ('report_ready', 'Report Ready'), ('tenant_added', 'Tenant Added'), ('tenant_updated', 'Tenant Updated'), ('digest', 'Digest')], max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='notificationtemplate',
+            name='notification_type',
+            field=models.CharField(choices=[('info', 'Information'), ('success', 'Success'), ('warning', 'Warning'), ('error', 'Error'), ('lease_expiring', 'Lease Expiring'), ('lease_expired', 'Lease Expired'), ('payment_due', 'Payment Due'), ('payment_overdue', 'Payment Overdue'), ('payment_received', 'Payment Received'), ('maintenance_created', 'Maintenance Request Created'), ('maintenance_updated', 'Maintenance Request Updated'), ('maintenance_completed', 'Maintenance Request Completed'), ('document_uploaded', 'Document Uploaded'), ('report_ready', 'Report Ready'), ('tenant_added', 'Tenant Added'), ('tenant_updated', 'Tenant Updated'), ('digest', 'Digest')], max_length=50),
+        ),
+        migrations.CreateModel(
+            name='NotificationDigestItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('notification_type', models.CharField(choices=[('info', 'Information'), ('success', 'Success'), ('warning', 'Warning'), ('error', 'Error'), ('lease_expiring', 'Lease Expiring'), ('lease_expired', 'Lease Expired'), ('payment_due', 'Payment Due'), ('payment_overdue', 'Payment Overdue'), ('payment_received', 'Payment Received'), ('maintenance_created', 'Maintenance Request Created'), ('maintenance_updated', 'Maintenance Request Updated'), ('maintenance_completed', 'Maintenance Request Completed'), ('document_uploaded', 'Document Uploaded'), ('report_ready', 'Report Ready'), ('tenant_added', 'Tenant Added'), ('tenant_updated', 'Tenant Updated'), ('digest', 'Digest')], max_length=50)),
+                ('priority', models.CharField(choices=[('low', 'Low'), ('normal', 'Normal'), ('high', 'High'), ('urgent', 'Urgent')], default='normal', max_length=20)),
+                ('related_object_type', models.CharField(blank=True, max_length=50)),
+                ('related_object_id', models.IntegerField(blank=True, null=True)),
+                ('action_url', models.CharField(blank=True, max_length=500)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_digest_items', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'notification_digest_items',
+                'ordering': ['user', 'created_at'],
+                'indexes': [models.Index(fields=['user', 'created_at'], name='notificatio_user_id_af5a8f_idx')],
+            },
+        ),
+    ]
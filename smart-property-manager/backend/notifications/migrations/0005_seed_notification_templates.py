@@ -0,0 +1,69 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations
+
+
+# Frozen copy of notifications.templating.DEFAULT_TEMPLATES at the time of
+# this migration; later edits to the built-in templates must not change it.
+SEED_TEMPLATES = {
+    'lease_expiring': {
+        'notification_type': 'lease_expiring',
+        'title_template': 'Lease Expiring Soon: {property}',
+        'message_template': 'The lease for {tenant} at {property} will expire on {end_date}.',
+        'priority': 'high',
+    },
+    'payment_overdue': {
+        'notification_type': 'payment_overdue',
+        'title_template': 'Payment Overdue: {tenant}',
+        'message_template': 'Payment of ${amount_due} is overdue. Due date was {due_date}.',
+        'priority': 'urgent',
+    },
+    'payment_received': {
+        'notification_type': 'payment_received',
+        'title_template': 'Payment Received: {tenant}',
+        'message_template': 'Payment of ${amount_paid} has been received.',
+        'priority': 'normal',
+    },
+    'maintenance_created': {
+        'notification_type': 'maintenance_created',
+        'title_template': 'New Maintenance Request: {title}',
+        'message_template': 'A new {priority} priority maintenance request has been created at {property}.',
+        'priority': 'normal',
+    },
+    'maintenance_completed': {
+        'notification_type': 'maintenance_completed',
+        'title_template': 'Maintenance Completed: {title}',
+        'message_template': 'The maintenance request at {property} has been completed.',
+        'priority': 'normal',
+    },
+    'document_uploaded': {
+        'notification_type': 'document_uploaded',
+        'title_template': 'New Document: {name}',
+        'message_template': 'A new {category} document has been uploaded{property_suffix}.',
+        'priority': 'low',
+    },
+    'report_ready': {
+        'notification_type': 'report_ready',
+        'title_template': 'Report Ready: {name}',
+        'message_template': 'Your {report_type} report is ready for download.',
+        'priority': 'normal',
+    },
+}
+
+
+def seed_templates(apps, schema_editor):
+    """Create editable rows for the templates used by the signal handlers"""
+    NotificationTemplate = apps.get_model('notifications', 'NotificationTemplate')
+    for name, fields in SEED_TEMPLATES.items():
+        NotificationTemplate.objects.get_or_create(name=name, defaults=fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_notificationcounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_templates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+
+from config.migration_operations import AddIndexConcurrently, RemoveIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # CREATE/DROP INDEX CONCURRENTLY (used on PostgreSQL) cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('notifications', '0005_seed_notification_templates'),
+    ]
+
+    operations = [
+        # The replacement is built before the old index is dropped so the
+        # notification list never runs without an index
+        AddIndexConcurrently(
+            model_name='notification',
+            index=models.Index(fields=['user', 'created_at'], include=['expires_at'], name='notif_user_created_exp_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='notification',
+            name='notificatio_user_id_c62b26_idx',
+        ),
+        AddIndexConcurrently(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('expires_at__isnull', False)), fields=['expires_at'], name='notif_expires_at_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', True)), fields=['notification_type', 'read_at'], name='notif_read_retention_idx'),
+        ),
+    ]
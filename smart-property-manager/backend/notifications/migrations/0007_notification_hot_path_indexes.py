@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+
+from config.migration_operations import AddIndexConcurrently, RemoveIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # CREATE/DROP INDEX CONCURRENTLY (used on PostgreSQL) cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('notifications', '0006_notification_expiry_indexes'),
+    ]
+
+    operations = [
+        # New indexes first; the ones they replace are dropped afterwards
+        AddIndexConcurrently(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', 'created_at'], include=['expires_at'], name='notif_user_unread_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', 'related_object_type', 'related_object_id', 'notification_type'], name='notif_unread_dedup_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='notification',
+            name='notificatio_user_id_427e4b_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='notification',
+            name='notificatio_notific_f2898f_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='notification',
+            name='notificatio_priorit_bf8ea0_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='notification',
+            name='notificatio_created_46ad24_idx',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0007_notification_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, help_text='Earliest retry of a failed attempt', null=True),
+        ),
+    ]
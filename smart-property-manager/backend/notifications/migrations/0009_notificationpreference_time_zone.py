@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+import notifications.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0008_notificationoutbox_next_attempt_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationpreference',
+            name='time_zone',
+            field=models.CharField(blank=True, help_text='IANA time zone for quiet hours and digest boundaries; blank uses TIME_ZONE', max_length=64, validators=[notifications.models.validate_time_zone]),
+        ),
+    ]
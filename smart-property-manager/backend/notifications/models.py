@@ -1,6 +1,28 @@
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import Q
 from django.utils import timezone
 from users.models import User
+from .templating import validate_template
+
+
+def validate_time_zone(value):
+    """Reject names that are not IANA time zones"""
+    try:
+        ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f'Unknown time zone: {value}')
+
+
+class NotificationQuerySet(models.QuerySet):
+    """Queryset helpers for Notification"""
+    
+    def active(self, now=None):
+        """Exclude expired notifications (the sweeper deletes them later)"""
+        return self.filter(Q(expires_at__isnull=True) | Q(expires_at__gt=now or timezone.now()))
 
 
 class Notification(models.Model):
@@ -23,6 +45,7 @@ class Notification(models.Model):
         ('report_ready', 'Report Ready'),
         ('tenant_added', 'Tenant Added'),
         ('tenant_updated', 'Tenant Updated'),
+        ('digest', 'Digest'),
     ]
     
     PRIORITY_CHOICES = [
@@ -56,32 +79,56 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField(null=True, blank=True, help_text='Notification expiry time')
     
+    objects = NotificationQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
+        # One index per hot query (see ``manage.py explain_notification_queries``)
         indexes = [
-            models.Index(fields=['user', 'is_read']),
-            models.Index(fields=['user', 'created_at']),
-            models.Index(fields=['notification_type']),
-            models.Index(fields=['priority']),
-            models.Index(fields=['created_at']),
+            # A user's notifications newest first; expires_at is included so
+            # expired rows are filtered from the index entries
+            models.Index(fields=['user', 'created_at'], include=['expires_at'], name='notif_user_created_exp_idx'),
+            # Unread list, unread count and mark_all_read
+            models.Index(
+                fields=['user', 'created_at'], include=['expires_at'],
+                condition=Q(is_read=False), name='notif_user_unread_idx'
+            ),
+            # De-duplication against existing unread notifications in dispatch_notification
+            models.Index(
+                fields=['user', 'related_object_type', 'related_object_id', 'notification_type'],
+                condition=Q(is_read=False), name='notif_unread_dedup_idx'
+            ),
+            # Expiry sweeper: expired rows and read rows past retention
+            models.Index(fields=['expires_at'], condition=Q(expires_at__isnull=False), name='notif_expires_at_idx'),
+            models.Index(fields=['notification_type', 'read_at'], condition=Q(is_read=True), name='notif_read_retention_idx'),
         ]
     
     def __str__(self):
         return f"{self.title} - {self.user.username}"
     
+    def save(self, *args, **kwargs):
+        from .expiry import default_expiry
+        if self._state.adding and self.expires_at is None:
+            self.expires_at = default_expiry(self.notification_type)
+        super().save(*args, **kwargs)
+    
     def mark_as_read(self):
         """Mark notification as read"""
+        from .counters import adjust_unread
         if not self.is_read:
             self.is_read = True
             self.read_at = timezone.now()
-            self.save()
+            self.save(update_fields=['is_read', 'read_at'])
+            adjust_unread(self.user_id, -1)
     
     def mark_as_unread(self):
         """Mark notification as unread"""
+        from .counters import adjust_unread
         if self.is_read:
             self.is_read = False
             self.read_at = None
-            self.save()
+            self.save(update_fields=['is_read', 'read_at'])
+            adjust_unread(self.user_id, 1)
     
     def is_expired(self):
         """Check if notification is expired"""
@@ -90,6 +137,46 @@ class Notification(models.Model):
         return False
 
 
+class NotificationCounter(models.Model):
+    """Per-user unread notification count, the DB fallback behind the cached counter"""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter'
+    )
+    unread_count = models.IntegerField(default=0)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'notification_counters'
+    
+    def __str__(self):
+        return f"{self.unread_count} unread for {self.user_id}"
+
+
+class NotificationDigestItem(models.Model):
+    """Event held back for a user's next digest (digest frequency or quiet hours)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='pending_digest_items')
+    
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    notification_type = models.CharField(max_length=50, choices=Notification.TYPE_CHOICES)
+    priority = models.CharField(max_length=20, choices=Notification.PRIORITY_CHOICES, default='normal')
+    related_object_type = models.CharField(max_length=50, blank=True)
+    related_object_id = models.IntegerField(null=True, blank=True)
+    action_url = models.CharField(max_length=500, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'notification_digest_items'
+        ordering = ['user', 'created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.title} (pending digest for {self.user_id})"
+
+
 class NotificationPreference(models.Model):
     """User notification preferences"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='notification_settings')
@@ -125,6 +212,10 @@ class NotificationPreference(models.Model):
     # Quiet hours
     quiet_hours_start = models.TimeField(null=True, blank=True)
     quiet_hours_end = models.TimeField(null=True, blank=True)
+    time_zone = models.CharField(
+        max_length=64, blank=True, validators=[validate_time_zone],
+        help_text='IANA time zone for quiet hours and digest boundaries; blank uses TIME_ZONE'
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -154,8 +245,50 @@ class NotificationTemplate(models.Model):
     def __str__(self):
         return self.name
     
+    def compile(self):
+        """Pre-parsed template (see templating.py); raises ValueError if invalid"""
+        compiled = validate_template(self.name, self.title_template, self.message_template)
+        compiled.notification_type = self.notification_type
+        compiled.priority = self.priority
+        return compiled
+    
+    def clean(self):
+        # Run by the admin form and NotificationTemplateSerializer; rows that
+        # still fail to compile are skipped by the registry
+        try:
+            self.compile()
+        except ValueError as e:
+            raise ValidationError(f'Invalid template: {e}')
+    
     def render(self, context):
         """Render template with context"""
-        title = self.title_template.format(**context)
-        message = self.message_template.format(**context)
-        return title, message
+        return self.compile().render(context)
+
+
+class NotificationOutbox(models.Model):
+    """Pending notification fan-out, written in the same transaction as the event"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    payload = models.JSONField(encoder=DjangoJSONEncoder, help_text='Recipients and notification fields')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    next_attempt_at = models.DateTimeField(null=True, blank=True, help_text='Earliest retry of a failed attempt')
+    
+    class Meta:
+        db_table = 'notification_outbox'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"Outbox #{self.id} ({self.status})"
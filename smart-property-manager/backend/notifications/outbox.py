@@ -0,0 +1,213 @@
+"""
+Deferred, transaction-aware notification dispatch
+
+enqueue_notification() records the event as a NotificationOutbox row inside
+the caller's transaction, so a rollback discards it together with the write
+that caused it. Once the transaction commits, the row id is handed to an
+in-process worker thread that drains the queue in batches and performs the
+fan-out through dispatch_notification(). A failed attempt is retried with
+exponential backoff (NOTIFICATION_OUTBOX_RETRY_DELAY seconds, doubling per
+attempt) by the worker thread, which also polls for due retries while it
+is idle; rows left pending by a restart are picked up by
+``manage.py drain_notification_outbox``, which also purges sent rows older
+than NOTIFICATION_OUTBOX_RETENTION_DAYS.
+"""
+import logging
+import queue
+import threading
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from users.models import User
+from .dispatch import dispatch_notification
+from .models import NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+MAX_RETRY_DELAY = 3600
+
+
+def retry_delay(attempts):
+    """Seconds to wait before attempt ``attempts + 1``"""
+    base = getattr(settings, 'NOTIFICATION_OUTBOX_RETRY_DELAY', 30)
+    return min(base * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def _recipient_query(payload):
+    """Rebuild the recipient queryset from the filters stored in the payload"""
+    conditions = [Q(**filters) for filters in payload.get('recipient_filters', [])]
+    if payload.get('user_ids'):
+        conditions.append(Q(pk__in=payload['user_ids']))
+    if not conditions:
+        return User.objects.none()
+    return User.objects.filter(reduce(or_, conditions))
+
+
+def enqueue_notification(recipients=None, *, recipient_filters=None, **fields):
+    """
+    Queue a notification for delivery once the current transaction commits
+
+    ``recipients`` is an iterable of users or user ids; ``recipient_filters``
+    is a list of User filter kwargs that are OR-ed together and resolved by
+    the worker, so the caller's write pays for a single INSERT. Remaining
+    keyword arguments are passed to dispatch_notification().
+    """
+    user_ids = sorted({getattr(user, 'pk', user) for user in recipients or [] if user is not None})
+    if not user_ids and not recipient_filters:
+        return None
+
+    if fields.get('exclude') is not None:
+        fields['exclude'] = getattr(fields['exclude'], 'pk', fields['exclude'])
+
+    entry = NotificationOutbox.objects.create(payload={
+        'user_ids': user_ids,
+        'recipient_filters': recipient_filters or [],
+        'fields': fields,
+    })
+    transaction.on_commit(lambda: dispatch_queue.put(entry.id))
+    return entry
+
+
+def process_outbox(ids=None, batch_size=100):
+    """
+    Deliver pending outbox rows, optionally restricted to ``ids``
+
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED so the worker
+    thread and the drain command can run side by side. Each row is delivered
+    in its own savepoint; a failed row is scheduled for another attempt
+    after retry_delay() until MAX_ATTEMPTS. Rows waiting for their retry
+    are skipped. Returns the number of rows processed.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        entries = NotificationOutbox.objects.select_for_update(skip_locked=True).filter(
+            Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now),
+            status='pending'
+        )
+        if ids is not None:
+            entries = entries.filter(pk__in=ids)
+        entries = list(entries.order_by('id')[:batch_size])
+
+        for entry in entries:
+            entry.attempts += 1
+            try:
+                with transaction.atomic():
+                    fields = dict(entry.payload.get('fields', {}))
+                    if fields.get('expires_at'):
+                        fields['expires_at'] = parse_datetime(fields['expires_at'])
+                    dispatch_notification(_recipient_query(entry.payload), **fields)
+            except Exception as exc:
+                logger.exception('Notification outbox entry %s failed', entry.id)
+                entry.last_error = str(exc)
+                if entry.attempts >= MAX_ATTEMPTS:
+                    entry.status = 'failed'
+                    entry.next_attempt_at = None
+                else:
+                    entry.next_attempt_at = now + timedelta(seconds=retry_delay(entry.attempts))
+            else:
+                entry.status = 'sent'
+                entry.last_error = ''
+                entry.next_attempt_at = None
+            entry.processed_at = now
+
+        NotificationOutbox.objects.bulk_update(
+            entries, ['status', 'attempts', 'last_error', 'processed_at', 'next_attempt_at']
+        )
+
+    return len(entries)
+
+
+def purge_outbox(retention_days=None, batch_size=1000, now=None):
+    """
+    Delete sent outbox rows processed more than ``retention_days`` ago
+
+    Failed rows are kept for inspection. Returns the number of rows deleted.
+    """
+    if retention_days is None:
+        retention_days = getattr(settings, 'NOTIFICATION_OUTBOX_RETENTION_DAYS', 7)
+    cutoff = (now or timezone.now()) - timedelta(days=retention_days)
+
+    deleted = 0
+    while True:
+        ids = list(
+            NotificationOutbox.objects.filter(status='sent', processed_at__lt=cutoff)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += NotificationOutbox.objects.filter(pk__in=ids).delete()[0]
+
+
+class DispatchQueue:
+    """
+    In-process queue of committed outbox ids, drained by a daemon thread
+
+    With NOTIFICATION_DISPATCH_ASYNC disabled (e.g. in tests or one-off
+    scripts) entries are delivered inline in the on_commit callback instead.
+    When no id arrives for ``retry_interval`` seconds the thread delivers
+    whatever pending rows are due, which covers retries of failed attempts.
+    """
+
+    def __init__(self, batch_size=100, poll_interval=0.25, retry_interval=30):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def put(self, entry_id):
+        if not getattr(settings, 'NOTIFICATION_DISPATCH_ASYNC', True):
+            process_outbox([entry_id], batch_size=1)
+            return
+        self._queue.put(entry_id)
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='notification-dispatch', daemon=True
+                )
+                self._thread.start()
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.retry_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get(timeout=self.poll_interval if len(batch) == 1 else 0))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                close_old_connections()
+                if batch:
+                    process_outbox(batch, batch_size=len(batch))
+                else:
+                    process_outbox(batch_size=self.batch_size)
+            except Exception:
+                # Entries stay pending and are retried by drain_notification_outbox
+                logger.exception('Notification dispatch worker failed for %d entries', len(batch))
+            finally:
+                close_old_connections()
+
+
+dispatch_queue = DispatchQueue(
+    batch_size=getattr(settings, 'NOTIFICATION_DISPATCH_BATCH_SIZE', 100),
+    retry_interval=getattr(settings, 'NOTIFICATION_OUTBOX_RETRY_DELAY', 30)
+)
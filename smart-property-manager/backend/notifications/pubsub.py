@@ -0,0 +1,214 @@
+"""
+Publish/subscribe for the live notification stream
+
+Dispatch paths publish per-user events ("notification", "unread_count")
+after their transaction commits; the SSE view in views.py subscribes one
+queue per open connection. The in-process broker fans events out to the
+connections held by this process only. With NOTIFICATION_STREAM_BACKEND =
+'redis' events go through Redis pub/sub, and every worker relays the
+channels of its connected users into its own in-process hub, so an event
+published by any process reaches the user's connections on every worker.
+"""
+import asyncio
+import json
+import logging
+import threading
+import weakref
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'notifications:stream:'
+
+
+def channel_name(user_id):
+    return f'{CHANNEL_PREFIX}{user_id}'
+
+
+class Subscription:
+    """Bounded event queue of one SSE connection, bound to its event loop"""
+
+    def __init__(self, user_id, maxsize):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize)
+        self.loop = asyncio.get_running_loop()
+
+    def put(self, message):
+        # A client that cannot keep up loses its oldest events, not the newest
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class LocalHub:
+    """user id -> subscriptions held by this process; deliver() is thread-safe"""
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def add(self, subscription):
+        with self._lock:
+            first = not self._subscriptions[subscription.user_id]
+            self._subscriptions[subscription.user_id].add(subscription)
+        return first
+
+    def remove(self, subscription):
+        """Drop a subscription; returns True when it was the user's last one"""
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if subscriptions:
+                return False
+            self._subscriptions.pop(subscription.user_id, None)
+            return True
+
+    def has_subscribers(self, user_id):
+        with self._lock:
+            return bool(self._subscriptions.get(user_id))
+
+    def deliver(self, user_id, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, message)
+            except RuntimeError:
+                # The connection's event loop has already closed
+                pass
+
+
+class InProcessBroker:
+    """Delivers events to connections held by the publishing process"""
+
+    def __init__(self):
+        self.hub = LocalHub()
+
+    def publish_many(self, messages):
+        """Publish (user_id, message) pairs"""
+        for user_id, message in messages:
+            self.hub.deliver(user_id, message)
+
+    async def subscribe(self, user_id):
+        subscription = Subscription(user_id, getattr(settings, 'NOTIFICATION_STREAM_QUEUE_SIZE', 100))
+        self.hub.add(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription):
+        self.hub.remove(subscription)
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Redis pub/sub relay on top of the in-process hub
+
+    Publishing uses a synchronous client (pipelined). Each event loop that
+    serves SSE connections keeps one asyncio pub/sub connection, subscribed
+    to the channels of the users it currently streams to.
+    """
+
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+        self._client = None
+        self._relays = weakref.WeakKeyDictionary()
+
+    def _sync_client(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def publish_many(self, messages):
+        pipeline = self._sync_client().pipeline(transaction=False)
+        for user_id, message in messages:
+            pipeline.publish(channel_name(user_id), json.dumps(message, cls=DjangoJSONEncoder))
+        try:
+            pipeline.execute()
+        except Exception:
+            # Live updates are best effort; clients resync on reconnect
+            logger.exception('Failed to publish %d notification stream events', len(messages))
+
+    def _relay(self):
+        loop = asyncio.get_running_loop()
+        relay = self._relays.get(loop)
+        if relay is None:
+            import redis.asyncio as aioredis
+            relay = {
+                'pubsub': aioredis.Redis.from_url(self.url).pubsub(ignore_subscribe_messages=True),
+                'lock': asyncio.Lock(),
+                'task': None,
+            }
+            self._relays[loop] = relay
+        return relay
+
+    async def _listen(self, pubsub):
+        while pubsub.subscribed:
+            try:
+                message = await pubsub.get_message(timeout=1.0)
+            except Exception:
+                logger.exception('Notification stream relay lost its Redis connection')
+                await asyncio.sleep(1)
+                continue
+            if message and message['type'] == 'message':
+                user_id = int(message['channel'].decode()[len(CHANNEL_PREFIX):])
+                self.hub.deliver(user_id, json.loads(message['data']))
+
+    async def subscribe(self, user_id):
+        subscription = await super().subscribe(user_id)
+        relay = self._relay()
+        async with relay['lock']:
+            await relay['pubsub'].subscribe(channel_name(user_id))
+            if relay['task'] is None or relay['task'].done():
+                relay['task'] = asyncio.get_running_loop().create_task(self._listen(relay['pubsub']))
+        return subscription
+
+    async def unsubscribe(self, subscription):
+        if self.hub.remove(subscription):
+            relay = self._relay()
+            async with relay['lock']:
+                if not self.hub.has_subscribers(subscription.user_id):
+                    await relay['pubsub'].unsubscribe(channel_name(subscription.user_id))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Broker selected by NOTIFICATION_STREAM_BACKEND ('memory' or 'redis')"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = getattr(settings, 'NOTIFICATION_STREAM_BACKEND', 'memory')
+                if backend == 'redis':
+                    _broker = RedisBroker(settings.REDIS_URL)
+                else:
+                    _broker = InProcessBroker()
+    return _broker
+
+
+def publish_notifications(notifications):
+    """Push newly created notifications to their users' streams"""
+    from .serializers import NotificationListSerializer
+
+    get_broker().publish_many([
+        (notification.user_id, {'event': 'notification', 'data': NotificationListSerializer(notification).data})
+        for notification in notifications
+    ])
+
+
+def publish_unread_deltas(deltas, counts=None):
+    """Push {user_id: delta} unread count changes, with the new count when known"""
+    counts = counts or {}
+    get_broker().publish_many([
+        (user_id, {'event': 'unread_count', 'data': {'delta': delta, 'unread_count': counts.get(user_id)}})
+        for user_id, delta in deltas.items()
+    ])
@@ -0,0 +1,102 @@
+"""
+Per-process registry of compiled NotificationTemplates
+
+All templates are loaded with one query the first time one is needed and
+kept compiled in memory. Saving or deleting a template bumps a version
+counter in the Django cache (see signals.py); each process compares it on
+lookup and reloads when it has moved, so edits propagate to every worker
+without a query per notification. Names without a NotificationTemplate row
+fall back to the built-in DEFAULT_TEMPLATES.
+"""
+import logging
+import threading
+
+from django.core.cache import cache
+
+from .models import NotificationTemplate
+from .templating import DEFAULT_TEMPLATES, CompiledNotificationTemplate
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'notifications:template_registry_version'
+
+
+class TemplateRegistry:
+    """name -> CompiledNotificationTemplate, reloaded when the version moves"""
+
+    def __init__(self):
+        self._templates = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _current_version(self):
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, 1, None)
+            version = cache.get(VERSION_KEY, 1)
+        return version
+
+    def _load(self):
+        templates = {}
+        for template in NotificationTemplate.objects.all():
+            try:
+                templates[template.name] = template.compile()
+            except ValueError:
+                # Saved before validation existed; the built-in template is used instead
+                logger.warning('Skipping invalid notification template %r', template.name)
+        return templates
+
+    def templates(self):
+        version = self._current_version()
+        with self._lock:
+            if self._templates is None or version != self._version:
+                self._templates = self._load()
+                self._version = version
+            return self._templates
+
+    def get(self, name):
+        """Compiled template for ``name``; raises KeyError if there is none"""
+        template = self.templates().get(name)
+        if template is None:
+            if name not in DEFAULT_TEMPLATES:
+                raise KeyError(name)
+            template = CompiledNotificationTemplate.default(name)
+        return template
+
+    def render(self, name, context):
+        """(title, message) for ``name``, falling back to the built-in template if rendering fails"""
+        return self.render_many(name, [context])[0]
+
+    def notification_fields(self, name, context):
+        """title, message, notification_type and priority for dispatching ``name``"""
+        template = self.get(name)
+        title, message = self.render(name, context)
+        return {
+            'title': title,
+            'message': message,
+            'notification_type': template.notification_type,
+            'priority': template.priority,
+        }
+
+    def render_many(self, name, contexts):
+        """Render ``name`` for a batch of contexts"""
+        template = self.get(name)
+        try:
+            return template.render_many(contexts)
+        except (KeyError, AttributeError, IndexError, TypeError, ValueError):
+            if name not in DEFAULT_TEMPLATES:
+                raise
+            logger.exception('Notification template %r failed to render; using the built-in one', name)
+            return CompiledNotificationTemplate.default(name).render_many(contexts)
+
+    def invalidate(self):
+        """Drop this process's templates and tell every other process to do the same"""
+        with self._lock:
+            self._templates = None
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 2, None)
+
+
+template_registry = TemplateRegistry()
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Notification, NotificationPreference, NotificationTemplate
+from .templating import validate_template
 from users.serializers import UserSerializer
 
 
@@ -48,11 +49,43 @@ class CreateNotificationSerializer(serializers.ModelSerializer):
 
 
 class BulkReadSerializer(serializers.Serializer):
-    """Serializer for bulk read operations"""
+    """
+    Serializer for bulk read/unread operations
+    
+    Targets either an explicit list of ids or every notification matching
+    the given filters (e.g. all payment_overdue older than a date).
+    """
     notification_ids = serializers.ListField(
         child=serializers.IntegerField(),
-        required=True
+        required=False,
+        max_length=1000
     )
+    notification_type = serializers.ChoiceField(choices=Notification.TYPE_CHOICES, required=False)
+    priority = serializers.ChoiceField(choices=Notification.PRIORITY_CHOICES, required=False)
+    related_object_type = serializers.CharField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+    
+    FILTER_LOOKUPS = {
+        'notification_ids': 'id__in',
+        'notification_type': 'notification_type',
+        'priority': 'priority',
+        'related_object_type': 'related_object_type',
+        'created_before': 'created_at__lt',
+        'created_after': 'created_at__gte',
+    }
+    
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError('Provide notification_ids or at least one filter.')
+        return attrs
+    
+    def get_filters(self):
+        """Queryset filter kwargs for the validated request"""
+        return {
+            self.FILTER_LOOKUPS[field]: value
+            for field, value in self.validated_data.items()
+        }
 
 
 class NotificationPreferenceSerializer(serializers.ModelSerializer):
@@ -69,7 +102,7 @@ class NotificationPreferenceSerializer(serializers.ModelSerializer):
             'app_lease_expiring', 'app_payment_due', 'app_payment_received',
             'app_maintenance_updates', 'app_document_uploaded', 'app_report_ready',
             'digest_frequency', 'digest_frequency_display',
-            'quiet_hours_start', 'quiet_hours_end',
+            'quiet_hours_start', 'quiet_hours_end', 'time_zone',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['user', 'created_at', 'updated_at']
@@ -88,6 +121,16 @@ class NotificationTemplateSerializer(serializers.ModelSerializer):
             'priority', 'priority_display',
             'created_at', 'updated_at'
         ]
+    
+    def validate(self, attrs):
+        def current(field):
+            return attrs.get(field, getattr(self.instance, field, ''))
+        
+        try:
+            validate_template(current('name'), current('title_template'), current('message_template'))
+        except ValueError as e:
+            raise serializers.ValidationError(f'Invalid template: {e}')
+        return attrs
 
 
 class NotificationStatisticsSerializer(serializers.Serializer):
@@ -0,0 +1,143 @@
+"""
+Pre-parsed notification templates
+
+Templates use str.format syntax with named fields ("{tenant}",
+"{payment.amount:.2f}"). CompiledTemplate parses a template once with
+string.Formatter().parse and renders by walking the parsed segments, so
+rendering many contexts never re-parses the template string.
+"""
+import string
+
+_formatter = string.Formatter()
+
+# Templates used by the notification signal handlers. Admins can override
+# them with NotificationTemplate rows of the same name, using the same fields.
+DEFAULT_TEMPLATES = {
+    'lease_expiring': {
+        'notification_type': 'lease_expiring',
+        'title_template': 'Lease Expiring Soon: {property}',
+        'message_template': 'The lease for {tenant} at {property} will expire on {end_date}.',
+        'priority': 'high',
+    },
+    'payment_overdue': {
+        'notification_type': 'payment_overdue',
+        'title_template': 'Payment Overdue: {tenant}',
+        'message_template': 'Payment of ${amount_due} is overdue. Due date was {due_date}.',
+        'priority': 'urgent',
+    },
+    'payment_received': {
+        'notification_type': 'payment_received',
+        'title_template': 'Payment Received: {tenant}',
+        'message_template': 'Payment of ${amount_paid} has been received.',
+        'priority': 'normal',
+    },
+    'maintenance_created': {
+        'notification_type': 'maintenance_created',
+        'title_template': 'New Maintenance Request: {title}',
+        'message_template': 'A new {priority} priority maintenance request has been created at {property}.',
+        'priority': 'normal',
+    },
+    'maintenance_completed': {
+        'notification_type': 'maintenance_completed',
+        'title_template': 'Maintenance Completed: {title}',
+        'message_template': 'The maintenance request at {property} has been completed.',
+        'priority': 'normal',
+    },
+    'document_uploaded': {
+        'notification_type': 'document_uploaded',
+        'title_template': 'New Document: {name}',
+        'message_template': 'A new {category} document has been uploaded{property_suffix}.',
+        'priority': 'low',
+    },
+    'report_ready': {
+        'notification_type': 'report_ready',
+        'title_template': 'Report Ready: {name}',
+        'message_template': 'Your {report_type} report is ready for download.',
+        'priority': 'normal',
+    },
+}
+
+
+class CompiledTemplate:
+    """One format string split into (literal, field, format_spec, conversion, simple) segments"""
+
+    def __init__(self, source):
+        self.source = source
+        self.segments = []
+        self.fields = set()
+        # Formatter.parse raises ValueError for unbalanced braces
+        for literal, field, format_spec, conversion in _formatter.parse(source):
+            simple = False
+            if field is not None:
+                root = field.split('.', 1)[0].split('[', 1)[0]
+                if not root or root.isdigit():
+                    raise ValueError('Positional fields are not supported; use named fields like {tenant}')
+                if conversion not in (None, 'r', 's', 'a'):
+                    raise ValueError(f"Unknown conversion '!{conversion}' in field '{field}'")
+                if format_spec and '{' in format_spec:
+                    raise ValueError(f"Nested fields in the format spec of '{field}' are not supported")
+                self.fields.add(root)
+                simple = field == root
+            self.segments.append((literal, field, format_spec, conversion, simple))
+
+    def render(self, context):
+        """Same result as source.format(**context); raises KeyError for missing fields"""
+        parts = []
+        for literal, field, format_spec, conversion, simple in self.segments:
+            if literal:
+                parts.append(literal)
+            if field is None:
+                continue
+            if simple:
+                value = context[field]
+            else:
+                value, _ = _formatter.get_field(field, (), context)
+            if conversion:
+                value = _formatter.convert_field(value, conversion)
+            parts.append(format(value, format_spec or ''))
+        return ''.join(parts)
+
+
+class CompiledNotificationTemplate:
+    """Compiled title and message of a notification template"""
+
+    def __init__(self, name, notification_type, title_template, message_template, priority='normal'):
+        self.name = name
+        self.notification_type = notification_type
+        self.priority = priority
+        self.title = CompiledTemplate(title_template)
+        self.message = CompiledTemplate(message_template)
+
+    @classmethod
+    def default(cls, name):
+        return cls(name, **DEFAULT_TEMPLATES[name])
+
+    @property
+    def fields(self):
+        return self.title.fields | self.message.fields
+
+    def render(self, context):
+        """(title, message) for one context"""
+        return self.title.render(context), self.message.render(context)
+
+    def render_many(self, contexts):
+        """[(title, message), ...] for a batch of contexts, e.g. one per recipient"""
+        title, message = self.title.render, self.message.render
+        return [(title(context), message(context)) for context in contexts]
+
+
+def validate_template(name, title_template, message_template):
+    """
+    Compile a template and check it against the built-in one of the same name
+
+    Raises ValueError describing the first problem found.
+    """
+    compiled = CompiledNotificationTemplate(name, '', title_template, message_template)
+    if name in DEFAULT_TEMPLATES:
+        allowed = CompiledNotificationTemplate.default(name).fields
+        unknown = compiled.fields - allowed
+        if unknown:
+            raise ValueError(
+                f"Unknown fields {', '.join(sorted(unknown))}; available: {', '.join(sorted(allowed))}"
+            )
+    return compiled
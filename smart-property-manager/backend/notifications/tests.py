@@ -0,0 +1,550 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import User
+from .counters import cache_key, get_unread_count
+from .digest import send_digests, split_recipients
+from .dispatch import dispatch_notification
+from .expiry import sweep_notifications
+from .models import (
+    Notification, NotificationCounter, NotificationDigestItem, NotificationOutbox, NotificationPreference,
+    NotificationTemplate
+)
+from .outbox import enqueue_notification, process_outbox, purge_outbox, retry_delay
+from .pubsub import InProcessBroker
+from .serializers import NotificationTemplateSerializer
+from .registry import template_registry
+from .templating import CompiledTemplate
+from .views import read_stream_ticket
+
+
+@override_settings(NOTIFICATION_DISPATCH_ASYNC=False)
+class NotificationOutboxTests(TestCase):
+    """The outbox defers fan-out until commit and survives being drained later"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='outbox', email='outbox@example.com', password='pass1234'
+        )
+
+    def enqueue(self):
+        return enqueue_notification(
+            [self.user],
+            title='Payment Received',
+            message='Payment of $100 has been received.',
+            notification_type='payment_received'
+        )
+
+    def test_dispatches_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            entry = self.enqueue()
+            self.assertFalse(Notification.objects.exists())
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'sent')
+        self.assertEqual(Notification.objects.filter(user=self.user).count(), 1)
+
+    def test_rollback_discards_entry(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.enqueue()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+
+        self.assertEqual(callbacks, [])
+        self.assertFalse(NotificationOutbox.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+
+    def test_drain_delivers_pending_entries(self):
+        self.enqueue()
+        self.enqueue()
+
+        self.assertEqual(process_outbox(), 2)
+        self.assertEqual(Notification.objects.filter(user=self.user).count(), 2)
+        self.assertFalse(NotificationOutbox.objects.filter(status='pending').exists())
+
+    def test_failed_entries_are_retried_with_backoff(self):
+        entry = self.enqueue()
+        with mock.patch('notifications.outbox.dispatch_notification', side_effect=RuntimeError('smtp down')):
+            with self.assertLogs('notifications.outbox', 'ERROR'):
+                self.assertEqual(process_outbox(), 1)
+
+        entry.refresh_from_db()
+        self.assertEqual((entry.status, entry.attempts), ('pending', 1))
+        self.assertEqual(entry.next_attempt_at, entry.processed_at + timedelta(seconds=retry_delay(1)))
+        self.assertEqual(process_outbox(), 0)
+
+        with mock.patch('notifications.outbox.timezone.now', return_value=entry.next_attempt_at):
+            self.assertEqual(process_outbox(), 1)
+        entry.refresh_from_db()
+        self.assertEqual((entry.status, entry.attempts), ('sent', 2))
+        self.assertEqual(retry_delay(2), 2 * retry_delay(1))
+
+    def test_purge_removes_old_sent_entries(self):
+        old, recent, failed = self.enqueue(), self.enqueue(), self.enqueue()
+        now = timezone.now()
+        NotificationOutbox.objects.filter(pk=old.pk).update(status='sent', processed_at=now - timedelta(days=8))
+        NotificationOutbox.objects.filter(pk=recent.pk).update(status='sent', processed_at=now - timedelta(days=1))
+        NotificationOutbox.objects.filter(pk=failed.pk).update(status='failed', processed_at=now - timedelta(days=30))
+
+        self.assertEqual(purge_outbox(retention_days=7), 1)
+        self.assertEqual(
+            set(NotificationOutbox.objects.values_list('pk', flat=True)), {recent.pk, failed.pk}
+        )
+
+
+class NotificationDispatchTests(TestCase):
+    """Fan-out honours opt-outs and de-duplication with a fixed number of queries"""
+
+    # Recipient query, bulk insert and the unread counter UPDATE
+    EXPECTED_QUERIES = 3
+
+    def make_users(self, count, offset=0):
+        return [
+            User.objects.create_user(
+                username=f'dispatch{index}', email=f'dispatch{index}@example.com', password='pass1234'
+            )
+            for index in range(offset, offset + count)
+        ]
+
+    def dispatch(self, recipients, **fields):
+        fields.setdefault('notification_type', 'payment_received')
+        return dispatch_notification(recipients, title='Payment Received', message='Paid.', **fields)
+
+    def test_in_app_opt_out_is_respected(self):
+        subscribed, opted_out = self.make_users(2)
+        NotificationPreference.objects.create(user=opted_out, app_payment_received=False)
+
+        notifications = self.dispatch([subscribed, opted_out])
+        self.assertEqual([notification.user_id for notification in notifications], [subscribed.pk])
+
+        # Types without an in-app toggle reach everyone
+        self.assertEqual(len(self.dispatch([subscribed, opted_out], notification_type='info')), 2)
+
+    def test_dedupe_skips_users_with_an_unread_notification(self):
+        unread, read = self.make_users(2)
+        related = {'related_object_type': 'payment', 'related_object_id': 7}
+        self.dispatch([unread, read], **related)
+        Notification.objects.filter(user=read).update(is_read=True)
+
+        notifications = self.dispatch([unread, read], dedupe=True, **related)
+        self.assertEqual([notification.user_id for notification in notifications], [read.pk])
+        # Another object is not a duplicate
+        other = {'related_object_type': 'payment', 'related_object_id': 8}
+        self.assertEqual(len(self.dispatch([unread], dedupe=True, **other)), 1)
+
+    def test_query_count_does_not_grow_with_recipients(self):
+        for count, offset in ((2, 0), (25, 2)):
+            users = self.make_users(count, offset)
+            NotificationPreference.objects.create(user=users[0], app_payment_received=False)
+            with self.assertNumQueries(self.EXPECTED_QUERIES):
+                notifications = self.dispatch(users, dedupe=True)
+            self.assertEqual(len(notifications), count - 1)
+
+
+class NotificationDigestTests(TestCase):
+    """Digest users get one summary notification per period instead of one row per event"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='digest', email='digest@example.com', password='pass1234'
+        )
+        NotificationPreference.objects.create(user=self.user, digest_frequency='daily')
+
+    def notify(self, index, priority='normal'):
+        return dispatch_notification(
+            [self.user],
+            title=f'Payment Received #{index}',
+            message='Payment has been received.',
+            notification_type='payment_received',
+            priority=priority
+        )
+
+    def test_events_are_held_until_the_boundary(self):
+        for index in range(5):
+            self.assertEqual(self.notify(index), [])
+
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(NotificationDigestItem.objects.filter(user=self.user).count(), 5)
+        self.assertEqual(send_digests(), 0)
+
+        self.assertEqual(send_digests(now=timezone.now() + timedelta(days=1)), 1)
+        digest = Notification.objects.get(user=self.user)
+        self.assertEqual(digest.notification_type, 'digest')
+        self.assertEqual(digest.message.count('\n'), 4)
+        self.assertFalse(NotificationDigestItem.objects.exists())
+
+    def test_urgent_notifications_skip_the_digest(self):
+        self.assertEqual(len(self.notify(0, priority='urgent')), 1)
+        self.assertFalse(NotificationDigestItem.objects.exists())
+
+    def test_quiet_hours_follow_the_user_time_zone(self):
+        rows = [
+            (1, 'immediate', time(22), time(7), 'Asia/Tokyo'),
+            (2, 'immediate', time(22), time(7), ''),
+        ]
+        # 14:00 UTC is 23:00 in Tokyo
+        now = datetime(2024, 6, 15, 14, tzinfo=dt_timezone.utc)
+        self.assertEqual(split_recipients(rows, 'normal', now=now), ([2], [1]))
+
+    def test_dedupe_covers_pending_digest_items(self):
+        for _ in range(2):
+            dispatch_notification(
+                [self.user], title='Payment Due', message='Rent is due.', notification_type='payment_due',
+                related_object_type='payment', related_object_id=7, dedupe=True
+            )
+        self.assertEqual(NotificationDigestItem.objects.filter(user=self.user).count(), 1)
+
+
+@mock.patch('notifications.counters.cache_is_shared', lambda alias='default': True)
+class UnreadCounterTests(TestCase):
+    """unread_count is served from the cached counter and kept in step with writes"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='counter', email='counter@example.com', password='pass1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def unread_count(self):
+        return self.client.get(reverse('notification-unread-count')).data['unread_count']
+
+    def test_counter_follows_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(3):
+                dispatch_notification(
+                    [self.user], title=f'Notice {index}', message='Hello', notification_type='info'
+                )
+        self.assertEqual(self.unread_count(), 3)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread_count(), 3)
+
+        notification = Notification.objects.filter(user=self.user).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('notification-mark-read', args=[notification.pk]))
+        self.assertEqual(self.unread_count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('notification-mark-all-read'))
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_cache_is_seeded_from_the_counter_row(self):
+        NotificationCounter.objects.create(user=self.user, unread_count=4)
+        self.assertEqual(get_unread_count(self.user.id), 4)
+        self.assertEqual(cache.get(cache_key(self.user.id)), 4)
+
+    def test_unshared_cache_reads_the_counter_row(self):
+        NotificationCounter.objects.create(user=self.user, unread_count=2)
+        with mock.patch('notifications.counters.cache_is_shared', lambda alias='default': False):
+            self.assertEqual(get_unread_count(self.user.id), 2)
+            NotificationCounter.objects.filter(user=self.user).update(unread_count=3)
+            self.assertEqual(get_unread_count(self.user.id), 3)
+        self.assertIsNone(cache.get(cache_key(self.user.id)))
+
+
+class BulkReadTests(TestCase):
+    """bulk_read/bulk_unread run one UPDATE regardless of how many rows they touch"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='bulk', email='bulk@example.com', password='pass1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        Notification.objects.bulk_create([
+            Notification(
+                user=self.user, title=f'Notice {index}', message='Hello',
+                notification_type='payment_overdue' if index % 2 else 'info'
+            )
+            for index in range(50)
+        ])
+
+    def test_bulk_read_by_ids_is_a_single_update(self):
+        ids = list(Notification.objects.values_list('id', flat=True))
+
+        # UPDATE plus the counter UPDATE
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('notification-bulk-read'), {'notification_ids': ids}, format='json')
+        self.assertEqual(response.data['count'], 50)
+        self.assertFalse(Notification.objects.filter(is_read=False).exists())
+
+    def test_bulk_read_by_filter(self):
+        response = self.client.post(reverse('notification-bulk-read'), {
+            'notification_type': 'payment_overdue',
+            'created_before': (timezone.now() + timedelta(minutes=1)).isoformat(),
+        }, format='json')
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(Notification.objects.filter(is_read=False).count(), 25)
+
+        response = self.client.post(reverse('notification-bulk-unread'), {'notification_type': 'payment_overdue'}, format='json')
+        self.assertEqual(response.data['count'], 25)
+
+    def test_requires_ids_or_filter(self):
+        response = self.client.post(reverse('notification-bulk-read'), {}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class NotificationPaginationTests(TestCase):
+    """?cursor= switches the notification list to keyset pagination"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='pages', email='pages@example.com', password='pass1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        Notification.objects.bulk_create([
+            Notification(user=self.user, title=f'Notice {index}', message='Hello', notification_type='info')
+            for index in range(30)
+        ])
+
+    def test_page_numbers_by_default(self):
+        response = self.client.get(reverse('notification-list'))
+        self.assertEqual(response.data['count'], 30)
+
+    def test_cursor_walks_every_row_once(self):
+        seen = []
+        response = self.client.get(reverse('notification-list'), {'cursor': '', 'page_size': 7})
+        self.assertNotIn('count', response.data)
+        while True:
+            seen.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(len(seen), 30)
+        self.assertEqual(len(set(seen)), 30)
+
+    def test_cursor_is_stable_across_equal_timestamps(self):
+        Notification.objects.update(created_at=timezone.now())
+        seen = []
+        response = self.client.get(reverse('notification-list'), {'cursor': '', 'page_size': 7})
+        while True:
+            seen.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(seen, sorted(Notification.objects.values_list('id', flat=True), reverse=True))
+
+        # Walking back from the last page returns the previous page intact
+        previous = self.client.get(response.data['previous'])
+        self.assertEqual([row['id'] for row in previous.data['results']], seen[-9:-2])
+
+    def test_cursor_requires_an_indexed_ordering(self):
+        response = self.client.get(reverse('notification-list'), {'cursor': '', 'ordering': 'priority'})
+        self.assertEqual(response.status_code, 400)
+
+
+class NotificationStreamTests(TestCase):
+    """Dispatch publishes new notifications and unread deltas to the user's stream"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='stream', email='stream@example.com', password='pass1234'
+        )
+
+    def dispatch(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            dispatch_notification(
+                [self.user],
+                title='Report Ready',
+                message='Your report is ready.',
+                notification_type='report_ready'
+            )
+
+    async def test_dispatch_reaches_subscriber(self):
+        broker = InProcessBroker()
+        with mock.patch('notifications.pubsub._broker', broker):
+            subscription = await broker.subscribe(self.user.pk)
+            await sync_to_async(self.dispatch)()
+
+            events = {}
+            for _ in range(2):
+                message = await subscription.get(1)
+                events[message['event']] = message['data']
+            await broker.unsubscribe(subscription)
+
+        self.assertEqual(events['notification']['title'], 'Report Ready')
+        self.assertEqual(events['unread_count']['delta'], 1)
+        self.assertFalse(broker.hub.has_subscribers(self.user.pk))
+
+    def test_stream_is_refused_under_wsgi(self):
+        response = self.client.get(reverse('notification-stream'))
+        self.assertEqual(response.status_code, 501)
+
+    async def test_stream_requires_authentication(self):
+        response = await self.async_client.get(reverse('notification-stream'))
+        self.assertEqual(response.status_code, 401)
+
+        response = await self.async_client.get(reverse('notification-stream'), {'ticket': 'forged'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_stream_ticket(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        ticket = client.post(reverse('notification-stream-ticket')).data['ticket']
+        self.assertEqual(read_stream_ticket(ticket), self.user.pk)
+
+        with override_settings(NOTIFICATION_STREAM_TICKET_TTL=-1):
+            self.assertIsNone(read_stream_ticket(ticket))
+
+
+class TemplateRegistryTests(TestCase):
+    """Templates are parsed once, validated on save and reloaded after edits"""
+
+    def setUp(self):
+        cache.clear()
+        template_registry.invalidate()
+
+    def test_compiled_matches_str_format(self):
+        source = 'Payment of ${amount:.2f} from {tenant!r} ({lease.id}) is {{late}}'
+        context = {'amount': 1250.5, 'tenant': 'Ann', 'lease': type('Lease', (), {'id': 7})}
+        self.assertEqual(CompiledTemplate(source).render(context), source.format(**context))
+
+    def test_invalid_templates_are_rejected(self):
+        with self.assertRaises(ValidationError):
+            NotificationTemplate(
+                name='broken', notification_type='info', title_template='Hi {', message_template='x'
+            ).full_clean()
+
+        template, _ = NotificationTemplate.objects.update_or_create(name='report_ready', defaults={
+            'notification_type': 'report_ready', 'title_template': 'Ready: {name}', 'message_template': 'x',
+        })
+        serializer = NotificationTemplateSerializer(template, data={'title_template': '{owner}'}, partial=True)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('non_field_errors', serializer.errors)
+
+    def test_invalid_saved_template_falls_back_to_the_built_in(self):
+        NotificationTemplate.objects.update_or_create(
+            name='report_ready', defaults={'notification_type': 'report_ready', 'title_template': 'Hi {'}
+        )
+        with self.assertLogs('notifications.registry', 'WARNING'):
+            title, _ = template_registry.render('report_ready', {'name': 'Q1', 'report_type': 'Financial'})
+        self.assertEqual(title, 'Report Ready: Q1')
+
+    def test_notification_fields_come_from_the_template(self):
+        NotificationTemplate.objects.update_or_create(name='report_ready', defaults={
+            'notification_type': 'report_ready',
+            'title_template': 'Ready: {name}',
+            'message_template': 'Your {report_type} report is ready.',
+            'priority': 'high',
+        })
+        fields = template_registry.notification_fields('report_ready', {'name': 'Q1', 'report_type': 'Financial'})
+        self.assertEqual(fields, {
+            'title': 'Ready: Q1',
+            'message': 'Your Financial report is ready.',
+            'notification_type': 'report_ready',
+            'priority': 'high',
+        })
+
+    def test_render_many_without_queries_after_load(self):
+        NotificationTemplate.objects.update_or_create(name='report_ready', defaults={
+            'notification_type': 'report_ready',
+            'title_template': 'Ready: {name}',
+            'message_template': 'Your {report_type} report is ready.',
+        })
+        template_registry.get('report_ready')
+
+        contexts = [{'name': f'Q{i}', 'report_type': 'Financial'} for i in range(1, 4)]
+        with self.assertNumQueries(0):
+            rendered = template_registry.render_many('report_ready', contexts)
+        self.assertEqual(rendered[0], ('Ready: Q1', 'Your Financial report is ready.'))
+
+        NotificationTemplate.objects.filter(name='report_ready').get().delete()
+        self.assertEqual(
+            template_registry.render('report_ready', contexts[0])[0], 'Report Ready: Q1'
+        )
+
+
+@override_settings(
+    NOTIFICATION_TTL_DAYS={'report_ready': 7},
+    NOTIFICATION_READ_RETENTION_DAYS={'default': 90, 'info': 1, 'payment_overdue': None}
+)
+class NotificationExpiryTests(TestCase):
+    """Expired notifications are hidden at once and swept in batches with per-type retention"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='expiry', email='expiry@example.com', password='pass1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, notification_type='info', **fields):
+        return Notification.objects.create(
+            user=self.user, title='Notice', message='...', notification_type=notification_type, **fields
+        )
+
+    def test_ttl_is_applied_on_creation(self):
+        self.assertIsNotNone(self.create('report_ready').expires_at)
+        self.assertIsNone(self.create('info').expires_at)
+
+    def test_expired_notifications_are_hidden_and_swept(self):
+        expired = self.create(expires_at=timezone.now() - timedelta(minutes=1))
+        live = self.create()
+        self.assertEqual(get_unread_count(self.user.id), 1)
+
+        response = self.client.get('/api/notifications/notifications/')
+        self.assertEqual([row['id'] for row in response.data['results']], [live.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = sweep_notifications(batch_size=1)
+        self.assertEqual(result['expired'], 1)
+        self.assertFalse(Notification.objects.filter(pk=expired.pk).exists())
+        self.assertEqual(get_unread_count(self.user.id), 1)
+
+    @mock.patch('notifications.counters.cache_is_shared', lambda alias='default': True)
+    def test_badge_drops_when_a_notification_expires(self):
+        expires_at = timezone.now() + timedelta(hours=1)
+        self.create(expires_at=expires_at)
+        self.create()
+        self.assertEqual(get_unread_count(self.user.id), 2)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(self.user.id), 2)
+        with mock.patch('notifications.counters.timezone.now', return_value=expires_at + timedelta(seconds=1)):
+            self.assertEqual(get_unread_count(self.user.id), 1)
+
+    def test_read_retention_per_type(self):
+        old = timezone.now() - timedelta(days=2)
+        info = self.create('info', is_read=True, read_at=old)
+        kept = self.create('payment_overdue', is_read=True, read_at=old - timedelta(days=365))
+        recent = self.create('payment_received', is_read=True, read_at=old)
+
+        self.assertEqual(sweep_notifications()['read'], 1)
+        self.assertFalse(Notification.objects.filter(pk=info.pk).exists())
+        self.assertEqual(Notification.objects.filter(pk__in=[kept.pk, recent.pk]).count(), 2)
+
+
+class ExplainNotificationQueriesTests(TestCase):
+    """The EXPLAIN command plans every hot query"""
+
+    def test_prints_a_plan_per_query(self):
+        user = User.objects.create_user(username='explain', email='explain@example.com', password='pass1234')
+        Notification.objects.create(
+            user=user, title='Lease', message='...', notification_type='lease_expiring',
+            related_object_type='lease', related_object_id=1
+        )
+        out = StringIO()
+        call_command('explain_notification_queries', user=user.pk, stdout=out)
+        self.assertIn('Dedup check:', out.getvalue())
+        self.assertIn('Explained 7 queries', out.getvalue())
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import NotificationViewSet, NotificationPreferenceViewSet, NotificationTemplateViewSet
+from .views import NotificationViewSet, NotificationPreferenceViewSet, NotificationTemplateViewSet, notification_stream
 
 router = DefaultRouter()
 router.register(r'notifications', NotificationViewSet, basename='notification')
@@ -8,5 +8,6 @@ router.register(r'preferences', NotificationPreferenceViewSet, basename='notific
 router.register(r'templates', NotificationTemplateViewSet, basename='notification-template')
 
 urlpatterns = [
+    path('stream/', notification_stream, name='notification-stream'),
     path('', include(router.urls)),
 ]
@@ -1,9 +1,26 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count
+from config.pagination import OptInCursorPagination
+from django.conf import settings
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Q
+from django.http import JsonResponse, StreamingHttpResponse
+from users.models import User
+from .counters import adjust_unread, get_unread_count
+from .pubsub import get_broker, publish_notifications
 from .models import Notification, NotificationPreference, NotificationTemplate
 from .serializers import (
     NotificationSerializer,
@@ -24,10 +41,12 @@ class NotificationViewSet(viewsets.ModelViewSet):
     search_fields = ['title', 'message']
     ordering_fields = ['created_at', 'priority']
     ordering = ['-created_at']
+    pagination_class = OptInCursorPagination
+    cursor_ordering_fields = ['created_at']
     
     def get_queryset(self):
-        # Users can only see their own notifications
-        return Notification.objects.filter(user=self.request.user).select_related('user')
+        # Users can only see their own, unexpired notifications
+        return Notification.objects.active().filter(user=self.request.user).select_related('user')
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -38,7 +57,21 @@ class NotificationViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         # Admin/system can create notifications for any user
-        serializer.save()
+        notification = serializer.save()
+        if not notification.is_read:
+            adjust_unread(notification.user_id, 1)
+        transaction.on_commit(lambda: publish_notifications([notification]))
+    
+    def perform_update(self, serializer):
+        was_read = serializer.instance.is_read
+        notification = serializer.save()
+        if was_read != notification.is_read:
+            adjust_unread(notification.user_id, 1 if was_read else -1)
+    
+    def perform_destroy(self, instance):
+        if not instance.is_read:
+            adjust_unread(instance.user_id, -1)
+        instance.delete()
     
     @action(detail=False, methods=['get'])
     def unread(self, request):
@@ -49,9 +82,16 @@ class NotificationViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
-        """Get count of unread notifications"""
-        count = self.get_queryset().filter(is_read=False).count()
-        return Response({'unread_count': count})
+        """Get count of unread notifications (served from the per-user counter)"""
+        return Response({'unread_count': get_unread_count(request.user.id)})
+    
+    @action(detail=False, methods=['post'])
+    def stream_ticket(self, request):
+        """Short-lived ticket for opening the notification stream with EventSource"""
+        return Response({
+            'ticket': issue_stream_ticket(request.user.id),
+            'expires_in': getattr(settings, 'NOTIFICATION_STREAM_TICKET_TTL', 30)
+        })
     
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
@@ -77,31 +117,41 @@ class NotificationViewSet(viewsets.ModelViewSet):
             is_read=True,
             read_at=timezone.now()
         )
+        adjust_unread(request.user.id, -updated_count)
         return Response({
             'message': f'{updated_count} notifications marked as read',
             'count': updated_count
         })
     
-    @action(detail=False, methods=['post'])
-    def bulk_read(self, request):
-        """Mark multiple notifications as read"""
+    def bulk_mark(self, request, is_read):
+        """Set is_read on the selected notifications with a single UPDATE"""
+        from django.utils import timezone
         serializer = BulkReadSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        notification_ids = serializer.validated_data['notification_ids']
-        notifications = self.get_queryset().filter(id__in=notification_ids, is_read=False)
-        
-        from django.utils import timezone
-        updated_count = 0
-        for notification in notifications:
-            notification.mark_as_read()
-            updated_count += 1
+        notifications = self.get_queryset().filter(**serializer.get_filters()).exclude(is_read=is_read)
+        updated_count = notifications.update(
+            is_read=is_read,
+            read_at=timezone.now() if is_read else None
+        )
+        adjust_unread(request.user.id, -updated_count if is_read else updated_count)
         
+        label = 'read' if is_read else 'unread'
         return Response({
-            'message': f'{updated_count} notifications marked as read',
+            'message': f'{updated_count} notifications marked as {label}',
             'count': updated_count
         })
     
+    @action(detail=False, methods=['post'])
+    def bulk_read(self, request):
+        """Mark multiple notifications as read, by id list or by filter"""
+        return self.bulk_mark(request, is_read=True)
+    
+    @action(detail=False, methods=['post'])
+    def bulk_unread(self, request):
+        """Mark multiple notifications as unread, by id list or by filter"""
+        return self.bulk_mark(request, is_read=False)
+    
     @action(detail=False, methods=['post'])
     def bulk_delete(self, request):
         """Delete multiple notifications"""
@@ -114,8 +164,13 @@ class NotificationViewSet(viewsets.ModelViewSet):
             )
         
         notifications = self.get_queryset().filter(id__in=notification_ids)
-        deleted_count = notifications.count()
+        counts = notifications.aggregate(
+            total=Count('id'),
+            unread=Count('id', filter=Q(is_read=False))
+        )
+        deleted_count = counts['total']
         notifications.delete()
+        adjust_unread(request.user.id, -counts['unread'])
         
         return Response({
             'message': f'{deleted_count} notifications deleted',
@@ -137,8 +192,8 @@ class NotificationViewSet(viewsets.ModelViewSet):
         queryset = self.get_queryset()
         
         total_notifications = queryset.count()
-        unread_notifications = queryset.filter(is_read=False).count()
-        read_notifications = queryset.filter(is_read=True).count()
+        unread_notifications = get_unread_count(request.user.id)
+        read_notifications = total_notifications - unread_notifications
         
         # Notifications by type
         by_type = {}
@@ -221,3 +276,104 @@ class NotificationTemplateViewSet(viewsets.ModelViewSet):
                 {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+
+STREAM_TICKET_SALT = 'notifications.stream-ticket'
+
+
+def issue_stream_ticket(user_id):
+    """Signed, short-lived ticket that only opens the notification stream"""
+    return signing.dumps({'user': user_id}, salt=STREAM_TICKET_SALT)
+
+
+def read_stream_ticket(ticket):
+    """User id of a valid, unexpired stream ticket, or None"""
+    max_age = getattr(settings, 'NOTIFICATION_STREAM_TICKET_TTL', 30)
+    try:
+        return signing.loads(ticket, salt=STREAM_TICKET_SALT, max_age=max_age)['user']
+    except (signing.BadSignature, KeyError, TypeError):
+        return None
+
+
+def authenticate_stream(request):
+    """
+    User for a stream request, or None
+
+    EventSource cannot send headers, so browsers pass a stream ticket from
+    POST notifications/stream_ticket/ as ``?ticket=`` instead of the JWT;
+    the ticket expires within seconds and is useless for any other
+    endpoint, so it is harmless once it lands in access logs.
+    """
+    authentication = JWTAuthentication()
+    try:
+        result = authentication.authenticate(request)
+        if result is not None:
+            return result[0]
+    except (AuthenticationFailed, TokenError):
+        return None
+    user_id = read_stream_ticket(request.GET.get('ticket', ''))
+    if user_id is None:
+        return None
+    return User.objects.filter(pk=user_id, is_active=True).first()
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+
+
+async def event_stream(user_id):
+    """
+    Server-sent events for one connection
+
+    Starts with the current unread count so the client can resync, then
+    relays published events, with a comment line as heartbeat. The stream
+    ends after NOTIFICATION_STREAM_MAX_AGE seconds; EventSource reconnects
+    on its own, which also releases connections whose client has gone.
+    """
+    broker = get_broker()
+    heartbeat = getattr(settings, 'NOTIFICATION_STREAM_HEARTBEAT', 15)
+    max_age = getattr(settings, 'NOTIFICATION_STREAM_MAX_AGE', 300)
+    subscription = await broker.subscribe(user_id)
+    try:
+        yield f'retry: {getattr(settings, "NOTIFICATION_STREAM_RETRY_MS", 3000)}\n\n'
+        unread_count = await sync_to_async(get_unread_count)(user_id)
+        yield format_event('unread_count', {'delta': 0, 'unread_count': unread_count})
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_age
+        while loop.time() < deadline:
+            try:
+                message = await subscription.get(min(heartbeat, max(deadline - loop.time(), 0.1)))
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(message['event'], message['data'])
+    finally:
+        await broker.unsubscribe(subscription)
+
+
+async def notification_stream(request):
+    """
+    GET api/notifications/stream/ - live notifications and unread count changes (SSE)
+    
+    Only served under ASGI (e.g. uvicorn config.asgi:application), where an
+    open stream is a held connection. Under WSGI Django would collect the
+    whole stream in a worker thread and send it in one burst, so the
+    request is refused and clients keep polling unread_count.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'error': 'The notification stream requires an ASGI server; poll unread_count instead'},
+            status=501
+        )
+
+    user = await sync_to_async(authenticate_stream)(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentication credentials were not provided or are invalid'}, status=401)
+
+    response = StreamingHttpResponse(event_stream(user.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
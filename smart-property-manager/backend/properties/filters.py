@@ -0,0 +1,19 @@
+import django_filters
+from .models import Property
+
+
+class PropertyFilter(django_filters.FilterSet):
+    """
+    Filters for the property list
+
+    min_/max_ roi and occupancy filter on the values annotated by
+    Property.objects.with_metrics(), so the queryset must carry them.
+    """
+    min_roi = django_filters.NumberFilter(field_name='roi', lookup_expr='gte')
+    max_roi = django_filters.NumberFilter(field_name='roi', lookup_expr='lte')
+    min_occupancy = django_filters.NumberFilter(field_name='occupancy_rate', lookup_expr='gte')
+    max_occupancy = django_filters.NumberFilter(field_name='occupancy_rate', lookup_expr='lte')
+    
+    class Meta:
+        model = Property
+        fields = ['property_type', 'status', 'city', 'state']
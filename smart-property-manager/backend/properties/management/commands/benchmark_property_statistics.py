@@ -0,0 +1,86 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum, Count
+from properties.models import Property
+
+
+class Command(BaseCommand):
+    help = 'Compare Python-side and database-side portfolio statistics at several portfolio sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=str, default='10000,100000',
+            help='Comma-separated portfolio sizes to benchmark'
+        )
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per implementation (best is reported)')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        repeat = options['repeat']
+
+        for size in sizes:
+            # Everything created here is rolled back once the size is measured
+            with transaction.atomic():
+                self.seed(size)
+                python_time = self.best_of(repeat, self.python_statistics)
+                database_time = self.best_of(repeat, self.database_statistics)
+                filtered_time = self.best_of(repeat, lambda: self.database_statistics(city='City 7'))
+                transaction.set_rollback(True)
+
+            self.stdout.write(self.style.SUCCESS(f'{size} properties:'))
+            self.stdout.write(f'  python sums      {python_time * 1000:10.1f} ms')
+            self.stdout.write(f'  db aggregate     {database_time * 1000:10.1f} ms')
+            self.stdout.write(f'  db aggregate     {filtered_time * 1000:10.1f} ms (filtered by city)')
+
+    def seed(self, size):
+        self.stdout.write(f'Seeding {size} properties...')
+        Property.objects.bulk_create([
+            Property(
+                name=f'Benchmark Property {i}',
+                property_type='residential',
+                address=f'{i} Benchmark Ave',
+                city=f'City {i % 50}',
+                state='CA',
+                zip_code='90001',
+                total_units=10,
+                occupied_units=i % 11,
+                purchase_price=Decimal('500000'),
+                current_value=Decimal('650000'),
+                monthly_revenue=Decimal('12000'),
+                monthly_expenses=Decimal('4000'),
+                description='Benchmark property ' * 20,
+                features={'parking': True, 'pool': i % 2 == 0, 'amenities': ['gym', 'laundry']},
+            )
+            for i in range(size)
+        ], batch_size=2000)
+
+    def best_of(self, repeat, func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def python_statistics(self):
+        """Previous implementation: five passes over fully loaded model instances"""
+        properties = Property.objects.all()
+        total_properties = properties.count()
+        total_value = sum(p.current_value for p in properties)
+        total_revenue = sum(p.monthly_revenue for p in properties)
+        total_units = sum(p.total_units for p in properties)
+        occupied_units = sum(p.occupied_units for p in properties)
+        return total_properties, total_value, total_revenue, total_units, occupied_units
+
+    def database_statistics(self, **filters):
+        """Current implementation: a single aggregate query"""
+        return Property.objects.filter(**filters).aggregate(
+            total_properties=Count('id'),
+            total_value=Sum('current_value'),
+            monthly_revenue=Sum('monthly_revenue'),
+            total_units=Sum('total_units'),
+            occupied_units=Sum('occupied_units'),
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from properties.snapshot import rebuild_portfolio_snapshot, get_global_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the portfolio statistics snapshot from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per batch')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding portfolio snapshot...')
+
+        count = rebuild_portfolio_snapshot(batch_size=options['batch_size'])
+        snapshot = get_global_snapshot()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt snapshot for {count} properties '
+            f'(total value ${snapshot.total_value}, {snapshot.occupied_units}/{snapshot.total_units} units occupied)'
+        ))
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_global', models.BooleanField(default=False)),
+                ('property_count', models.IntegerField(default=0)),
+                ('total_value', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_units', models.IntegerField(default=0)),
+                ('occupied_units', models.IntegerField(default=0)),
+                ('monthly_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('monthly_expenses', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('occupancy_rate_sum', models.FloatField(default=0)),
+                ('roi_sum', models.FloatField(default=0)),
+                ('tenant_count', models.IntegerField(default=0)),
+                ('active_tenant_count', models.IntegerField(default=0)),
+                ('lease_count', models.IntegerField(default=0)),
+                ('active_lease_count', models.IntegerField(default=0)),
+                ('payment_amount_due', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('payment_amount_paid', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('revenue_total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('expense_total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('snapshot_property', models.OneToOneField(blank=True, db_column='property_id', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='snapshot', to='properties.property')),
+            ],
+            options={
+                'verbose_name': 'Portfolio Snapshot',
+                'verbose_name_plural': 'Portfolio Snapshots',
+                'db_table': 'portfolio_snapshots',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='portfoliosnapshot',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_global', True)), fields=('is_global',), name='unique_global_portfolio_snapshot'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0002_portfoliosnapshot'),
+    ]
+
+    operations = [
+        migrations.RemoveField(model_name='portfoliosnapshot', name='monthly_expenses'),
+        migrations.RemoveField(model_name='portfoliosnapshot', name='tenant_count'),
+        migrations.RemoveField(model_name='portfoliosnapshot', name='active_tenant_count'),
+        migrations.RemoveField(model_name='portfoliosnapshot', name='lease_count'),
+        migrations.RemoveField(model_name='portfoliosnapshot', name='active_lease_count'),
+        migrations.RemoveField(model_name='portfoliosnapshot', name='payment_amount_due'),
+        migrations.RemoveField(model_name='portfoliosnapshot', name='payment_amount_paid'),
+        migrations.RemoveField(model_name='portfoliosnapshot', name='revenue_total'),
+        migrations.RemoveField(model_name='portfoliosnapshot', name='expense_total'),
+    ]
@@ -0,0 +1,137 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def fill_counters(apps, schema_editor):
+    """
+    Fill the new counters on an existing global row
+
+    Without this the dashboard shows zero tenants, leases and payments
+    until the snapshot is rebuilt. Without a global row there is nothing
+    to fill; the first refresh builds it from the tables.
+    """
+    PortfolioSnapshot = apps.get_model('properties', 'PortfolioSnapshot')
+    Tenant = apps.get_model('tenants', 'Tenant')
+    Lease = apps.get_model('leases', 'Lease')
+    Payment = apps.get_model('financials', 'Payment')
+
+    if not PortfolioSnapshot.objects.filter(is_global=True).exists():
+        return
+
+    totals = Tenant.objects.aggregate(
+        tenant_count=Count('id'),
+        active_tenant_count=Count('id', filter=Q(status='active')),
+        inactive_tenant_count=Count('id', filter=Q(status='inactive')),
+        tenant_with_email_count=Count('id', filter=Q(email__isnull=False) & ~Q(email='')),
+        tenant_with_emergency_contact_count=Count(
+            'id', filter=Q(emergency_contact_name__isnull=False) & ~Q(emergency_contact_name='')
+        ),
+    )
+    totals.update(Lease.objects.aggregate(
+        lease_count=Count('id'),
+        active_lease_count=Count('id', filter=Q(status='active')),
+        expiring_soon_lease_count=Count('id', filter=Q(status='expiring_soon')),
+        expired_lease_count=Count('id', filter=Q(status='expired')),
+        pending_lease_count=Count('id', filter=Q(status='pending')),
+    ))
+    totals.update(Payment.objects.aggregate(
+        payment_amount_due=Sum('amount_due'),
+        payment_amount_paid=Sum('amount_paid'),
+        pending_payment_count=Count('id', filter=Q(status='pending')),
+        overdue_payment_count=Count('id', filter=Q(status='overdue')),
+        paid_payment_count=Count('id', filter=Q(status='paid')),
+    ))
+    PortfolioSnapshot.objects.filter(is_global=True).update(
+        **{field: value or 0 for field, value in totals.items()}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0003_trim_portfoliosnapshot'),
+        ('tenants', '0001_initial'),
+        ('leases', '0001_initial'),
+        ('financials', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='tenant_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='active_tenant_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='inactive_tenant_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='tenant_with_email_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='tenant_with_emergency_contact_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='lease_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='active_lease_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='expiring_soon_lease_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='expired_lease_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='pending_lease_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='payment_amount_due',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=18),
+        ),
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='payment_amount_paid',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=18),
+        ),
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='pending_payment_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='overdue_payment_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='paid_payment_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Q, F, Case, When, Value, FloatField
+from django.db.models.functions import Cast, Round
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -31,6 +33,36 @@ class Owner(models.Model):
         return self.name
 
 
+class PropertyQuerySet(models.QuerySet):
+    """QuerySet exposing database-computed property metrics"""
+    
+    def with_metrics(self):
+        """
+        Annotate occupancy_rate and roi as SQL expressions
+
+        Mirrors the Python properties on Property so both values can be
+        filtered, ordered by and aggregated in the database.
+        """
+        occupancy_rate = Case(
+            When(total_units=0, then=Value(0.0)),
+            default=Round(
+                Cast(F('occupied_units'), FloatField()) * 100.0 / Cast(F('total_units'), FloatField()),
+                1
+            ),
+            output_field=FloatField()
+        )
+        roi = Case(
+            When(Q(purchase_price__isnull=True) | Q(purchase_price=0), then=Value(0.0)),
+            default=Round(
+                Cast((F('monthly_revenue') - F('monthly_expenses')) * 12 * 100, FloatField())
+                / Cast(F('purchase_price'), FloatField()),
+                1
+            ),
+            output_field=FloatField()
+        )
+        return self.annotate(occupancy_rate=occupancy_rate, roi=roi)
+
+
 class Property(models.Model):
     """Real estate property model"""
     PROPERTY_TYPE_CHOICES = [
@@ -105,6 +137,8 @@ class Property(models.Model):
         related_name='created_properties'
     )
     
+    objects = PropertyQuerySet.as_manager()
+    
     class Meta:
         db_table = 'properties'
         verbose_name = 'Property'
@@ -114,22 +148,129 @@ class Property(models.Model):
     def __str__(self):
         return self.name
     
+    def save(self, *args, **kwargs):
+        # Values annotated by with_metrics() are stale once the row changes
+        self.__dict__.pop('_occupancy_rate', None)
+        self.__dict__.pop('_roi', None)
+        super().save(*args, **kwargs)
+    
     @property
     def occupancy_rate(self):
         """Calculate occupancy rate percentage"""
+        if self.__dict__.get('_occupancy_rate') is not None:
+            return self.__dict__['_occupancy_rate']
         if self.total_units == 0:
             return 0
         return round((self.occupied_units / self.total_units) * 100, 1)
     
+    @occupancy_rate.setter
+    def occupancy_rate(self, value):
+        """Store the value annotated by PropertyQuerySet.with_metrics()"""
+        self.__dict__['_occupancy_rate'] = value
+    
     @property
     def roi(self):
         """Calculate Return on Investment percentage"""
+        if self.__dict__.get('_roi') is not None:
+            return self.__dict__['_roi']
         if not self.purchase_price or self.purchase_price == 0:
             return 0
         annual_income = (self.monthly_revenue - self.monthly_expenses) * 12
         return round((annual_income / self.purchase_price) * 100, 1)
     
+    @roi.setter
+    def roi(self, value):
+        """Store the value annotated by PropertyQuerySet.with_metrics()"""
+        self.__dict__['_roi'] = value
+    
     @property
     def full_address(self):
         """Get formatted full address"""
         return f"{self.address}, {self.city}, {self.state} {self.zip_code}"
+
+
+class PortfolioSnapshot(models.Model):
+    """
+    Materialized portfolio statistics
+
+    One row per property plus a single global row (is_global=True) holding the
+    portfolio totals read by the dashboard and the property statistics
+    endpoint. Tenant, lease and payment counters are kept on the global row
+    only. Rows are refreshed incrementally by properties.signals and can be
+    rebuilt with the rebuild_portfolio_snapshot management command.
+    """
+    snapshot_property = models.OneToOneField(
+        Property,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='snapshot',
+        db_column='property_id'
+    )
+    is_global = models.BooleanField(default=False)
+    
+    # Property figures
+    property_count = models.IntegerField(default=0)
+    total_value = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    total_units = models.IntegerField(default=0)
+    occupied_units = models.IntegerField(default=0)
+    monthly_revenue = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    occupancy_rate_sum = models.FloatField(default=0)
+    roi_sum = models.FloatField(default=0)
+    
+    # Tenant, lease and payment counters (global row only)
+    tenant_count = models.IntegerField(default=0)
+    active_tenant_count = models.IntegerField(default=0)
+    inactive_tenant_count = models.IntegerField(default=0)
+    tenant_with_email_count = models.IntegerField(default=0)
+    tenant_with_emergency_contact_count = models.IntegerField(default=0)
+    lease_count = models.IntegerField(default=0)
+    active_lease_count = models.IntegerField(default=0)
+    expiring_soon_lease_count = models.IntegerField(default=0)
+    expired_lease_count = models.IntegerField(default=0)
+    pending_lease_count = models.IntegerField(default=0)
+    payment_amount_due = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    payment_amount_paid = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    pending_payment_count = models.IntegerField(default=0)
+    overdue_payment_count = models.IntegerField(default=0)
+    paid_payment_count = models.IntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'portfolio_snapshots'
+        verbose_name = 'Portfolio Snapshot'
+        verbose_name_plural = 'Portfolio Snapshots'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['is_global'],
+                condition=models.Q(is_global=True),
+                name='unique_global_portfolio_snapshot'
+            ),
+        ]
+    
+    def __str__(self):
+        if self.is_global:
+            return 'Portfolio snapshot (global)'
+        return f"Portfolio snapshot - {self.snapshot_property_id}"
+    
+    @property
+    def average_occupancy(self):
+        """Mean of the per-property occupancy rates"""
+        if not self.property_count:
+            return 0
+        return self.occupancy_rate_sum / self.property_count
+    
+    @property
+    def average_roi(self):
+        """Mean of the per-property ROI percentages"""
+        if not self.property_count:
+            return 0
+        return self.roi_sum / self.property_count
+    
+    @property
+    def occupancy_percentage(self):
+        """Occupied units as a percentage of all units"""
+        if not self.total_units:
+            return 0
+        return round((self.occupied_units / self.total_units) * 100, 2)
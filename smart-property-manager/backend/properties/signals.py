@@ -0,0 +1,53 @@
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import Property, PortfolioSnapshot
+from .snapshot import (
+    COUNTER_SOURCES, ROW_FIELDS, refresh_property_snapshot, apply_global_delta,
+    remember_counts, stored_counts, apply_counts_change,
+)
+
+
+@receiver(post_save, sender=Property)
+def refresh_snapshot(sender, instance, **kwargs):
+    """Refresh the snapshot row of the saved property"""
+    refresh_property_snapshot(instance.pk)
+
+
+@receiver(post_delete, sender=PortfolioSnapshot)
+def remove_from_global_snapshot(sender, instance, **kwargs):
+    """Subtract a deleted per-property row (removed along with its property) from the global totals"""
+    if instance.is_global:
+        return
+    apply_global_delta({field: -getattr(instance, field) for field in ROW_FIELDS})
+
+
+def remember_loaded_counts(sender, instance, **kwargs):
+    """Remember the counter contribution of a tenant, lease or payment as loaded"""
+    remember_counts(instance)
+
+
+def capture_previous_counts(sender, instance, **kwargs):
+    """Capture what the row contributed before it is saved or deleted"""
+    instance._snapshot_previous_counts = stored_counts(instance)
+
+
+def update_counters(sender, instance, **kwargs):
+    """Apply the saved row's change to the global counters"""
+    _, counts, _ = COUNTER_SOURCES[sender]
+    current = counts(instance)
+    apply_counts_change(instance._snapshot_previous_counts, current)
+    instance._snapshot_counts = current
+
+
+def remove_from_counters(sender, instance, **kwargs):
+    """Subtract a deleted row from the global counters"""
+    apply_counts_change(instance._snapshot_previous_counts, {})
+
+
+for model in COUNTER_SOURCES:
+    post_init.connect(remember_loaded_counts, sender=model)
+    pre_save.connect(capture_previous_counts, sender=model)
+    post_save.connect(update_counters, sender=model)
+    pre_delete.connect(capture_previous_counts, sender=model)
+    post_delete.connect(remove_from_counters, sender=model)
@@ -0,0 +1,260 @@
+"""
+Incremental maintenance of the PortfolioSnapshot table
+
+Property figures live on one row per property. When a property is saved or
+deleted its row is recomputed and the difference is applied to the global
+row with a single F() update.
+
+Tenant, lease and payment counters are kept on the global row only. Each
+instance remembers what it contributed when it was loaded, so a save or
+delete applies the difference without reading the old row back; only an
+instance loaded with a tracked field deferred costs one extra SELECT.
+
+Bulk operations (bulk_create, queryset.update) bypass signals, and so does
+saving two in-memory copies of the same row, so run
+``manage.py rebuild_portfolio_snapshot`` after them.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum, F
+
+from financials.models import Payment
+from leases.models import Lease
+from tenants.models import Tenant
+from .models import Property, PortfolioSnapshot
+
+
+PROPERTY_FIELDS = [
+    'total_value', 'total_units', 'occupied_units', 'monthly_revenue',
+    'occupancy_rate_sum', 'roi_sum',
+]
+
+# Summed from the per-property rows into the global row
+ROW_FIELDS = ['property_count'] + PROPERTY_FIELDS
+
+
+def _tenant_counts(tenant):
+    return {
+        'tenant_count': 1,
+        'active_tenant_count': int(tenant.status == 'active'),
+        'inactive_tenant_count': int(tenant.status == 'inactive'),
+        'tenant_with_email_count': int(bool(tenant.email)),
+        'tenant_with_emergency_contact_count': int(bool(tenant.emergency_contact_name)),
+    }
+
+
+def _lease_counts(lease):
+    return {
+        'lease_count': 1,
+        'active_lease_count': int(lease.status == 'active'),
+        'expiring_soon_lease_count': int(lease.status == 'expiring_soon'),
+        'expired_lease_count': int(lease.status == 'expired'),
+        'pending_lease_count': int(lease.status == 'pending'),
+    }
+
+
+def _payment_counts(payment):
+    return {
+        'payment_amount_due': payment.amount_due or Decimal('0'),
+        'payment_amount_paid': payment.amount_paid or Decimal('0'),
+        'pending_payment_count': int(payment.status == 'pending'),
+        'overdue_payment_count': int(payment.status == 'overdue'),
+        'paid_payment_count': int(payment.status == 'paid'),
+    }
+
+
+# model -> (fields the counts depend on, per-instance counts, equivalent aggregates)
+COUNTER_SOURCES = {
+    Tenant: (
+        ['status', 'email', 'emergency_contact_name'],
+        _tenant_counts,
+        {
+            'tenant_count': Count('id'),
+            'active_tenant_count': Count('id', filter=Q(status='active')),
+            'inactive_tenant_count': Count('id', filter=Q(status='inactive')),
+            'tenant_with_email_count': Count('id', filter=Q(email__isnull=False) & ~Q(email='')),
+            'tenant_with_emergency_contact_count': Count(
+                'id', filter=Q(emergency_contact_name__isnull=False) & ~Q(emergency_contact_name='')
+            ),
+        },
+    ),
+    Lease: (
+        ['status'],
+        _lease_counts,
+        {
+            'lease_count': Count('id'),
+            'active_lease_count': Count('id', filter=Q(status='active')),
+            'expiring_soon_lease_count': Count('id', filter=Q(status='expiring_soon')),
+            'expired_lease_count': Count('id', filter=Q(status='expired')),
+            'pending_lease_count': Count('id', filter=Q(status='pending')),
+        },
+    ),
+    Payment: (
+        ['status', 'amount_due', 'amount_paid'],
+        _payment_counts,
+        {
+            'payment_amount_due': Sum('amount_due'),
+            'payment_amount_paid': Sum('amount_paid'),
+            'pending_payment_count': Count('id', filter=Q(status='pending')),
+            'overdue_payment_count': Count('id', filter=Q(status='overdue')),
+            'paid_payment_count': Count('id', filter=Q(status='paid')),
+        },
+    ),
+}
+
+COUNTER_FIELDS = [field for _, _, aggregates in COUNTER_SOURCES.values() for field in aggregates]
+
+SNAPSHOT_FIELDS = ROW_FIELDS + COUNTER_FIELDS
+
+
+def _property_values(prop):
+    return {
+        'total_value': prop.current_value or Decimal('0'),
+        'total_units': prop.total_units,
+        'occupied_units': prop.occupied_units,
+        'monthly_revenue': prop.monthly_revenue,
+        'occupancy_rate_sum': float(prop.occupancy_rate),
+        'roi_sum': float(prop.roi),
+    }
+
+
+def _property_metrics(property_id):
+    prop = Property.objects.only(
+        'current_value', 'total_units', 'occupied_units', 'monthly_revenue',
+        'monthly_expenses', 'purchase_price'
+    ).filter(pk=property_id).first()
+    if prop is None:
+        return None
+    return _property_values(prop)
+
+
+def apply_global_delta(delta):
+    """Add per-field differences to the global snapshot row"""
+    changes = {field: F(field) + value for field, value in delta.items() if value}
+    if not changes:
+        return
+    updated = PortfolioSnapshot.objects.filter(is_global=True).update(**changes)
+    if not updated:
+        rebuild_global_snapshot()
+
+
+def remember_counts(instance):
+    """Record what a freshly loaded instance contributes to the counters"""
+    fields, counts, _ = COUNTER_SOURCES[type(instance)]
+    if all(field in instance.__dict__ for field in fields):
+        instance._snapshot_counts = counts(instance)
+
+
+def stored_counts(instance):
+    """What the instance's database row currently contributes; empty for a new row"""
+    if instance._state.adding:
+        return {}
+    remembered = instance.__dict__.get('_snapshot_counts')
+    if remembered is not None:
+        return remembered
+    fields, counts, _ = COUNTER_SOURCES[type(instance)]
+    stored = type(instance)._base_manager.only(*fields).filter(pk=instance.pk).first()
+    return counts(stored) if stored is not None else {}
+
+
+def apply_counts_change(previous, current):
+    """Apply the difference between two counts dicts to the global row"""
+    apply_global_delta({
+        field: current.get(field, 0) - previous.get(field, 0)
+        for field in previous.keys() | current.keys()
+    })
+
+
+def refresh_property_snapshot(property_id):
+    """
+    Recompute one property's snapshot row, creating it on the first save
+
+    A property that no longer exists is left to the post_delete cascade.
+    """
+    if property_id is None:
+        return
+
+    with transaction.atomic():
+        row = PortfolioSnapshot.objects.select_for_update().filter(
+            snapshot_property_id=property_id
+        ).first()
+        created = row is None
+        if created:
+            row = PortfolioSnapshot(snapshot_property_id=property_id)
+
+        values = _property_metrics(property_id)
+        if values is None:
+            return
+
+        delta = {field: value - getattr(row, field) for field, value in values.items()}
+        for field, value in values.items():
+            setattr(row, field, value)
+        if created:
+            row.property_count = 1
+            delta['property_count'] = 1
+        row.save()
+
+        apply_global_delta(delta)
+
+
+def _live_counters():
+    totals = {}
+    for model, (_, _, aggregates) in COUNTER_SOURCES.items():
+        totals.update(model.objects.aggregate(**aggregates))
+    return totals
+
+
+def rebuild_global_snapshot():
+    """
+    Recompute the global row
+
+    Property figures are summed from the per-property rows, the tenant,
+    lease and payment counters are aggregated from their tables.
+    """
+    totals = PortfolioSnapshot.objects.filter(is_global=False).aggregate(
+        **{field: Sum(field) for field in ROW_FIELDS}
+    )
+    totals.update(_live_counters())
+    defaults = {field: value or 0 for field, value in totals.items()}
+    PortfolioSnapshot.objects.update_or_create(is_global=True, defaults=defaults)
+
+
+def rebuild_portfolio_snapshot(batch_size=1000):
+    """
+    Rebuild every snapshot row from the source tables
+
+    Properties are read in chunks and written back with bulk operations;
+    the global row's counters are re-aggregated from their tables.
+    """
+    rows = {}
+    properties = Property.objects.only(
+        'current_value', 'total_units', 'occupied_units', 'monthly_revenue',
+        'monthly_expenses', 'purchase_price'
+    ).order_by()
+    for prop in properties.iterator(chunk_size=batch_size):
+        rows[prop.id] = dict(_property_values(prop), property_count=1)
+
+    with transaction.atomic():
+        existing = {
+            row.snapshot_property_id: row
+            for row in PortfolioSnapshot.objects.select_for_update().filter(is_global=False)
+        }
+        to_create = []
+        to_update = []
+        for property_id, values in rows.items():
+            row = existing.get(property_id) or PortfolioSnapshot(snapshot_property_id=property_id)
+            for field in ROW_FIELDS:
+                setattr(row, field, values[field])
+            (to_update if row.pk else to_create).append(row)
+
+        PortfolioSnapshot.objects.bulk_create(to_create, batch_size=batch_size)
+        PortfolioSnapshot.objects.bulk_update(to_update, ROW_FIELDS, batch_size=batch_size)
+        rebuild_global_snapshot()
+
+    return len(rows)
+
+
+def get_global_snapshot():
+    """Return the global snapshot row, or None if it has not been built yet"""
+    return PortfolioSnapshot.objects.filter(is_global=True).first()
@@ -1,3 +1,96 @@
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from tenants.models import Tenant
+from .models import Property, PortfolioSnapshot
+from .snapshot import SNAPSHOT_FIELDS, rebuild_portfolio_snapshot, get_global_snapshot
+
+
+def make_property(**kwargs):
+    defaults = {
+        'name': 'Test Property', 'address': '1 Main St', 'city': 'Austin',
+        'state': 'TX', 'zip_code': '78701', 'total_units': 10,
+        'occupied_units': 5, 'current_value': Decimal('100000'),
+        'purchase_price': Decimal('90000'), 'monthly_revenue': Decimal('2000'),
+        'monthly_expenses': Decimal('500'),
+    }
+    defaults.update(kwargs)
+    return Property.objects.create(**defaults)
+
+
+class PortfolioSnapshotTests(TestCase):
+    """Incremental snapshot maintenance must agree with a full rebuild"""
+
+    def snapshot_values(self):
+        snapshot = get_global_snapshot()
+        return {field: getattr(snapshot, field) for field in SNAPSHOT_FIELDS}
+
+    def test_incremental_updates_match_rebuild(self):
+        first = make_property(name='First')
+        second = make_property(name='Second', total_units=4, occupied_units=4)
+        make_property(name='Third', current_value=Decimal('250000'))
+
+        second.occupied_units = 2
+        second.save()
+        first.delete()
+
+        incremental = self.snapshot_values()
+        self.assertEqual(incremental['property_count'], 2)
+        self.assertEqual(incremental['total_units'], 14)
+        self.assertEqual(incremental['occupied_units'], 7)
+
+        rebuild_portfolio_snapshot()
+        self.assertEqual(self.snapshot_values(), incremental)
+        self.assertEqual(PortfolioSnapshot.objects.filter(is_global=False).count(), 2)
+
+    def test_tenant_counters_match_rebuild(self):
+        prop = make_property()
+        tenant = Tenant.objects.create(
+            first_name='Ann', last_name='Lee', email='ann@example.com',
+            phone='555-0100', property=prop, status='pending'
+        )
+        Tenant.objects.create(
+            first_name='Bob', last_name='Ray', email='bob@example.com',
+            phone='555-0101', status='active', emergency_contact_name='Sue'
+        )
+
+        tenant.status = 'active'
+        tenant.save()
+        # A tenant loaded with the tracked fields deferred is read back before saving
+        deferred = Tenant.objects.only('first_name').get(email='bob@example.com')
+        deferred.status = 'inactive'
+        deferred.save()
+
+        incremental = self.snapshot_values()
+        self.assertEqual(incremental['tenant_count'], 2)
+        self.assertEqual(incremental['active_tenant_count'], 1)
+        self.assertEqual(incremental['inactive_tenant_count'], 1)
+
+        tenant.delete()
+        self.assertEqual(self.snapshot_values()['tenant_count'], 1)
+
+        incremental = self.snapshot_values()
+        rebuild_portfolio_snapshot()
+        self.assertEqual(self.snapshot_values(), incremental)
+
+
+class PropertyMetricsAnnotationTests(TestCase):
+    """with_metrics() must agree with the Python occupancy_rate/roi properties"""
+
+    def test_annotations_match_python_properties(self):
+        make_property(name='Half Full', total_units=8, occupied_units=4)
+        make_property(name='Empty', total_units=0, occupied_units=0, purchase_price=None)
+        make_property(name='Losing', monthly_revenue=Decimal('100'), monthly_expenses=Decimal('900'))
+
+        for annotated in Property.objects.with_metrics():
+            plain = Property.objects.get(pk=annotated.pk)
+            self.assertAlmostEqual(annotated.occupancy_rate, float(plain.occupancy_rate))
+            self.assertAlmostEqual(annotated.roi, float(plain.roi))
+
+    def test_order_by_roi(self):
+        make_property(name='Low', monthly_revenue=Decimal('1000'))
+        make_property(name='High', monthly_revenue=Decimal('9000'))
+
+        names = list(Property.objects.with_metrics().order_by('-roi').values_list('name', flat=True))
+        self.assertEqual(names, ['High', 'Low'])
@@ -2,8 +2,12 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.settings import api_settings
+from django.db.models import Sum, Count
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Property, Owner
+from .snapshot import get_global_snapshot
+from .filters import PropertyFilter
 from .serializers import (
     PropertyListSerializer,
     PropertyDetailSerializer,
@@ -14,12 +18,15 @@ from .serializers import (
 
 class PropertyViewSet(viewsets.ModelViewSet):
     """ViewSet for property CRUD operations"""
-    queryset = Property.objects.all()
+    queryset = Property.objects.with_metrics()
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['property_type', 'status', 'city', 'state']
+    filterset_class = PropertyFilter
     search_fields = ['name', 'address', 'city', 'owner__name']
-    ordering_fields = ['name', 'current_value', 'monthly_revenue', 'created_at']
+    ordering_fields = [
+        'name', 'current_value', 'monthly_revenue', 'created_at',
+        'roi', 'occupancy_rate'
+    ]
     ordering = ['-created_at']
     
     def get_serializer_class(self):
@@ -34,23 +41,48 @@ class PropertyViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        """Get portfolio statistics"""
-        properties = self.get_queryset()
+        """
+        Get portfolio statistics
+
+        Accepts the same filter, search and ordering parameters as the list
+        view. Unfiltered requests are served from the portfolio snapshot;
+        filtered ones run a single aggregate query.
+        """
+        is_filtered = any(
+            param in request.query_params
+            for param in list(PropertyFilter.base_filters) + [api_settings.SEARCH_PARAM]
+        )
+        snapshot = None if is_filtered else get_global_snapshot()
+        
+        if snapshot is not None:
+            totals = {
+                'total_properties': snapshot.property_count,
+                'total_value': snapshot.total_value,
+                'monthly_revenue': snapshot.monthly_revenue,
+                'total_units': snapshot.total_units,
+                'occupied_units': snapshot.occupied_units,
+            }
+        else:
+            properties = self.filter_queryset(self.get_queryset())
+            totals = properties.aggregate(
+                total_properties=Count('id'),
+                total_value=Sum('current_value'),
+                monthly_revenue=Sum('monthly_revenue'),
+                total_units=Sum('total_units'),
+                occupied_units=Sum('occupied_units'),
+            )
         
-        total_properties = properties.count()
-        total_value = sum(p.current_value for p in properties)
-        total_revenue = sum(p.monthly_revenue for p in properties)
-        total_units = sum(p.total_units for p in properties)
-        occupied_units = sum(p.occupied_units for p in properties)
+        total_units = totals['total_units'] or 0
+        occupied_units = totals['occupied_units'] or 0
         
         occupancy_rate = 0
         if total_units > 0:
             occupancy_rate = round((occupied_units / total_units) * 100, 1)
         
         return Response({
-            'total_properties': total_properties,
-            'total_value': total_value,
-            'monthly_revenue': total_revenue,
+            'total_properties': totals['total_properties'],
+            'total_value': totals['total_value'] or 0,
+            'monthly_revenue': totals['monthly_revenue'] or 0,
             'occupancy_rate': occupancy_rate,
             'total_units': total_units,
             'occupied_units': occupied_units,